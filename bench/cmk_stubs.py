@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+"""Light stand-ins for the parts of the Checkmk API used by this package.
+
+They only reproduce what the plugins need to run outside of a Checkmk site
+(object construction, result types, levels handling). Nothing here is meant
+to be a faithful reimplementation; it is just close enough in cost that the
+benchmark numbers of the plugin code itself are meaningful.
+"""
+
+import enum
+import sys
+import types
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Mapping, NamedTuple, Optional, Sequence
+
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+
+
+#
+# cmk.agent_based.v2
+#
+class State(enum.IntEnum):
+    OK = 0
+    WARN = 1
+    CRIT = 2
+    UNKNOWN = 3
+
+    @classmethod
+    def worst(cls, *states: 'State') -> 'State':
+        if cls.CRIT in states:
+            return cls.CRIT
+        return cls(max(states))
+
+
+class OIDEnd:
+    def __repr__(self) -> str:
+        return 'OIDEnd()'
+
+
+class SNMPTree(NamedTuple):
+    base: str
+    oids: Sequence[Any]
+
+
+class Service(NamedTuple):
+    item: Optional[str] = None
+    parameters: Optional[Mapping[str, Any]] = None
+    labels: Optional[Sequence[Any]] = None
+
+
+class HostLabel(NamedTuple):
+    name: str
+    value: str
+
+
+class Result:
+    __slots__ = ('state', 'summary', 'notice', 'details')
+
+    def __init__(self, *, state: State, summary: Optional[str] = None,
+                 notice: Optional[str] = None, details: Optional[str] = None) -> None:
+        if not isinstance(state, State):
+            raise TypeError(f'state must be a State, got {state!r}')
+        if summary is None and notice is None:
+            raise TypeError('at least summary or notice must be given')
+        self.state = state
+        self.summary = summary or ''
+        self.notice = notice
+        self.details = details or summary or notice
+
+    def __repr__(self) -> str:
+        return f'Result(state={self.state!r}, summary={self.summary!r})'
+
+
+class Metric:
+    __slots__ = ('name', 'value', 'levels', 'boundaries')
+
+    def __init__(self, name: str, value: float, *, levels: Optional[tuple] = None,
+                 boundaries: Optional[tuple] = None) -> None:
+        if not isinstance(value, (int, float)):
+            raise TypeError(f'metric value must be a number, got {value!r}')
+        self.name = name
+        self.value = float(value)
+        self.levels = levels
+        self.boundaries = boundaries
+
+    def __repr__(self) -> str:
+        return f'Metric({self.name!r}, {self.value!r})'
+
+
+class Attributes(NamedTuple):
+    path: List[str]
+    inventory_attributes: Mapping[str, Any] = {}
+    status_attributes: Mapping[str, Any] = {}
+
+
+class TableRow(NamedTuple):
+    path: List[str]
+    key_columns: Mapping[str, Any]
+    inventory_columns: Mapping[str, Any] = {}
+    status_columns: Mapping[str, Any] = {}
+
+
+class IgnoreResultsError(RuntimeError):
+    pass
+
+
+class GetRateError(ArithmeticError):
+    pass
+
+
+class _Plugin:
+    """Common base of the registration objects: keeps the keyword arguments."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        self.__dict__.update(kwargs)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}(name={self.__dict__.get("name")!r})'
+
+
+class SNMPSection(_Plugin):
+    pass
+
+
+class SimpleSNMPSection(_Plugin):
+    pass
+
+
+class AgentSection(_Plugin):
+    pass
+
+
+class CheckPlugin(_Plugin):
+    pass
+
+
+class InventoryPlugin(_Plugin):
+    pass
+
+
+def startswith(oid: str, value: str) -> tuple:
+    return ('startswith', oid, value)
+
+
+def contains(oid: str, value: str) -> tuple:
+    return ('contains', oid, value)
+
+
+def exists(oid: str) -> tuple:
+    return ('exists', oid)
+
+
+def all_of(*specs: Any) -> tuple:
+    return ('all_of',) + specs
+
+
+def any_of(*specs: Any) -> tuple:
+    return ('any_of',) + specs
+
+
+def not_exists(oid: str) -> tuple:
+    return ('not_exists', oid)
+
+
+# A single value store is shared by all services in the benchmark run, the
+# keys used by the plugins are unique enough for that.
+VALUE_STORE: dict = {}
+
+
+def get_value_store() -> dict:
+    return VALUE_STORE
+
+
+def get_rate(value_store: dict, key: str, time: float, value: float, *, raise_overflow: bool = False) -> float:
+    last = value_store.get(key)
+    value_store[key] = (time, value)
+    if not last:
+        raise GetRateError(f'Initialized: {key!r}')
+    last_time, last_value = last
+    if time <= last_time:
+        raise GetRateError('No time difference')
+    rate = (value - last_value) / (time - last_time)
+    if raise_overflow and rate < 0:
+        raise GetRateError('Value overflow')
+    return rate
+
+
+def _levels(levels: Any) -> Optional[tuple]:
+    # Accept both the v2 style ('fixed', (warn, crit)) and plain tuples.
+    if levels is None:
+        return None
+    if isinstance(levels, tuple) and len(levels) == 2 and isinstance(levels[0], str):
+        return levels[1] if levels[0] == 'fixed' else None
+    return levels
+
+
+def check_levels(
+    value: float,
+    *,
+    levels_upper: Any = None,
+    levels_lower: Any = None,
+    metric_name: Optional[str] = None,
+    render_func: Optional[Callable[[float], str]] = None,
+    label: Optional[str] = None,
+    boundaries: Optional[tuple] = None,
+    notice_only: bool = False,
+) -> Iterable[Any]:
+    upper = _levels(levels_upper)
+    lower = _levels(levels_lower)
+    text = render_func(value) if render_func else f'{value:.2f}'
+    if label:
+        text = f'{label}: {text}'
+    state = State.OK
+    if upper is not None:
+        if value >= upper[1]:
+            state = State.CRIT
+        elif value >= upper[0]:
+            state = State.WARN
+    if lower is not None and state == State.OK:
+        if value < lower[1]:
+            state = State.CRIT
+        elif value < lower[0]:
+            state = State.WARN
+    if notice_only:
+        yield Result(state=state, notice=text)
+    else:
+        yield Result(state=state, summary=text)
+    if metric_name:
+        yield Metric(metric_name, value, levels=upper, boundaries=boundaries)
+
+
+render = types.SimpleNamespace(
+    percent=lambda v: f'{v:.2f}%',
+    bytes=lambda v: f'{v:.0f} B',
+    iobandwidth=lambda v: f'{v:.2f} B/s',
+    nicspeed=lambda v: f'{v * 8:.0f} Bit/s',  # of octets per second
+    timespan=lambda v: f'{v:.0f} s',
+    datetime=lambda v: f'{v:.0f}',
+    date=lambda v: f'{v:.0f}',
+    frequency=lambda v: f'{v:.2f} Hz',
+    filesize=lambda v: f'{v:.0f} B',
+)
+
+
+#
+# cmk.plugins.lib.elphase
+#
+_ELPHASE_QUANTITIES = (
+    ('voltage', 'Voltage', ' V', 'lower'),
+    ('current', 'Current', ' A', 'upper'),
+    ('output_load', 'Load', '%', 'upper'),
+    ('power', 'Power', ' W', 'upper'),
+    ('appower', 'Apparent Power', ' VA', 'upper'),
+    ('energy', 'Energy', ' Wh', 'upper'),
+    ('frequency', 'Frequency', ' hz', 'both'),
+    ('differential_current_ac', 'Differential current AC', ' mA', 'upper'),
+    ('differential_current_dc', 'Differential current DC', ' mA', 'upper'),
+)
+
+
+def check_elphase(item: str, params: Mapping[str, Any], section: Mapping[str, Mapping[str, Any]]) -> Iterable[Any]:
+    if (elphase := section.get(item)) is None:
+        return
+    if 'name' in elphase:
+        yield Result(state=State.OK, summary=f'Name: {elphase["name"]}')
+    if 'type' in elphase:
+        yield Result(state=State.OK, summary=f'Type: {elphase["type"]}')
+    if 'device_state' in elphase:
+        device_state, device_state_readable = elphase['device_state']
+        yield Result(state=State(device_state), summary=f'Device status: {device_state_readable}({device_state})')
+    for quantity, title, unit, direction in _ELPHASE_QUANTITIES:
+        if quantity not in elphase:
+            continue
+        value = elphase[quantity]
+        if isinstance(value, tuple):
+            value = value[0]
+        levels = params.get(quantity)
+        yield from check_levels(
+            value,
+            levels_upper=levels if direction == 'upper' else None,
+            levels_lower=levels if direction == 'lower' else None,
+            metric_name=quantity,
+            render_func=lambda v, unit=unit: f'{v:.1f}{unit}',
+            label=title,
+        )
+
+
+#
+# cmk.plugins.lib.temperature / humidity
+#
+TempParamType = Any
+
+
+def check_temperature(reading: float, params: Any, *, dev_unit: str = 'c', dev_status: Any = None,
+                      dev_status_name: Optional[str] = None, **_kwargs: Any) -> Iterable[Any]:
+    yield from check_levels(
+        reading,
+        levels_upper=params.get('levels'),
+        levels_lower=params.get('levels_lower'),
+        metric_name='temp',
+        render_func=lambda v: f'{v:.1f} °C',
+        label='Temperature',
+    )
+    if dev_status is not None:
+        yield Result(state=State(dev_status), summary=f'State on device: {dev_status_name}')
+
+
+def check_humidity(humidity: float, params: Any) -> Iterable[Any]:
+    yield from check_levels(
+        humidity,
+        levels_upper=params.get('levels'),
+        levels_lower=params.get('levels_lower'),
+        metric_name='humidity',
+        render_func=lambda v: f'{v:.2f}%',
+    )
+
+
+#
+# cmk.ccc.debug / cmk.utils.debug
+#
+_DEBUG = {'enabled': False}
+
+
+def _debug_enabled() -> bool:
+    return _DEBUG['enabled']
+
+
+def set_debug(enabled: bool) -> None:
+    _DEBUG['enabled'] = enabled
+
+
+def _module(name: str, **attrs: Any) -> types.ModuleType:
+    module = sys.modules.get(name)
+    if module is None:
+        module = types.ModuleType(name)
+        sys.modules[name] = module
+    module.__dict__.update(attrs)
+    return module
+
+
+def install() -> None:
+    """Register the stand-ins in sys.modules and map cmk_addons.plugins to src/."""
+    v2 = {
+        name: obj for name, obj in globals().items()
+        if name in (
+            'State', 'OIDEnd', 'SNMPTree', 'Service', 'HostLabel', 'Result', 'Metric', 'Attributes',
+            'TableRow', 'IgnoreResultsError', 'GetRateError', 'SNMPSection', 'SimpleSNMPSection',
+            'AgentSection', 'CheckPlugin', 'InventoryPlugin', 'startswith', 'contains', 'exists',
+            'all_of', 'any_of', 'not_exists', 'get_value_store', 'get_rate', 'check_levels', 'render',
+        )
+    }
+    v2.update(
+        StringTable=List[List[str]],
+        StringByteTable=List[List[Any]],
+        CheckResult=Iterable[Any],
+        DiscoveryResult=Iterable[Any],
+        InventoryResult=Iterable[Any],
+        HostLabelGenerator=Iterable[Any],
+    )
+    _module('cmk')
+    _module('cmk.agent_based')
+    _module('cmk.agent_based.v2', **v2)
+    _module('cmk.plugins')
+    _module('cmk.plugins.lib')
+    _module('cmk.plugins.lib.elphase', check_elphase=check_elphase)
+    _module('cmk.plugins.lib.temperature', check_temperature=check_temperature, TempParamType=TempParamType)
+    _module('cmk.plugins.lib.humidity', check_humidity=check_humidity)
+    _module('cmk.ccc')
+    _module('cmk.ccc.debug', enabled=_debug_enabled)
+    _module('cmk.utils')
+    _module('cmk.utils.debug', enabled=_debug_enabled)
+
+    # The package is deployed below cmk_addons/plugins/, mirror that layout.
+    _module('cmk_addons', __path__=[])
+    _module('cmk_addons.plugins', __path__=[str(SRC_DIR)])
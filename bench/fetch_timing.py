@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+"""Time a full SNMP fetch of every section of this package.
+
+Walks the OIDs of each section the way Checkmk does (one GetBulk walk per
+fetched column) and reports wall-clock time, request/response PDUs and
+bytes on the wire per section. Point it at updu_agent.py or at a real unit.
+
+    python3 bench/updu_agent.py updu.snmprec &
+    python3 bench/fetch_timing.py --port 1161
+"""
+
+import argparse
+import itertools
+import socket
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from run_bench import load_plugins
+
+from cmk_addons.plugins.rnx_updu.special_agent import snmp_v2c  # noqa: E402
+from cmk_addons.plugins.rnx_updu.special_agent.snmp_v2c import OID, Message, Value  # noqa: E402
+
+
+class WalkStats:
+    __slots__ = ('requests', 'bytes_sent', 'bytes_received', 'varbinds', 'timeouts')
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.varbinds = 0
+        self.timeouts = 0
+
+
+class Client:
+    """Blocking SNMPv2c client, one outstanding request at a time."""
+
+    def __init__(self, host: str, port: int, community: str, timeout: float, retries: int) -> None:
+        self.address = (host, port)
+        self.community = community.encode()
+        self.timeout = timeout
+        self.retries = retries
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(timeout)
+        self.request_ids = itertools.count(1)
+
+    def request(self, pdu_type: int, oids: List[OID], stats: WalkStats,
+                non_repeaters: int = 0, max_repetitions: int = 0) -> Message:
+        request_id = next(self.request_ids)
+        data = snmp_v2c.encode_message(Message(
+            self.community, pdu_type, request_id, non_repeaters, max_repetitions,
+            [(oid, Value(snmp_v2c.NULL)) for oid in oids],
+        ))
+        for _attempt in range(self.retries + 1):
+            self.sock.sendto(data, self.address)
+            stats.requests += 1
+            stats.bytes_sent += len(data)
+            try:
+                while True:
+                    answer, _addr = self.sock.recvfrom(65535)
+                    response = snmp_v2c.decode_message(answer)
+                    if response.request_id == request_id:
+                        stats.bytes_received += len(answer)
+                        stats.varbinds += len(response.varbinds)
+                        return response
+            except socket.timeout:
+                stats.timeouts += 1
+        raise TimeoutError(f'No response from {self.address[0]}:{self.address[1]}')
+
+    def bulkwalk(self, base: OID, stats: WalkStats, max_repetitions: int) -> List[Tuple[OID, Value]]:
+        rows = []
+        oid = base
+        while True:
+            response = self.request(snmp_v2c.GET_BULK_REQUEST, [oid], stats, 0, max_repetitions)
+            for oid, value in response.varbinds:
+                if oid[:len(base)] != base or value.tag == snmp_v2c.END_OF_MIB_VIEW:
+                    return rows
+                rows.append((oid, value))
+            if not response.varbinds:
+                return rows
+
+
+def fetch_section(client: Client, section: Any, max_repetitions: int) -> Dict[str, Any]:
+    stats = WalkStats()
+    trees = section.fetch if isinstance(section.fetch, list) else [section.fetch]
+    rows = 0
+    start = time.perf_counter()
+    for tree in trees:
+        base = snmp_v2c.parse_oid(tree.base)
+        tree_rows = 0
+        for column in tree.oids:
+            if not isinstance(column, str):  # OIDEnd comes with the other columns
+                continue
+            tree_rows = max(tree_rows, len(client.bulkwalk(base + snmp_v2c.parse_oid(column), stats, max_repetitions)))
+        rows += tree_rows
+    return {
+        'section': section.name,
+        'trees': len(trees),
+        'rows': rows,
+        'seconds': time.perf_counter() - start,
+        'requests': stats.requests,
+        'varbinds': stats.varbinds,
+        'bytes': stats.bytes_sent + stats.bytes_received,
+        'timeouts': stats.timeouts,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help='SNMP agent (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=1161, help='UDP port (default: %(default)s)')
+    parser.add_argument('--community', default='public', help='SNMPv2c community (default: %(default)s)')
+    parser.add_argument('--max-repetitions', type=int, default=10,
+                        help='GetBulk max-repetitions, Checkmk uses 10 by default (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=1.0, help='seconds per request (default: %(default)s)')
+    parser.add_argument('--retries', type=int, default=1, help='retries per request (default: %(default)s)')
+    parser.add_argument('--filter', default='', help='only fetch sections whose name contains this string')
+    args = parser.parse_args(argv)
+
+    client = Client(args.host, args.port, args.community, args.timeout, args.retries)
+    sections = [section for section in load_plugins()['sections'] if args.filter in section.name]
+
+    header = (f'{"section":<40} {"trees":>5} {"rows":>6} {"requests":>8} '
+              f'{"varbinds":>8} {"KiB":>8} {"ms":>9} {"ms/req":>7}')
+    print(header)
+    print('-' * len(header))
+    totals = {'rows': 0, 'requests': 0, 'varbinds': 0, 'bytes': 0, 'seconds': 0.0}
+    for section in sections:
+        res = fetch_section(client, section, args.max_repetitions)
+        for key in totals:
+            totals[key] += res[key]
+        print(f'{res["section"]:<40} {res["trees"]:>5} {res["rows"]:>6} {res["requests"]:>8} '
+              f'{res["varbinds"]:>8} {res["bytes"] / 1024:>8.1f} {res["seconds"] * 1000:>9.1f} '
+              f'{res["seconds"] * 1000 / max(res["requests"], 1):>7.2f}'
+              + (f'  ({res["timeouts"]} timeouts)' if res['timeouts'] else ''))
+    print('-' * len(header))
+    print(f'{"total":<40} {"":>5} {totals["rows"]:>6} {totals["requests"]:>8} '
+          f'{totals["varbinds"]:>8} {totals["bytes"] / 1024:>8.1f} {totals["seconds"] * 1000:>9.1f} '
+          f'{totals["seconds"] * 1000 / max(totals["requests"], 1):>7.2f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+"""Write a synthetic UPDU walk in the snmprec format of snmpsim.
+
+Every column fetched by a section of this package is filled for the given
+number of chained PDUs. The file can be served by updu_agent.py or by
+snmpsim-command-responder.
+
+    python3 bench/make_walk.py --pdus 10 --outlets 48 --nodata 0.25 -o updu.snmprec
+"""
+
+import argparse
+import random
+import sys
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import synthetic
+from run_bench import load_plugins
+
+from cmk_addons.plugins.rnx_updu.special_agent.snmp_v2c import format_oid, parse_oid  # noqa: E402
+
+SYS_DESCR = '.1.3.6.1.2.1.1.1.0'
+SYS_OBJECT_ID = '.1.3.6.1.2.1.1.2.0'
+
+# snmprec type tags of the columns which are not octet strings
+UPDU_INTEGER_COLUMNS = {'8', '50', '51', '52', '53', '54', '55', '56', '70', '71', '72', '73'}
+IF_TYPES = {
+    synthetic.IF_TABLE: {
+        '1': '2', '3': '2', '4': '2', '5': '66', '7': '2', '8': '2',
+        '10': '65', '11': '65', '13': '65', '14': '65', '16': '65', '17': '65', '19': '65', '20': '65',
+    },
+    synthetic.IF_X_TABLE: {'15': '66', **{str(col): '70' for col in range(6, 14)}},
+}
+
+
+def objects_per_pdu(outlets: int, sensors: int) -> Dict[str, int]:
+    modules = -(-outlets // synthetic.OUTLETS_PER_MODULE)
+    return {
+        'PDU': 1,
+        'Inlet': 1,
+        'Wire': synthetic.PHASES,
+        'Branch': modules,
+        'ICM': 1,
+        'Module': modules,
+        'Outlet': outlets,
+        'Sensor': sensors,
+    }
+
+
+def fetched_columns() -> Dict[str, Set[str]]:
+    """All columns by table base as fetched by the sections of the package."""
+    columns: Dict[str, Set[str]] = {}
+    for section in load_plugins()['sections']:
+        trees = section.fetch if isinstance(section.fetch, list) else [section.fetch]
+        for tree in trees:
+            columns.setdefault(tree.base, set()).update(oid for oid in tree.oids if isinstance(oid, str))
+    return columns
+
+
+def updu_records(base: str, columns: Iterable[str], kind: str, pdus: int, per_pdu: int,
+                 nodata: float, rng: random.Random) -> Iterable[Tuple[str, str, str]]:
+    for column in columns:
+        idx = 0
+        for pdu in range(pdus):
+            for local in range(per_pdu):
+                # Chained units report the same object paths, the OID index
+                # is <unit>.<object>
+                if column == '11':
+                    value = synthetic.object_path(kind, local)
+                else:
+                    value = synthetic.updu_value(kind, column, idx, rng, nodata)
+                idx += 1
+                oid_type = '2' if column in UPDU_INTEGER_COLUMNS else '4'
+                yield f'{base}.{column}.{pdu + 1}.{local + 1}', oid_type, value
+
+
+def if_records(base: str, columns: Iterable[str], interfaces: int,
+               rng: random.Random) -> Iterable[Tuple[str, str, str]]:
+    for column in columns:
+        for idx in range(interfaces):
+            value = synthetic.if_value(base, column, idx, rng)
+            yield f'{base}.{column}.{idx + 1}', IF_TYPES.get(base, {}).get(column, '4'), value
+
+
+def build_walk(pdus: int, outlets: int, sensors: int, interfaces: int, nodata: float,
+               seed: int) -> List[Tuple[str, str, str]]:
+    rng = random.Random(seed)
+    per_pdu = objects_per_pdu(outlets, sensors)
+    records = [
+        (SYS_DESCR, '4', f'RNX UPDU synthetic, {pdus} PDU(s) with {outlets} outlets'),
+        (SYS_OBJECT_ID, '6', '1.3.6.1.4.1.55108'),
+    ]
+    for base, columns in fetched_columns().items():
+        ordered = sorted(columns, key=int)
+        if base.startswith(synthetic.UPDU_MIB2):
+            kind = synthetic.UPDU_OBJECT_TYPES.get(base[len(synthetic.UPDU_MIB2):].split('.')[0], 'Object')
+            records.extend(updu_records(base, ordered, kind, pdus, per_pdu.get(kind, 1), nodata, rng))
+        else:
+            records.extend(if_records(base, ordered, interfaces, rng))
+    # snmprec files are sorted by OID and written without the leading dot
+    records.sort(key=lambda rec: parse_oid(rec[0]))
+    return [(format_oid(parse_oid(oid))[1:], oid_type, value) for oid, oid_type, value in records]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pdus', type=int, default=1, choices=range(1, 11), metavar='1..10',
+                        help='number of chained PDUs (default: %(default)s)')
+    parser.add_argument('--outlets', type=int, default=48, choices=range(0, 49), metavar='0..48',
+                        help='outlets per PDU (default: %(default)s)')
+    parser.add_argument('--sensors', type=int, default=2, help='external sensors per PDU (default: %(default)s)')
+    parser.add_argument('--interfaces', type=int, default=2, help='network interfaces (default: %(default)s)')
+    parser.add_argument('--nodata', type=float, default=0.0,
+                        help='fraction of unlicensed "No Data" channels (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic data')
+    parser.add_argument('-o', '--output', default='-', help='snmprec file to write (default: stdout)')
+    args = parser.parse_args(argv)
+
+    records = build_walk(args.pdus, args.outlets, args.sensors, args.interfaces, args.nodata, args.seed)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        for oid, oid_type, value in records:
+            out.write(f'{oid}|{oid_type}|{value}\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+"""Benchmark the parse, discovery, check and inventory functions of rnx_updu.
+
+Runs without a Checkmk site: the Checkmk API is replaced by the stand-ins
+from cmk_stubs.py and the SNMP data is generated from the section
+definitions by synthetic.py.
+
+    python3 bench/run_bench.py
+    python3 bench/run_bench.py --sizes 48,4800 --filter power --save before.json
+    python3 bench/run_bench.py --compare before.json
+"""
+
+import argparse
+import gc
+import importlib
+import inspect
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import cmk_stubs  # noqa: E402
+import synthetic  # noqa: E402
+
+cmk_stubs.install()
+
+PACKAGE = 'cmk_addons.plugins.rnx_updu.agent_based'
+AGENT_BASED_DIR = cmk_stubs.SRC_DIR / 'rnx_updu' / 'agent_based'
+DEFAULT_SIZES = (1, 48, 480, 4800)
+
+# Discovery options on top of the defaults of the plugins, so that the costlier
+# checks with them are measured
+FORECAST = {'tiers': ['inlets', 'wires', 'branch', 'module'], 'days': ('fixed', (30.0, 7.0))}
+OPT_IN_PARAMS = {
+    'rnx_updu_power_in': {'forecast': FORECAST},
+    'rnx_updu_power_in_combined': {'forecast': FORECAST},
+    'rnx_updu_power_out': {'parent_down': True, 'forecast': FORECAST},
+    'rnx_updu_power_outlet_summary': {'parent_down': True, 'outlet_summary': {'group': 'module', 'outlets': []}},
+}
+
+
+def load_plugins() -> Dict[str, List[Any]]:
+    plugins: Dict[str, List[Any]] = {'sections': [], 'checks': [], 'inventories': []}
+    for path in sorted(AGENT_BASED_DIR.glob('*.py')):
+        module = importlib.import_module(f'{PACKAGE}.{path.stem}')
+        for obj in vars(module).values():
+            if isinstance(obj, (cmk_stubs.SNMPSection, cmk_stubs.SimpleSNMPSection)):
+                plugins['sections'].append(obj)
+            elif isinstance(obj, cmk_stubs.CheckPlugin):
+                plugins['checks'].append(obj)
+            elif isinstance(obj, cmk_stubs.InventoryPlugin):
+                plugins['inventories'].append(obj)
+    return plugins
+
+
+def _consume(result: Any) -> Any:
+    # Discovery, check and inventory functions are generators
+    if inspect.isgenerator(result):
+        return list(result)
+    return result
+
+
+def measure(func: Callable[[], Any], min_time: float,
+            kept_func: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """Time per call (best and mean), the peak of traced memory of one call and
+    the memory still held by its result (the parsed section of parse functions).
+
+    kept_func is traced for the memory held by the result instead of func,
+    parse functions get a fresh copy of their string table there, so that the
+    strings a parsed section keeps referencing count as well.
+    """
+    _consume(func())  # warm up
+    times = []
+    start = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        _consume(func())
+        times.append(time.perf_counter() - t0)
+        if time.perf_counter() - start >= min_time and len(times) >= 3:
+            break
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        _consume(func())
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    kept_func = kept_func or func
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = _consume(kept_func())
+        gc.collect()
+        kept, _peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'calls': len(times),
+        'best_ms': min(times) * 1000,
+        'mean_ms': sum(times) / len(times) * 1000,
+        'peak_kib': peak / 1024,
+        'kept_kib': kept / 1024,
+    }
+
+
+def _copy_table(table: Any) -> Any:
+    if isinstance(table, str):
+        return table.encode().decode()
+    return [_copy_table(item) for item in table]
+
+
+def _section_kwargs(plugin: Any, parsers: Dict[str, Callable[[], Any]]) -> Optional[Callable[[], Dict[str, Any]]]:
+    """The section arguments of a plugin, parsed anew on every call.
+
+    Like in a check cycle every call of a discovery, check or inventory
+    function starts from freshly parsed sections, so work deferred from the
+    parse function to the first read of a section is measured as well.
+    """
+    names = [str(name) for name in plugin.sections]
+    if not any(name in parsers for name in names):
+        return None
+    if len(names) == 1:
+        return lambda: {'section': parsers[names[0]]()}
+    return lambda: {f'section_{name}': parsers[name]() if name in parsers else None for name in names}
+
+
+def _accepts(func: Callable, arg: str) -> bool:
+    return arg in inspect.signature(func).parameters
+
+
+def run_size(
+    plugins: Dict[str, List[Any]], rows: int, args: argparse.Namespace
+) -> Iterable[Tuple[str, Dict[str, Any], Callable[[], Any], Optional[Callable[[], Any]]]]:
+    """Name, extra info, a call of each function for tables of `rows` rows and
+    for parse functions a call with a fresh copy of the string table."""
+    parsers: Dict[str, Callable[[], Any]] = {}
+    for section in plugins['sections']:
+        string_table = synthetic.string_table_for(section, rows, nodata=args.nodata, seed=args.seed)
+        parse = section.parse_function
+        parsers[getattr(section, 'parsed_section_name', None) or section.name] = (
+            lambda parse=parse, string_table=string_table: parse(string_table))
+        yield (parse.__name__, {}, lambda parse=parse, string_table=string_table: parse(string_table),
+               lambda parse=parse, string_table=string_table: parse(_copy_table(string_table)))
+
+    for plugin in plugins['checks']:
+        sections = _section_kwargs(plugin, parsers)
+        if sections is None:
+            continue
+        discover = plugin.discovery_function
+        params = {}
+        if _accepts(discover, 'params'):
+            params['params'] = {**(getattr(plugin, 'discovery_default_parameters', None) or {}),
+                                **OPT_IN_PARAMS.get(str(plugin.name), {})}
+        services = list(discover(**sections(), **params))
+        yield (discover.__name__, {},
+               lambda discover=discover, sections=sections, params=params: discover(**sections(), **params), None)
+
+        check = plugin.check_function
+        defaults = getattr(plugin, 'check_default_parameters', None) or {}
+
+        def check_all(check=check, services=services, defaults=defaults, sections=sections):
+            results = []
+            kwargs = sections()
+            for service in services:
+                call = dict(kwargs)
+                if _accepts(check, 'item'):
+                    call['item'] = service.item
+                if _accepts(check, 'params'):
+                    call['params'] = {**defaults, **(service.parameters or {})}
+                results.extend(check(**call))
+            return results
+
+        yield check.__name__, {'services': len(services)}, check_all, None
+
+    for plugin in plugins['inventories']:
+        sections = _section_kwargs(plugin, parsers)
+        if sections is None:
+            continue
+        inventory = plugin.inventory_function
+        yield inventory.__name__, {}, lambda inventory=inventory, sections=sections: inventory(**sections()), None
+
+
+def report(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    header = (f'{"function":<44} {"rows":>6} {"calls":>6} {"best ms":>10} {"mean ms":>10} '
+              f'{"peak KiB":>10} {"kept KiB":>10}')
+    if baseline is not None:
+        header += f' {"Δ best":>8} {"Δ peak":>8} {"Δ kept":>8}'
+    print(header)
+    print('-' * len(header))
+    for res in results:
+        line = (f'{res["function"]:<44} {res["rows"]:>6} {res["calls"]:>6} '
+                f'{res["best_ms"]:>10.3f} {res["mean_ms"]:>10.3f} {res["peak_kib"]:>10.1f} {res["kept_kib"]:>10.1f}')
+        if baseline is not None:
+            base = baseline.get(f'{res["function"]}/{res["rows"]}')
+            if base:
+                line += (f' {_delta(res["best_ms"], base["best_ms"]):>8}'
+                         f' {_delta(res["peak_kib"], base["peak_kib"]):>8}'
+                         f' {_delta(res["kept_kib"], base.get("kept_kib", 0)):>8}')
+            else:
+                line += f' {"new":>8} {"new":>8} {"new":>8}'
+        print(line)
+
+
+def _delta(value: float, base: float) -> str:
+    if not base:
+        return 'n/a'
+    return f'{(value - base) / base * 100:+.0f}%'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma separated rows per table (default: %(default)s)')
+    parser.add_argument('--filter', default='', help='only run functions whose name contains this string')
+    parser.add_argument('--nodata', type=float, default=0.0,
+                        help='fraction of rows reported with "No Data" quality (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic data')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='minimum seconds spent timing each function (default: %(default)s)')
+    parser.add_argument('--save', metavar='FILE', help='write the results as JSON')
+    parser.add_argument('--compare', metavar='FILE', help='show the change against a saved JSON result')
+    args = parser.parse_args(argv)
+
+    plugins = load_plugins()
+    results = []
+    for rows in (int(size) for size in args.sizes.split(',')):
+        for name, extra, call, kept_call in run_size(plugins, rows, args):
+            if args.filter in name:
+                results.append(dict(function=name, rows=rows, **extra, **measure(call, args.min_time, kept_call)))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = {f'{res["function"]}/{res["rows"]}': res for res in json.load(handle)}
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
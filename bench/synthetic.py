@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+"""Synthetic SNMP string tables for the sections defined by this package.
+
+The tables are derived from the SNMPTree definitions of a section, so the
+generator follows any change of the fetched OIDs without being touched. Only
+the meaning of the individual columns is encoded here.
+"""
+
+import random
+from typing import Any, List, Sequence
+
+# upduMib2 object types by the table number below .1.3.6.1.4.1.55108.2
+UPDU_MIB2 = '.1.3.6.1.4.1.55108.2.'
+UPDU_OBJECT_TYPES = {
+    '1': 'PDU',
+    '2': 'Inlet',
+    '4': 'Wire',
+    '5': 'Branch',
+    '6': 'ICM',
+    '8': 'Module',
+    '9': 'Outlet',
+    '23': 'Sensor',
+}
+IF_TABLE = '.1.3.6.1.2.1.2.2.1'
+IF_X_TABLE = '.1.3.6.1.2.1.31.1.1.1'
+
+# Outlets per power outlet module and phases per inlet of a typical unit
+OUTLETS_PER_MODULE = 8
+PHASES = 3
+
+
+def object_path(kind: str, idx: int, root: str = 'PDU') -> str:
+    """ObjectPath of the idx-th object of a kind below one PDU."""
+    phase = f'WireL{idx % PHASES + 1}'
+    module = f'Module{idx // OUTLETS_PER_MODULE + 1}'
+    return {
+        'PDU': root,
+        'Inlet': f'{root}/Inlet',
+        'Wire': f'{root}/Inlet/WireL{idx % PHASES + 1}',
+        'Branch': f'{root}/Inlet/{phase}/Branch{idx + 1}',
+        'Module': f'{root}/Inlet/{phase}/Module{idx + 1}',
+        'Outlet': f'{root}/Inlet/{phase}/{module}/Outlet{idx + 1}',
+    }.get(kind, f'{root}/{kind}{idx + 1}')
+
+
+def updu_value(kind: str, column: str, idx: int, rng: random.Random, nodata: float) -> str:
+    """Value of one column of the idx-th row of an upduMib2 table."""
+    if column == '2':
+        return f'{kind}{idx + 1}'
+    if column == '3':
+        return f'srv-{idx:04d}' if idx % 4 == 0 else ''
+    if column == '4':
+        return f'Rack {idx % 26 + 1}' if idx % 5 == 0 else ''
+    if column == '5':
+        return str(10000000 + idx)
+    if column == '6':
+        return '100-0715-2' if kind == 'Module' else '100-0141-3'
+    if column == '7':
+        return f'L23{idx % 100:02d}'
+    if column == '8':
+        return '16000'
+    if column == '9':
+        return '2.4.1'
+    if column == '10':
+        return f'{kind}{idx + 1}'
+    if column == '11':
+        return object_path(kind, idx)
+    if column in ('50', '71', '73'):
+        # MeterDataQuality: 0 = OK, 1 = Expired, 2 = No Data (not licensed)
+        return '2' if rng.random() < nodata else '0'
+    if column == '51':
+        return str(rng.randint(0, 16000))            # mA
+    if column == '52':
+        return str(rng.randint(225000, 235000))      # mV
+    if column in ('53', '54'):
+        return str(rng.randint(0, 3600))             # W / VA
+    if column == '56':
+        return str(rng.randint(0, 10 ** 9))          # Wh
+    if column == '70':
+        return str(rng.randint(150, 350))            # 1/10 °C
+    if column == '72':
+        return str(rng.randint(200, 700))            # 1/10 %RH
+    if column == '79':
+        return f'A{idx % 4 + 1}'
+    return '0'
+
+
+def if_value(base: str, column: str, idx: int, rng: random.Random) -> str:
+    """Value of one column of the idx-th row of ifTable or ifXTable."""
+    if base == IF_X_TABLE:
+        if column == '1':
+            return f'eth{idx}'
+        if column == '15':
+            return '100'
+        return str(rng.randint(0, 2 ** 40))
+    return {
+        '1': str(idx + 1),
+        '2': f'eth{idx}',
+        '3': '6',
+        '4': '1500',
+        '5': '100000000',
+        '7': '1',
+        '8': '1',
+    }.get(column, str(rng.randint(0, 2 ** 31)))
+
+
+def table_for_tree(tree: Any, rows: int, *, nodata: float = 0.0, seed: int = 0) -> List[List[str]]:
+    """Rows as Checkmk would hand them to the parse function for one SNMPTree."""
+    rng = random.Random(f'{tree.base}/{seed}')
+    base = tree.base
+    kind = None
+    if base.startswith(UPDU_MIB2):
+        kind = UPDU_OBJECT_TYPES.get(base[len(UPDU_MIB2):].split('.')[0], 'Object')
+
+    table = []
+    for idx in range(rows):
+        row = []
+        for oid in tree.oids:
+            if not isinstance(oid, str):  # OIDEnd
+                row.append(str(idx + 1))
+            elif kind is not None:
+                row.append(updu_value(kind, oid, idx, rng, nodata))
+            else:
+                row.append(if_value(base, oid, idx, rng))
+        table.append(row)
+    return table
+
+
+def string_table_for(section: Any, rows: int, *, nodata: float = 0.0, seed: int = 0) -> Any:
+    """The complete string table of an SNMP section with `rows` rows per tree."""
+    fetch: Sequence[Any] = section.fetch
+    if isinstance(fetch, (list, tuple)) and not hasattr(fetch, 'base'):
+        return [table_for_tree(tree, rows, nodata=nodata, seed=seed) for tree in fetch]
+    return table_for_tree(fetch, rows, nodata=nodata, seed=seed)
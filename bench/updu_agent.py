@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+"""Stand-in UPDU SNMP agent serving snmprec walk files on localhost.
+
+Answers SNMPv2c Get, GetNext and GetBulk requests from one or more snmprec
+files (see make_walk.py). Each file is served under the community named
+after it, e.g. `updu-10x48.snmprec` under the community `updu-10x48`.
+
+    python3 bench/updu_agent.py --port 1161 updu.snmprec
+"""
+
+import argparse
+import asyncio
+import bisect
+import signal
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cmk_stubs
+
+cmk_stubs.install()
+
+from cmk_addons.plugins.rnx_updu.special_agent import snmp_v2c  # noqa: E402
+from cmk_addons.plugins.rnx_updu.special_agent.snmp_v2c import OID, Message, Value  # noqa: E402
+
+
+class Walk:
+    """The sorted OIDs and values of one snmprec file."""
+
+    def __init__(self, records: List[Tuple[OID, Value]]) -> None:
+        records.sort(key=lambda rec: rec[0])
+        self.oids = [oid for oid, _value in records]
+        self.values = [value for _oid, value in records]
+        self.index = {oid: pos for pos, oid in enumerate(self.oids)}
+
+    @classmethod
+    def load(cls, path: Path) -> 'Walk':
+        records = []
+        with open(path) as handle:
+            for line in handle:
+                line = line.rstrip('\n')
+                if not line or line.startswith('#'):
+                    continue
+                oid, oid_type, value = line.split('|', 2)
+                tag = snmp_v2c.SNMPREC_TYPES[oid_type.rstrip('x')]
+                if oid_type.endswith('x'):
+                    raw: object = bytes.fromhex(value)
+                elif tag == snmp_v2c.OBJECT_IDENTIFIER:
+                    raw = snmp_v2c.parse_oid(value)
+                elif tag == snmp_v2c.OCTET_STRING:
+                    raw = value.encode()
+                else:
+                    raw = value
+                records.append((snmp_v2c.parse_oid(oid), Value(tag, raw)))
+        return cls(records)
+
+    def get(self, oid: OID) -> Tuple[OID, Value]:
+        pos = self.index.get(oid)
+        if pos is None:
+            return oid, Value(snmp_v2c.NO_SUCH_OBJECT)
+        return oid, self.values[pos]
+
+    def get_next(self, oid: OID) -> Tuple[OID, Value]:
+        pos = bisect.bisect_right(self.oids, oid)
+        if pos >= len(self.oids):
+            return oid, Value(snmp_v2c.END_OF_MIB_VIEW)
+        return self.oids[pos], self.values[pos]
+
+
+def respond(walk: Walk, request: Message, max_size: int) -> Message:
+    varbinds = []
+    if request.pdu_type == snmp_v2c.GET_REQUEST:
+        varbinds = [walk.get(oid) for oid, _value in request.varbinds]
+    elif request.pdu_type == snmp_v2c.GET_NEXT_REQUEST:
+        varbinds = [walk.get_next(oid) for oid, _value in request.varbinds]
+    elif request.pdu_type == snmp_v2c.GET_BULK_REQUEST:
+        non_repeaters = max(request.field1, 0)
+        max_repetitions = max(request.field2, 0)
+        varbinds = [walk.get_next(oid) for oid, _value in request.varbinds[:non_repeaters]]
+        repeaters = [oid for oid, _value in request.varbinds[non_repeaters:]]
+        # Bulk responses are truncated to fit the maximum message size, as
+        # agents are allowed to (RFC 3416, 4.2.3)
+        size = 100
+        # Every repetition holds one value per repeater, endOfMibView included,
+        # so that the manager can map the values to its requested columns.
+        for _rep in range(max_repetitions):
+            if not repeaters:
+                break
+            row = [walk.get_next(oid) for oid in repeaters]
+            size += sum(len(snmp_v2c.encode_value(value)) + len(oid) + 6 for oid, value in row)
+            if size > max_size and varbinds:
+                break
+            varbinds.extend(row)
+            if all(value.tag == snmp_v2c.END_OF_MIB_VIEW for _oid, value in row):
+                break
+            repeaters = [oid for oid, _value in row]
+    return Message(request.community, snmp_v2c.RESPONSE, request.request_id, 0, 0, varbinds)
+
+
+class AgentProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, walks: Dict[bytes, Walk], default: Optional[Walk], max_size: int, delay: float) -> None:
+        self.walks = walks
+        self.default = default
+        self.max_size = max_size
+        self.delay = delay
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.requests = 0
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        try:
+            request = snmp_v2c.decode_message(data)
+        except (ValueError, IndexError):
+            return
+        walk = self.walks.get(request.community, self.default)
+        if walk is None:
+            return
+        self.requests += 1
+        response = snmp_v2c.encode_message(respond(walk, request, self.max_size))
+        if self.delay:
+            asyncio.get_running_loop().call_later(self.delay, self.transport.sendto, response, addr)
+        else:
+            self.transport.sendto(response, addr)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    walks = {}
+    for path in map(Path, args.walks):
+        walks[path.stem.encode()] = Walk.load(path)
+        print(f'{path}: {len(walks[path.stem.encode()].oids)} OIDs, community "{path.stem}"')
+    # With a single file any community is accepted
+    default = next(iter(walks.values())) if len(walks) == 1 else None
+
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        lambda: AgentProtocol(walks, default, args.max_size, args.delay / 1000),
+        local_addr=(args.address, args.port),
+    )
+    print(f'Listening on udp:{args.address}:{args.port}')
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        transport.close()
+        print(f'Answered {protocol.requests} requests')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('walks', nargs='+', help='snmprec files to serve')
+    parser.add_argument('--address', default='127.0.0.1', help='address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=1161, help='UDP port (default: %(default)s)')
+    parser.add_argument('--max-size', type=int, default=1472,
+                        help='maximum size of a response in bytes, an Ethernet MTU by default (default: %(default)s)')
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help='milliseconds the device takes to answer a request (default: %(default)s)')
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+# Agent sections of the special agent agent_rnx_updu. The special agent walks
+# the same SNMP trees as the SNMP sections of this package and writes them as
+#
+#   <<<rnx_updu_section_power_input_agent:sep(9)>>>
+#   <tree index>\t<column>\t<column>...
+#
+# The rows are split into the per-tree tables again and handed to the parse
+# function of the SNMP section, the parsed sections are the same for both ways
+# of monitoring an UPDU.
+#
+# The special agent also writes the section rnx_updu_agent_status for the host
+# of the rule, with the devices it could not walk, checked by the service
+# "RNX UPDU special agent" below.
+
+from typing import Any, Dict, List, NamedTuple
+
+from cmk.agent_based.v2 import (
+    AgentSection,
+    CheckPlugin,
+    CheckResult,
+    DiscoveryResult,
+    Result,
+    Service,
+    State,
+    StringTable,
+)
+
+from cmk_addons.plugins.rnx_updu.agent_based import (
+    rnx_updu_interfaces as _interfaces,
+    rnx_updu_inventory as _inventory,
+    rnx_updu_pdu as _pdu,
+    rnx_updu_power as _power,
+    rnx_updu_sensors as _sensors,
+)
+
+# The SNMP sections served by the special agent
+snmp_sections = [
+    _pdu.snmp_section_rnx_updu_pdu,
+    _power.snmp_section_rnx_updu_power_input_names,
+    _power.snmp_section_rnx_updu_power_input,
+    _power.snmp_section_rnx_updu_power_distribution_names,
+    _power.snmp_section_rnx_updu_power_distribution,
+    _power.snmp_section_rnx_updu_power_outlet_names,
+    _power.snmp_section_rnx_updu_power_outlet,
+    _sensors.snmp_section_rnx_updu,
+    _inventory.snmp_section_rnx_updu_inventory,
+    _interfaces.snmp_section_rnx_updu_interfaces,
+    _interfaces.snmp_section_rnx_updu_interfaces_counters,
+]
+
+
+def agent_section_name(snmp_section: Any) -> str:
+    return f'{snmp_section.name}_agent'
+
+
+def snmp_trees(snmp_section: Any) -> List:
+    return snmp_section.fetch if isinstance(snmp_section.fetch, list) else [snmp_section.fetch]
+
+
+# Agent section name -> SNMP trees to walk, used by the special agent
+agent_fetch: Dict[str, List] = {
+    agent_section_name(snmp_section): snmp_trees(snmp_section) for snmp_section in snmp_sections
+}
+
+
+def split_trees(string_table: StringTable, trees: int) -> List[StringTable]:
+    tables: List[StringTable] = [[] for _ in range(trees)]
+    for row in string_table:
+        tables[int(row[0])].append(row[1:])
+    return tables
+
+
+def agent_section(snmp_section: Any) -> AgentSection:
+    trees = len(snmp_trees(snmp_section))
+    parse_function = snmp_section.parse_function
+
+    def parse_agent_section(string_table: StringTable) -> Any:
+        return parse_function(split_trees(string_table, trees))
+
+    return AgentSection(
+        name=agent_section_name(snmp_section),
+        parsed_section_name=snmp_section.name,
+        parse_function=parse_agent_section,
+    )
+
+
+agent_section_rnx_updu_pdu = agent_section(_pdu.snmp_section_rnx_updu_pdu)
+agent_section_rnx_updu_power_input_names = agent_section(_power.snmp_section_rnx_updu_power_input_names)
+agent_section_rnx_updu_power_input = agent_section(_power.snmp_section_rnx_updu_power_input)
+agent_section_rnx_updu_power_distribution_names = agent_section(_power.snmp_section_rnx_updu_power_distribution_names)
+agent_section_rnx_updu_power_distribution = agent_section(_power.snmp_section_rnx_updu_power_distribution)
+agent_section_rnx_updu_power_outlet_names = agent_section(_power.snmp_section_rnx_updu_power_outlet_names)
+agent_section_rnx_updu_power_outlet = agent_section(_power.snmp_section_rnx_updu_power_outlet)
+agent_section_rnx_updu_sensor = agent_section(_sensors.snmp_section_rnx_updu)
+agent_section_rnx_updu_inventory = agent_section(_inventory.snmp_section_rnx_updu_inventory)
+agent_section_rnx_updu_interfaces = agent_section(_interfaces.snmp_section_rnx_updu_interfaces)
+agent_section_rnx_updu_interfaces_counters = agent_section(_interfaces.snmp_section_rnx_updu_interfaces_counters)
+
+
+#
+# STATUS OF THE SPECIAL AGENT
+#
+class DeviceStatus(NamedTuple):
+    name: str
+    address: str
+    error: str
+
+
+def parse_rnx_updu_agent_status(string_table: StringTable) -> List[DeviceStatus]:
+    # An error with a tab in it is cut there by sep(9), a missing one is empty
+    return [DeviceStatus(*(row + ['', ''])[:3]) for row in string_table if row]
+
+
+agent_section_rnx_updu_agent_status = AgentSection(
+    name='rnx_updu_agent_status',
+    parse_function=parse_rnx_updu_agent_status,
+)
+
+
+def discover_rnx_updu_agent_status(section: List[DeviceStatus]) -> DiscoveryResult:
+    yield Service()
+
+
+def check_rnx_updu_agent_status(section: List[DeviceStatus]) -> CheckResult:
+    """WARN for devices without data in the last run, CRIT when no device delivered any."""
+    failed = [device for device in section if device.error]
+    if not failed:
+        yield Result(state=State.OK, summary=f'{len(section)} devices polled')
+        return
+    state = State.CRIT if len(failed) == len(section) else State.WARN
+    yield Result(state=state, summary=f'{len(failed)} of {len(section)} devices without data: '
+                                      + ', '.join(device.name for device in failed))
+    for device in failed:
+        yield Result(state=State.OK, notice=f'{device.name} ({device.address}): {device.error}')
+
+
+check_plugin_rnx_updu_agent_status = CheckPlugin(
+    name='rnx_updu_agent_status',
+    service_name='RNX UPDU special agent',
+    discovery_function=discover_rnx_updu_agent_status,
+    check_function=check_rnx_updu_agent_status,
+)
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+# Energy services of the power objects. The ActiveEnergy counter is read with
+# the meter sections of rnx_updu_power.py; the average power between two
+# checks and the energy per hour, day and month are computed from the counter
+# in the value store. The meter sections may be fetched less often than the
+# services are checked, so the counter is only taken up when it changed: the
+# energy counted since the last change is spread evenly over the time since
+# then, and until the next change the last average power is shown again.
+# Averages and rollups are therefore as fine as the fetch interval of the
+# meter sections and the 1 Wh resolution of the counter, not finer.
+
+import time
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, List, Optional, Tuple
+
+from cmk.agent_based.v2 import (
+    CheckPlugin,
+    CheckResult,
+    DiscoveryResult,
+    Metric,
+    Result,
+    Service,
+    State,
+    get_value_store,
+)
+
+from cmk_addons.plugins.rnx_updu.agent_based.rnx_updu_power import (
+    PowerObject,
+    PowerSection,
+    input_names,
+    power_data,
+    power_item,
+    pwr_distribution_objs,
+    pwr_input_objs,
+    pwr_out_objs,
+)
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_mib import PduIdentity
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_perf import profiled
+
+# upduMib2<ObjectType>ActiveEnergy is an Unsigned32 in Wh
+ENERGY_WRAP = 2 ** 32
+
+# A decrease of the counter is taken as a wrap if the energy counted across
+# the wrap gives a plausible average power. Otherwise, and for implausible
+# increases, the counter was reset (e.g. a replaced module or a reset of the
+# counters on the unit).
+MAX_PLAUSIBLE_POWER = 100000.0  # W
+
+# Rollup periods: value store key, label of the running and of the last period
+ROLLUPS = [
+    ('hour', 'This hour', 'last hour'),
+    ('day', 'today', 'yesterday'),
+    ('month', 'this month', 'last month'),
+]
+
+
+def period_start(period: str, timestamp: float) -> float:
+    """Start of the hour, day or month containing the timestamp, in local time."""
+    tm = time.localtime(timestamp)
+    if period == 'hour':
+        fields = (tm.tm_year, tm.tm_mon, tm.tm_mday, tm.tm_hour)
+    elif period == 'day':
+        fields = (tm.tm_year, tm.tm_mon, tm.tm_mday, 0)
+    else:
+        fields = (tm.tm_year, tm.tm_mon, 1, 0)
+    return time.mktime(fields + (0, 0, 0, 0, -1))
+
+
+def energy_delta(last_energy: float, energy: float, interval: float) -> Optional[float]:
+    """Energy in Wh counted in the interval, None if the counter was reset."""
+    delta = energy - last_energy
+    if delta < 0:
+        delta += ENERGY_WRAP
+    if delta * 3600 / interval <= MAX_PLAUSIBLE_POWER:
+        return delta
+    return None
+
+
+def update_rollup(value_store: MutableMapping[str, Any], period: str, last_time: float, now: float,
+                  delta: float) -> Tuple[float, Optional[float]]:
+    """Add the energy of the interval to the running period, return its and the last period's Wh.
+
+    The value store holds (start, Wh, Wh of the last period) per period.
+    """
+    start = period_start(period, now)
+    state = value_store.get(period)
+    if state is None:
+        # Of the first period only the energy since its start is known
+        state = (start, 0.0, None)
+        delta *= min(1.0, (now - start) / (now - last_time))
+    running_start, running, last = state
+    if running_start != start:
+        # The part of the interval before the start of the new period closes
+        # the old one, which is the last period if no period was skipped
+        after = delta * min(1.0, (now - start) / (now - last_time))
+        last = running + delta - after if running_start == period_start(period, start - 1) else None
+        running, delta = 0.0, after
+    running += delta
+    value_store[period] = (start, running, last)
+    return running, last
+
+
+def rollup_results(running_texts: List[str], last_texts: List[str]) -> CheckResult:
+    yield Result(state=State.OK, summary=', '.join(running_texts))
+    if last_texts:
+        text = ', '.join(last_texts)
+        yield Result(state=State.OK, notice=text[0].upper() + text[1:])
+
+
+def check_energy(obj: PowerObject, value_store: MutableMapping[str, Any], now: float) -> CheckResult:
+    """Average power and rollups from the counter.
+
+    The value store holds (time of the last change, Wh, average W) of the
+    counter, the average is None until it changed twice.
+    """
+    energy = obj.energy
+    last_state = value_store.get('counter')
+    yield Metric('energy', energy)
+
+    if last_state is None or len(last_state) != 3:
+        value_store['counter'] = (now, energy, None)
+        yield Result(state=State.OK, summary='Energy counter initialized')
+        return
+    last_changed, last_energy, last_average = last_state
+
+    if energy == last_energy:
+        # A cached meter section or less than 1 Wh since the last change:
+        # counting the interval would give 0 W now and the energy of all the
+        # intervals at the next change
+        if last_average is not None:
+            yield Result(state=State.OK, summary=f'Average power: {last_average:.1f} W')
+            yield Metric('power', last_average)
+        running_texts = []
+        last_texts = []
+        for period, running_label, last_label in ROLLUPS:
+            if period not in value_store:
+                continue
+            _start, running, last = value_store[period]
+            running_texts.append(f'{running_label}: {running / 1000:.3f} kWh')
+            if last is not None:
+                last_texts.append(f'{last_label}: {last / 1000:.3f} kWh')
+            yield Metric(f'energy_{period}', running / 1000)
+        if running_texts:
+            yield from rollup_results(running_texts, last_texts)
+        elif last_average is None:
+            yield Result(state=State.OK, summary='Waiting for the energy counter to change')
+        return
+    if now <= last_changed:
+        return
+
+    delta = energy_delta(last_energy, energy, now - last_changed)
+    if delta is None:
+        value_store['counter'] = (now, energy, None)
+        yield Result(state=State.OK, summary='Energy counter was reset')
+        return
+
+    average = delta * 3600 / (now - last_changed)
+    value_store['counter'] = (now, energy, average)
+    yield Result(state=State.OK, summary=f'Average power: {average:.1f} W')
+    yield Metric('power', average)
+
+    running_texts = []
+    last_texts = []
+    for period, running_label, last_label in ROLLUPS:
+        running, last = update_rollup(value_store, period, last_changed, now, delta)
+        running_texts.append(f'{running_label}: {running / 1000:.3f} kWh')
+        if last is not None:
+            last_texts.append(f'{last_label}: {last / 1000:.3f} kWh')
+        yield Metric(f'energy_{period}', running / 1000)
+    yield from rollup_results(running_texts, last_texts)
+
+
+def discover_energy(params: Mapping[str, Any], names: Optional[Mapping], meters: Optional[PowerSection],
+                    objs: List) -> DiscoveryResult:
+    # Energy services are opt-in per tier in the discovery rule
+    enabled = [(index, what) for index, what in objs if what in params.get('energy', [])]
+    for key in power_data(names, meters, enabled):
+        yield Service(item=key)
+
+
+def check_energy_item(item: str, names: Optional[Mapping], meters: Optional[PowerSection],
+                      objs: List) -> CheckResult:
+    obj = power_item(item, names, meters, objs)
+    if obj is not None:
+        yield from check_energy(obj, get_value_store(), time.time())
+
+
+#
+# ENERGY IN
+#
+@profiled
+def discover_rnx_updu_energy_in(
+    params: Mapping[str, Any],
+    section_rnx_updu_section_pdu: Optional[Dict[str, PduIdentity]],
+    section_rnx_updu_section_power_input_names: Optional[PowerSection],
+    section_rnx_updu_section_power_input: Optional[PowerSection],
+) -> DiscoveryResult:
+    names = input_names(section_rnx_updu_section_pdu, section_rnx_updu_section_power_input_names)
+    yield from discover_energy(params, names, section_rnx_updu_section_power_input, pwr_input_objs)
+
+
+@profiled
+def check_rnx_updu_energy_in(
+    item: str,
+    section_rnx_updu_section_pdu: Optional[Dict[str, PduIdentity]],
+    section_rnx_updu_section_power_input_names: Optional[PowerSection],
+    section_rnx_updu_section_power_input: Optional[PowerSection],
+) -> CheckResult:
+    names = input_names(section_rnx_updu_section_pdu, section_rnx_updu_section_power_input_names)
+    yield from check_energy_item(item, names, section_rnx_updu_section_power_input, pwr_input_objs)
+
+
+check_plugin_rnx_updu_energy_in = CheckPlugin(
+    name='rnx_updu_energy_in',
+    sections=['rnx_updu_section_pdu', 'rnx_updu_section_power_input_names', 'rnx_updu_section_power_input'],
+    service_name='Energy %s',
+    discovery_function=discover_rnx_updu_energy_in,
+    discovery_ruleset_name='rnx_updu_discovery',
+    discovery_default_parameters={'energy': []},
+    check_function=check_rnx_updu_energy_in,
+)
+
+
+#
+# ENERGY DISTRIBUTION
+#
+@profiled
+def discover_rnx_updu_energy_distribution(
+    params: Mapping[str, Any],
+    section_rnx_updu_section_power_distribution_names: Optional[PowerSection],
+    section_rnx_updu_section_power_distribution: Optional[PowerSection],
+) -> DiscoveryResult:
+    yield from discover_energy(params, section_rnx_updu_section_power_distribution_names,
+                               section_rnx_updu_section_power_distribution, pwr_distribution_objs)
+
+
+@profiled
+def check_rnx_updu_energy_distribution(
+    item: str,
+    section_rnx_updu_section_power_distribution_names: Optional[PowerSection],
+    section_rnx_updu_section_power_distribution: Optional[PowerSection],
+) -> CheckResult:
+    yield from check_energy_item(item, section_rnx_updu_section_power_distribution_names,
+                                 section_rnx_updu_section_power_distribution, pwr_distribution_objs)
+
+
+check_plugin_rnx_updu_energy_distribution = CheckPlugin(
+    name='rnx_updu_energy_distribution',
+    sections=['rnx_updu_section_power_distribution_names', 'rnx_updu_section_power_distribution'],
+    service_name='Energy %s',
+    discovery_function=discover_rnx_updu_energy_distribution,
+    discovery_ruleset_name='rnx_updu_discovery',
+    discovery_default_parameters={'energy': []},
+    check_function=check_rnx_updu_energy_distribution,
+)
+
+
+#
+# ENERGY OUT
+#
+@profiled
+def discover_rnx_updu_energy_out(
+    params: Mapping[str, Any],
+    section_rnx_updu_section_power_outlet_names: Optional[PowerSection],
+    section_rnx_updu_section_power_outlet: Optional[PowerSection],
+) -> DiscoveryResult:
+    yield from discover_energy(params, section_rnx_updu_section_power_outlet_names,
+                               section_rnx_updu_section_power_outlet, pwr_out_objs)
+
+
+@profiled
+def check_rnx_updu_energy_out(
+    item: str,
+    section_rnx_updu_section_power_outlet_names: Optional[PowerSection],
+    section_rnx_updu_section_power_outlet: Optional[PowerSection],
+) -> CheckResult:
+    yield from check_energy_item(item, section_rnx_updu_section_power_outlet_names,
+                                 section_rnx_updu_section_power_outlet, pwr_out_objs)
+
+
+check_plugin_rnx_updu_energy_out = CheckPlugin(
+    name='rnx_updu_energy_out',
+    sections=['rnx_updu_section_power_outlet_names', 'rnx_updu_section_power_outlet'],
+    service_name='Energy %s',
+    discovery_function=discover_rnx_updu_energy_out,
+    discovery_ruleset_name='rnx_updu_discovery',
+    discovery_default_parameters={'energy': []},
+    check_function=check_rnx_updu_energy_out,
+)
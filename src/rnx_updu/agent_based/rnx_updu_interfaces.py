@@ -1,14 +1,16 @@
 #!/usr/bin/env python3
 # Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
 
-from typing import List, Dict, Any
-from collections.abc import Mapping
+import time
+from typing import List, Dict, Any, Optional
+from collections.abc import Mapping, MutableMapping
 
 from cmk.agent_based.v2 import (
     CheckResult,
     DiscoveryResult,
     InventoryPlugin,
     InventoryResult,
+    OIDEnd,
     Result,
     Service,
     SNMPSection,
@@ -17,79 +19,69 @@ from cmk.agent_based.v2 import (
     StringTable,
     TableRow,
     CheckPlugin,
-    startswith,
+    check_levels,
+    get_value_store,
+    render,
 )
 
-try:
-    from cmk.ccc import debug
-except ImportError:
-    from cmk.utils import debug
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_mib import DETECT_RNX_UPDU
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_log import PluginLog
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_perf import parse_stats, profiled
 
+_log = PluginLog('interfaces')
 
+
+@profiled
+@parse_stats()
 def parse_rnx_updu_interfaces(string_table: List[StringTable]) -> Dict[str, Any]:
     """Parse network interface data from RNX UPDUs using standard IF-MIB."""
-    if debug.enabled():
-        print(f"interfaces.parse: received string_table with {len(string_table)} tables")
-        for i, table in enumerate(string_table):
-            print(f"interfaces.parse: table {i} has {len(table)} rows")
-            if len(table) > 0:
-                print(f"interfaces.parse: table {i} first row: {table[0]}")
+    log = _log.call()
+    if log:
+        log.debug('parse: rows per table: %s', [len(table) for table in string_table])
 
-    section = {}
+    # The interfaces by ifIndex for the inventory, and by their description,
+    # the service item, for the checks
+    section = {'interfaces': {}, 'items': {}}
+    interfaces = section['interfaces']
 
-    # Parse interface table (table 0) 
+    # Parse interface table (table 0)
     if len(string_table) > 0 and len(string_table[0]) > 0:
         for row_idx, row in enumerate(string_table[0]):
-            if len(row) >= 6:  # Minimum required fields
-                if_index = row[0]
-                if_descr = row[1] if len(row) > 1 else f"Interface {if_index}"
-                if_type = row[2] if len(row) > 2 else "1"
-                if_mtu = row[3] if len(row) > 3 else "1500"
-                if_speed = row[4] if len(row) > 4 else "0"
-                if_admin_status = row[5] if len(row) > 5 else "1"
-                if_oper_status = row[6] if len(row) > 6 else "1"
-
-                if debug.enabled():
-                    print(f"interfaces.parse: Interface {if_index}: {if_descr} "
-                          f"type={if_type} admin={if_admin_status} oper={if_oper_status}")
+            if len(row) >= 5:  # Minimum required fields
+                if_index, if_descr, if_type, if_mtu, if_speed = row[:5]
 
                 # Process all interface types (not just Ethernet)
                 # Common types: 1=other, 6=ethernetCsmacd, 24=softwareLoopback, 117=gigabitEthernet
                 interface_key = f"if_{if_index}"
 
-                section[interface_key] = {
+                interfaces[interface_key] = {
                     'index': int(if_index) if if_index.isdigit() else 0,
                     'description': if_descr.strip(),
                     'type': int(if_type) if if_type.isdigit() else 1,
                     'mtu': int(if_mtu) if if_mtu.isdigit() else 1500,
                     'speed': int(if_speed) if if_speed.isdigit() else 0,
-                    'admin_status': int(if_admin_status) if if_admin_status.isdigit() else 1,
-                    'oper_status': int(if_oper_status) if if_oper_status.isdigit() else 1,
                 }
 
-                if debug.enabled():
-                    print(f"interfaces.parse: added interface {interface_key} with data {section[interface_key]}")
-    
-    else:
-        if debug.enabled():
-            print("interfaces.parse: No interface data found in string_table")
+                # Interfaces sharing a description share the item, the first one is checked
+                section['items'].setdefault(interfaces[interface_key]['description'], interfaces[interface_key])
 
-    if debug.enabled():
-        print(f"interfaces.parse: Found {len(section)} interfaces total")
-        
-    return section
+                if log:
+                    log.row('parse: added interface %s: %s', interface_key, interfaces[interface_key])
 
+    if log:
+        log.done()
+        log.debug('parse: found %d interfaces', len(interfaces))
+
+    return section
 
-# Test with simpler detection first
-def _detect_if_mib_exists(oid_values):
-    """Check if standard IF-MIB exists."""
-    return oid_values['.1.3.6.1.2.1.1.1.0'].startswith('RNX UPDU')
 
-# SNMP Section for network interfaces using standard IF-MIB
+# SNMP Section for network interfaces using standard IF-MIB, the descriptive
+# columns of the ifTable for both the checks and the inventory. The status is
+# in the counters section below, which is fetched every cycle.
 snmp_section_rnx_updu_interfaces = SNMPSection(
     name='rnx_updu_interfaces_section',
     # More permissive detection - any device that starts with RNX UPDU
-    detect=startswith('.1.3.6.1.2.1.1.1.0', 'RNX UPDU'),
+    detect=DETECT_RNX_UPDU,
     parse_function=parse_rnx_updu_interfaces,
     fetch=[
         # Interface table from IF-MIB - simplified to minimum required
@@ -100,23 +92,98 @@ snmp_section_rnx_updu_interfaces = SNMPSection(
                 '2',   # ifDescr - required for description
                 '3',   # ifType - helps identify interface type
                 '4',   # ifMtu - optional but useful
-                '5',   # ifSpeed - optional but useful  
-                '7',   # ifAdminStatus - required for status
-                '8',   # ifOperStatus - required for status
+                '5',   # ifSpeed - optional but useful
             ],
         ),
     ],
 )
 
 
-def inventory_rnx_updu_interfaces(section: Dict[str, Any]) -> InventoryResult:
+def _counter(value: str) -> Optional[int]:
+    return int(value) if value.isdigit() else None
+
+
+@profiled
+@parse_stats()
+def parse_rnx_updu_interfaces_counters(string_table: List[StringTable]) -> Dict[str, Dict[str, Optional[int]]]:
+    """Parse the per-cycle status and counters of the interfaces by ifIndex."""
+    section: Dict[str, Dict[str, Optional[int]]] = {}
+
+    # ifTable (table 0): status, errors and discards (Counter32)
+    for if_index, admin, oper, in_discards, in_errors, out_discards, out_errors in string_table[0]:
+        section[if_index] = {
+            'admin_status': _counter(admin),
+            'oper_status': _counter(oper),
+            'in_discards': _counter(in_discards),
+            'in_errors': _counter(in_errors),
+            'out_discards': _counter(out_discards),
+            'out_errors': _counter(out_errors),
+        }
+
+    # ifXTable (table 1): octets (Counter64) and speed in Mbit/s
+    for if_index, in_octets, out_octets, high_speed in string_table[1]:
+        counters = section.setdefault(if_index, {})
+        counters['in_octets'] = _counter(in_octets)
+        counters['out_octets'] = _counter(out_octets)
+        counters['high_speed'] = _counter(high_speed)
+
+    log = _log.call()
+    if log:
+        log.debug('parse_counters: found counters of %d interfaces', len(section))
+
+    return section
+
+
+# The counters change with every check and are fetched each cycle, the
+# descriptive columns above rarely change and can be given a long fetch
+# interval with the rule "Fetch intervals for SNMP sections".
+snmp_section_rnx_updu_interfaces_counters = SNMPSection(
+    name='rnx_updu_interfaces_counters_section',
+    detect=DETECT_RNX_UPDU,
+    parse_function=parse_rnx_updu_interfaces_counters,
+    fetch=[
+        SNMPTree(
+            base='.1.3.6.1.2.1.2.2.1',  # ifTable
+            oids=[
+                OIDEnd(),  # ifIndex
+                '7',   # ifAdminStatus
+                '8',   # ifOperStatus
+                '13',  # ifInDiscards
+                '14',  # ifInErrors
+                '19',  # ifOutDiscards
+                '20',  # ifOutErrors
+            ],
+        ),
+        SNMPTree(
+            base='.1.3.6.1.2.1.31.1.1.1',  # ifXTable
+            oids=[
+                OIDEnd(),  # ifIndex
+                '6',   # ifHCInOctets
+                '10',  # ifHCOutOctets
+                '15',  # ifHighSpeed
+            ],
+        ),
+    ],
+)
+
+
+@profiled
+def inventory_rnx_updu_interfaces(
+    section_rnx_updu_interfaces_section: Optional[Dict[str, Any]],
+    section_rnx_updu_interfaces_counters_section: Optional[Dict[str, Dict[str, Optional[int]]]],
+) -> InventoryResult:
     """Generate inventory data for RNX UPDU network interfaces."""
-    if debug.enabled():
-        print(f"interfaces.inventory: processing section with {len(section)} interfaces")
+    section = section_rnx_updu_interfaces_section
+    if section is None:
+        return
+    status = section_rnx_updu_interfaces_counters_section or {}
+    log = _log.call()
+    if log:
+        log.debug('inventory: %d interfaces', len(section['interfaces']))
 
-    for interface_key, interface_data in section.items():
-        if debug.enabled():
-            print(f"interfaces.inventory: processing interface {interface_key} with data {interface_data}")
+    for interface_key, interface_data in section['interfaces'].items():
+        if log:
+            log.row('inventory: interface %s: %s', interface_key, interface_data)
 
         # Interface type mapping (expanded)
         type_mapping = {
@@ -149,8 +216,9 @@ def inventory_rnx_updu_interfaces(section: Dict[str, Any]) -> InventoryResult:
             7: 'lowerLayerDown',
         }
 
-        admin_status = admin_status_mapping.get(interface_data.get('admin_status', 0), 'unknown')
-        oper_status = oper_status_mapping.get(interface_data.get('oper_status', 0), 'unknown')
+        counters = status.get(str(interface_data['index']), {})
+        admin_status = admin_status_mapping.get(counters.get('admin_status'), 'unknown')
+        oper_status = oper_status_mapping.get(counters.get('oper_status'), 'unknown')
 
         # Speed in readable format
         speed = interface_data.get('speed', 0)
@@ -179,13 +247,13 @@ def inventory_rnx_updu_interfaces(section: Dict[str, Any]) -> InventoryResult:
             }
         )
 
-        if debug.enabled():
-            print(f"interfaces.inventory: generated inventory data for interface {interface_key}")
+    if log:
+        log.done()
 
 
 inventory_plugin_rnx_updu_interfaces = InventoryPlugin(
     name='rnx_updu_interfaces',
-    sections=['rnx_updu_interfaces_section'],
+    sections=['rnx_updu_interfaces_section', 'rnx_updu_interfaces_counters_section'],
     inventory_function=inventory_rnx_updu_interfaces,
 )
 
@@ -205,25 +273,104 @@ def get_interface_state(admin_status: int, oper_status: int) -> tuple[State, str
         return State.UNKNOWN, f"unknown state (admin: {admin_status}, oper: {oper_status})"
 
 
-def discover_rnx_updu_interfaces(section: Dict[str, Any]) -> DiscoveryResult:
+@profiled
+def discover_rnx_updu_interfaces(
+    section_rnx_updu_interfaces_section: Optional[Dict[str, Any]],
+    section_rnx_updu_interfaces_counters_section: Optional[Dict[str, Dict[str, Optional[int]]]],
+) -> DiscoveryResult:
     """Discover network interfaces for monitoring."""
-    for interface_key, interface_data in section.items():
-        interface_desc = interface_data.get('description', interface_key)
-        yield Service(item=interface_desc)
-
+    if section_rnx_updu_interfaces_section is None:
+        return
+    for item in section_rnx_updu_interfaces_section['items']:
+        yield Service(item=item)
+
+
+# Counters and their width. A Counter32 that went backwards has wrapped, a
+# Counter64 does not wrap in practice and was reset by a restart of the device.
+COUNTER_BITS = {
+    'in_octets': 64,
+    'out_octets': 64,
+    'in_errors': 32,
+    'out_errors': 32,
+    'in_discards': 32,
+    'out_discards': 32,
+}
+
+
+def counter_rate(value_store: MutableMapping[str, Any], key: str, now: float, value: int, bits: int) -> Optional[float]:
+    """Per-second rate of a counter since the last check, None on the first check or after a reset."""
+    last = value_store.get(key)
+    value_store[key] = (now, value)
+    if last is None:
+        return None
+    last_time, last_value = last
+    if now <= last_time:
+        return None
+    delta = value - last_value
+    if delta < 0:
+        if bits == 64:
+            return None
+        delta += 2 ** bits
+    return delta / (now - last_time)
+
+
+def check_interface_counters(params: Mapping[str, Any], counters: Mapping[str, Optional[int]],
+                             speed: int) -> CheckResult:
+    """Bandwidth, error and discard rates of an interface."""
+    value_store = get_value_store()
+    now = time.time()
+    rates = {}
+    for name, bits in COUNTER_BITS.items():
+        value = counters.get(name)
+        if value is not None:
+            rates[name] = counter_rate(value_store, name, now, value, bits)
+
+    for direction, label in (('in', 'In'), ('out', 'Out')):
+        rate = rates.get(f'{direction}_octets')
+        if rate is None:
+            continue
+        # In octets per second like the metrics of the Checkmk interface
+        # checks, render.nicspeed shows them in bit/s
+        octet_speed = speed / 8
+        levels = None
+        if speed > 0:
+            warn, crit = params['bandwidth']
+            levels = ('fixed', (octet_speed * warn / 100, octet_speed * crit / 100))
+        yield from check_levels(
+            rate,
+            levels_upper=levels,
+            metric_name=f'if_{direction}_octets',
+            render_func=render.nicspeed,
+            label=label,
+            boundaries=(0, octet_speed) if speed > 0 else None,
+        )
 
+    for kind, levels_key in (('errors', 'error_rate'), ('discards', 'discard_rate')):
+        for direction, label in (('in', 'Input'), ('out', 'Output')):
+            rate = rates.get(f'{direction}_{kind}')
+            if rate is None:
+                continue
+            yield from check_levels(
+                rate,
+                levels_upper=('fixed', params[levels_key]),
+                metric_name=f'if_{direction}_{kind}',
+                render_func=lambda value: f"{value:.2f}/s",
+                label=f'{label} {kind}',
+                notice_only=True,
+            )
+
+
+@profiled
 def check_rnx_updu_interfaces(
-    item: str, params: Mapping[str, Any], section: Dict[str, Any]
+    item: str,
+    params: Mapping[str, Any],
+    section_rnx_updu_interfaces_section: Optional[Dict[str, Any]],
+    section_rnx_updu_interfaces_counters_section: Optional[Dict[str, Dict[str, Optional[int]]]],
 ) -> CheckResult:
-    """Check the status of network interfaces."""
-
-    # Find the interface by description
-    interface_data = None
-    for key, data in section.items():
-        if data.get('description', key) == item:
-            interface_data = data
-            break
+    """Check the status, traffic and errors of network interfaces."""
+    section = section_rnx_updu_interfaces_section or {'items': {}}
 
+    interface_data = section['items'].get(item)
     if not interface_data:
         yield Result(
             state=State.UNKNOWN,
@@ -231,8 +378,10 @@ def check_rnx_updu_interfaces(
         )
         return
 
-    admin_status = interface_data.get('admin_status', 0)
-    oper_status = interface_data.get('oper_status', 0)
+    # The status is taken from the counters, which are fetched every cycle
+    counters = (section_rnx_updu_interfaces_counters_section or {}).get(str(interface_data['index']), {})
+    admin_status = counters.get('admin_status') or 0
+    oper_status = counters.get('oper_status') or 0
 
     state, status_text = get_interface_state(admin_status, oper_status)
 
@@ -242,8 +391,8 @@ def check_rnx_updu_interfaces(
         summary=f"Status: {status_text}"
     )
 
-    # Speed information
-    speed = interface_data.get('speed', 0)
+    # Speed information, ifSpeed saturates above 4.29 Gbit/s
+    speed = (counters.get('high_speed') or 0) * 1000000 or interface_data.get('speed', 0)
     if speed > 0:
         if speed >= 1000000000:
             speed_str = f"{speed // 1000000000} Gbps"
@@ -265,37 +414,19 @@ def check_rnx_updu_interfaces(
             summary=f"MTU: {mtu}"
         )
 
-    # Error statistics (if available)
-    in_errors = interface_data.get('in_errors', 0)
-    out_errors = interface_data.get('out_errors', 0)
-
-    if in_errors > 0 or out_errors > 0:
-        error_state = State.WARN if (in_errors + out_errors) < params.get('error_threshold', 100) else State.CRIT
-        yield Result(
-            state=error_state,
-            summary=f"Errors: {in_errors} in, {out_errors} out"
-        )
-
-    # Discard statistics (if available)
-    in_discards = interface_data.get('in_discards', 0)
-    out_discards = interface_data.get('out_discards', 0)
-
-    if in_discards > 0 or out_discards > 0:
-        discard_state = State.WARN if (in_discards + out_discards) < params.get('discard_threshold', 100) else State.CRIT
-        yield Result(
-            state=discard_state,
-            summary=f"Discards: {in_discards} in, {out_discards} out"
-        )
+    if counters:
+        yield from check_interface_counters(params, counters, speed)
 
 
 check_plugin_rnx_updu_interfaces = CheckPlugin(
     name='rnx_updu_interfaces',
-    sections=['rnx_updu_interfaces_section'],
+    sections=['rnx_updu_interfaces_section', 'rnx_updu_interfaces_counters_section'],
     service_name='Interface %s',
     discovery_function=discover_rnx_updu_interfaces,
     check_function=check_rnx_updu_interfaces,
     check_default_parameters={
-        'error_threshold': 100,
-        'discard_threshold': 100,
+        'bandwidth': (80.0, 90.0),     # % of the interface speed
+        'error_rate': (0.01, 1.0),     # errors per second
+        'discard_rate': (0.01, 1.0),   # discards per second
     },
 )
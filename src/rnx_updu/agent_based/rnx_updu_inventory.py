@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
 
-from typing import List
+from typing import Dict, List, Optional
 
 from cmk.agent_based.v2 import (
     Attributes,
@@ -11,96 +11,64 @@ from cmk.agent_based.v2 import (
     SNMPTree,
     StringTable,
     TableRow,
-    startswith,
 )
 
-try:
-    from cmk.ccc import debug
-except ImportError:
-    from cmk.utils import debug
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_mib import DETECT_RNX_UPDU, ICM_TABLE, MODULE_TABLE, PduIdentity
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_log import PluginLog
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_perf import parse_stats, profiled
 
+_log = PluginLog('inventory')
 
+
+@profiled
+@parse_stats()
 def parse_rnx_updu_inventory(string_table: List[StringTable]):
-    """Parse device identification data from RNX UPDUs."""
-    if debug.enabled():
-        print(f"inventory.parse: received string_table with {len(string_table)} tables")
-        for i, table in enumerate(string_table):
-            print(f"inventory.parse: table {i} has {len(table)} rows")
+    """Parse ICM firmware and module data from RNX UPDUs."""
+    log = _log.call()
+    if log:
+        log.debug('parse: rows per table: %s', [len(table) for table in string_table])
 
     section = {}
 
-    # Parse PDU information (table 0)
+    # Parse ICM information (table 0) for firmware data, the PDU identity is
+    # in the section rnx_updu_section_pdu
     if len(string_table) > 0 and len(string_table[0]) > 0:
         for row_idx, row in enumerate(string_table[0]):
-            if len(row) >= 6:  # Ensure we have all required PDU fields
-                (system_name, custom_name, description, serial_number, part_number, lot_number) = row[:6]
-
-                if debug.enabled():
-                    print(f"inventory.parse: PDU row {row_idx}: system={system_name} custom={custom_name} "
-                          f"desc={description} serial={serial_number} part={part_number} lot={lot_number}")
-
-                # Use PDU index as device key (PDU table should only have one entry)
-                device_key = f"pdu_{row_idx + 1}"
-
-                section[device_key] = {
-                    'type': 'PDU',
-                    'system_name': system_name.strip(),
-                    'custom_name': custom_name.strip(),
-                    'description': description.strip(),
-                    'serial_number': serial_number.strip(),
-                    'part_number': part_number.strip(),
-                    'lot_number': lot_number.strip(),
-                    'firmware_version': '',  # Will be filled from ICM data
-                }
-
-                if debug.enabled():
-                    print(f"inventory.parse: added PDU {device_key} with data {section[device_key]}")
-    # Parse ICM information (table 1) for firmware data
-    if len(string_table) > 1 and len(string_table[1]) > 0:
-        for row_idx, row in enumerate(string_table[1]):
             if len(row) >= 5:  # Ensure we have all required ICM fields
                 (icm_system_name, icm_serial_number, icm_part_number, icm_lot_number, icm_firmware) = row[:5]
 
-                if debug.enabled():
-                    print(f"inventory.parse: ICM row {row_idx}: system={icm_system_name} serial={icm_serial_number} "
-                          f"part={icm_part_number} lot={icm_lot_number} firmware={icm_firmware}")
-
                 # Add ICM firmware info to PDU data (assuming one ICM per PDU)
                 pdu_key = f"pdu_{row_idx + 1}"
-                if pdu_key in section:
-                    section[pdu_key]['firmware_version'] = icm_firmware.strip()
-                    section[pdu_key]['icm_serial'] = icm_serial_number.strip()
-                    section[pdu_key]['icm_part_number'] = icm_part_number.strip()
-                    section[pdu_key]['icm_lot_number'] = icm_lot_number.strip()
-                    
-                    # Extract ICM revision from part number (e.g., "100-0141-3" -> revision 3)
-                    icm_revision = 0
-                    try:
-                        if '-' in icm_part_number:
-                            revision_part = icm_part_number.split('-')[-1]  # Last part after dash
-                            if revision_part.isdigit():
-                                icm_revision = int(revision_part)
-                    except (AttributeError, ValueError, IndexError):
-                        pass
-                    section[pdu_key]['icm_revision'] = icm_revision
+                section[pdu_key] = {
+                    'firmware_version': icm_firmware.strip(),
+                    'icm_serial': icm_serial_number.strip(),
+                    'icm_part_number': icm_part_number.strip(),
+                    'icm_lot_number': icm_lot_number.strip(),
+                }
+
+                # Extract ICM revision from part number (e.g., "100-0141-3" -> revision 3)
+                icm_revision = 0
+                try:
+                    if '-' in icm_part_number:
+                        revision_part = icm_part_number.split('-')[-1]  # Last part after dash
+                        if revision_part.isdigit():
+                            icm_revision = int(revision_part)
+                except (AttributeError, ValueError, IndexError):
+                    pass
+                section[pdu_key]['icm_revision'] = icm_revision
 
-                if debug.enabled():
-                    print(f"inventory.parse: updated {pdu_key} with ICM firmware data and revision {icm_revision}")
+                if log:
+                    log.row('parse: ICM %s: %s', pdu_key, section[pdu_key])
     
-    # Parse Module information (table 2) - POM modules
-    if len(string_table) > 2 and len(string_table[2]) > 0:
+    # Parse Module information (table 1) - POM modules
+    if len(string_table) > 1 and len(string_table[1]) > 0:
         section['modules'] = {}
-        for row_idx, row in enumerate(string_table[2]):
+        for row_idx, row in enumerate(string_table[1]):
             if len(row) >= 8:  # Ensure we have all required module fields
                 (module_system_name, module_serial_number, module_part_number, 
                  module_lot_number, module_rating, module_firmware, 
                  module_composed_name, module_object_path) = row[:8]
                 
-                if debug.enabled():
-                    print(f"inventory.parse: Module row {row_idx}: system={module_system_name} "
-                          f"serial={module_serial_number} part={module_part_number} "
-                          f"path={module_object_path}")
-                
                 # Extract phase information from object path
                 # ObjectPath format: "PDU/Inlet/WireL1/Module1" -> L1
                 phase = "Unknown"
@@ -138,40 +106,28 @@ def parse_rnx_updu_inventory(string_table: List[StringTable]):
                     'outlets': 8,  # RNX POM modules typically have 8 outlets
                     'revision': pom_revision,
                 }
-                
-                if debug.enabled():
-                    print(f"inventory.parse: added module {module_key} on phase {phase}")
+
+                if log:
+                    log.row('parse: module %s: %s', module_key, section['modules'][module_key])
     
     # Note: Revisions are now extracted from part numbers directly
     # No need for separate revision parsing from table 3
-    if debug.enabled():
-        print(f"inventory.parse: built section with {len(section)} devices: {list(section.keys())}")
-        if 'modules' in section:
-            print(f"inventory.parse: found {len(section['modules'])} modules")
+    if log:
+        log.done()
+        log.debug('parse: found %d ICMs and %d modules',
+                  len(section) - ('modules' in section), len(section.get('modules', ())))
     
     return section
 
 
 snmp_section_rnx_updu_inventory = SNMPSection(
     name='rnx_updu_inventory_section',
-    detect=startswith('.1.3.6.1.2.1.1.1.0', 'RNX UPDU'),
+    detect=DETECT_RNX_UPDU,
     parse_function=parse_rnx_updu_inventory,
     fetch=[
-        # PDU information
-        SNMPTree(
-            base='.1.3.6.1.4.1.55108.2.1.2.1',
-            oids=[
-                "2",   # upduMib2PDUSystemName
-                "3",   # upduMib2PDUCustomName
-                "4",   # upduMib2PDUDescription
-                "5",   # upduMib2PDUSerialNumber
-                "6",   # upduMib2PDUPartNumber
-                "7",   # upduMib2PDULotNumber
-            ],
-        ),
         # ICM information for firmware
         SNMPTree(
-            base='.1.3.6.1.4.1.55108.2.6.2.1',
+            base=ICM_TABLE,
             oids=[
                 "2",   # upduMib2ICMSystemName
                 "5",   # upduMib2ICMSerialNumber
@@ -182,7 +138,7 @@ snmp_section_rnx_updu_inventory = SNMPSection(
         ),
         # Module information (POM - Power Outlet Modules)
         SNMPTree(
-            base='.1.3.6.1.4.1.55108.2.8.2.1',
+            base=MODULE_TABLE,
             oids=[
                 "2",   # upduMib2ModuleSystemName
                 "5",   # upduMib2ModuleSerialNumber
@@ -198,14 +154,39 @@ snmp_section_rnx_updu_inventory = SNMPSection(
 )
 
 
-def inventory_rnx_updu(section) -> InventoryResult:
+def pdu_devices(section_pdu: Optional[Dict[str, PduIdentity]], section_inventory: Dict) -> Dict[str, Dict]:
+    """The PDUs of the shared PDU section with the firmware data of their ICM."""
+    devices = {}
+    # One ICM per PDU, matched by position
+    for row_idx, pdu in enumerate((section_pdu or {}).values()):
+        device_key = f"pdu_{row_idx + 1}"
+        devices[device_key] = {
+            'type': 'PDU',
+            'system_name': pdu.system_name.strip(),
+            'custom_name': pdu.custom_name.strip(),
+            'description': pdu.description.strip(),
+            'serial_number': pdu.serial_number.strip(),
+            'part_number': pdu.part_number.strip(),
+            'lot_number': pdu.lot_number.strip(),
+            'firmware_version': '',  # Filled from ICM data
+        }
+        devices[device_key].update(section_inventory.get(device_key, {}))
+    return devices
+
+
+@profiled
+def inventory_rnx_updu(section_rnx_updu_section_pdu: Optional[Dict[str, PduIdentity]],
+                       section_rnx_updu_inventory_section: Optional[Dict]) -> InventoryResult:
     """Generate inventory data for RNX UPDU devices."""
-    if debug.enabled():
-        print(f"inventory.inventory: processing section with {len(section)} devices")
+    section = section_rnx_updu_inventory_section or {}
+    devices = pdu_devices(section_rnx_updu_section_pdu, section)
+    log = _log.call()
+    if log:
+        log.debug('inventory: %d devices', len(devices))
 
-    for device_id, device_data in section.items():
-        if debug.enabled():
-            print(f"inventory.inventory: processing device {device_id} with data {device_data}")
+    for device_id, device_data in devices.items():
+        if log:
+            log.row('inventory: device %s: %s', device_id, device_data)
 
         # Determine device name and model
         device_name = device_data.get('custom_name') or device_data.get('system_name') or 'RNX UPDU'
@@ -249,15 +230,12 @@ def inventory_rnx_updu(section) -> InventoryResult:
                 }
             )
 
-        if debug.enabled():
-            print(f"inventory.inventory: generated inventory data for icm module {device_id}")
-    
     # Add detailed module information if available
     if 'modules' in section:
         for module_key, module_data in section['modules'].items():
-            if debug.enabled():
-                print(f"inventory.inventory: processing module {module_key} with data {module_data}")
-            
+            if log:
+                log.row('inventory: module %s: %s', module_key, module_data)
+
             # Hardware modules table
             yield TableRow(
                 path=['hardware', 'modules'],
@@ -295,13 +273,13 @@ def inventory_rnx_updu(section) -> InventoryResult:
                         'summary': f"Firmware for {module_data.get('type', 'Module')} on phase {module_data.get('phase', 'Unknown')}",
                     }
                 )
-            
-            if debug.enabled():
-                print(f"inventory.inventory: generated module inventory for {module_key}")
+
+    if log:
+        log.done()
 
 
 inventory_plugin_rnx_updu = InventoryPlugin(
     name='rnx_updu_inventory',
-    sections=['rnx_updu_inventory_section'],
+    sections=['rnx_updu_section_pdu', 'rnx_updu_inventory_section'],
     inventory_function=inventory_rnx_updu,
 )
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+from typing import Dict, List
+
+from cmk.agent_based.v2 import SNMPSection, SNMPTree, StringTable
+
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_mib import DETECT_RNX_UPDU, PDU_TABLE, PduIdentity, pdu_oids
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_perf import parse_stats, profiled
+
+
+@profiled
+@parse_stats(quality=7)
+def parse_rnx_updu_pdu(string_table: List[StringTable]) -> Dict[str, PduIdentity]:
+    """The identity of the PDUs by OID index, one per unit of a chain."""
+    return {row[0]: PduIdentity(*row) for row in string_table[0]}
+
+
+# The PDU table is read by the power and the inventory plugins, it is walked
+# once for both.
+snmp_section_rnx_updu_pdu = SNMPSection(
+    name='rnx_updu_section_pdu',
+    detect=DETECT_RNX_UPDU,
+    parse_function=parse_rnx_updu_pdu,
+    fetch=[SNMPTree(base=PDU_TABLE, oids=pdu_oids)],
+)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+# Phase balance of the PDUs, computed from the wires (phases) read with the
+# input sections of rnx_updu_power.py. The wires are grouped by their PDU in
+# one pass over the wire tier per fetch, shared by the services of all PDUs.
+# Each check derives the imbalance, the neutral current and the headroom of
+# each phase from the phase currents.
+
+import math
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Tuple
+
+from cmk.agent_based.v2 import (
+    CheckPlugin,
+    CheckResult,
+    DiscoveryResult,
+    Metric,
+    Result,
+    Service,
+    State,
+    check_levels,
+    render,
+)
+
+from cmk_addons.plugins.rnx_updu.agent_based.rnx_updu_power import (
+    PowerNames,
+    PowerSection,
+    pdu_item,
+    power_tiers,
+)
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_perf import profiled
+
+
+def group_phases(names: PowerNames, meters: Optional[PowerSection]) -> Dict[str, List[Tuple[str, float]]]:
+    """Phase and current in A of the wires of each PDU, in the order of the wire table."""
+    pdus: Dict[str, List[Tuple[str, float]]] = {}
+    if meters is None:
+        return pdus
+    tier = meters.get('wires')
+    if tier is None:
+        return pdus
+    for sysname, name in names.get('wires', {}).items():
+        row = tier.rows.get(name.index)
+        if row is None:
+            continue
+        # The ObjectPath ends with the wire, e.g. PDU/Inlet/WireL1
+        wire = name.path.split('/')[-1] or sysname
+        phase = wire[len('Wire'):] if wire.startswith('Wire') and len(wire) > len('Wire') else wire
+        pdus.setdefault(pdu_item(name), []).append((phase, tier.current[row] / 1000))
+    return pdus
+
+
+def phase_currents(names: Optional[PowerNames], meters: Optional[PowerSection]) -> Dict[str, List[Tuple[str, float]]]:
+    """The phases of each PDU, grouped once per fetch of the readings."""
+    if names is None:
+        return {}
+    return names.derived('phases', meters, group_phases)
+
+
+def imbalance(currents: List[float]) -> float:
+    """Largest deviation of a phase current from the average, in % of the average."""
+    average = sum(currents) / len(currents)
+    if average <= 0:
+        return 0.0
+    return max(abs(current - average) for current in currents) / average * 100
+
+
+def neutral_current(currents: List[float]) -> float:
+    """Current on the neutral of three phases 120° apart, assuming equal power factors."""
+    l1, l2, l3 = currents
+    return math.sqrt(max(0.0, l1 * l1 + l2 * l2 + l3 * l3 - l1 * l2 - l2 * l3 - l3 * l1))
+
+
+def check_phase_balance(params: Mapping[str, Any], phases: List[Tuple[str, float]]) -> CheckResult:
+    currents = [current for _phase, current in phases]
+    yield Result(state=State.OK, summary=', '.join(f'{phase}: {current:.2f} A' for phase, current in phases))
+
+    # A few amps more on one phase of an idle PDU are no imbalance worth a warning
+    average = sum(currents) / len(currents)
+    checked = average >= params['min_current']
+    yield from check_levels(
+        imbalance(currents),
+        levels_upper=params['imbalance'] if checked else None,
+        metric_name='phase_imbalance',
+        render_func=render.percent,
+        label='Imbalance',
+    )
+    if not checked:
+        yield Result(state=State.OK, notice=f'Imbalance not checked below {params["min_current"]:.1f} A per phase')
+
+    if len(currents) == 3:
+        yield from check_levels(
+            neutral_current(currents),
+            levels_upper=params.get('neutral_current'),
+            metric_name='neutral_current',
+            render_func=lambda value: f'{value:.2f} A',
+            label='Estimated neutral current',
+        )
+
+    # The wires do not report their rating, without it there is no headroom
+    rated = params.get('rated_current')
+    if not rated:
+        yield Result(state=State.OK, notice='Headroom not checked, no rated current configured')
+        return
+    headrooms = [(phase, rated - current) for phase, current in phases]
+    phase, lowest = min(headrooms, key=lambda headroom: headroom[1])
+    yield from check_levels(
+        lowest / rated * 100,
+        levels_lower=params['headroom'],
+        render_func=lambda value: f'{value * rated / 100:.2f} A ({render.percent(value)})',
+        label=f'Headroom of {phase}',
+    )
+    yield Result(state=State.OK, notice='Headroom: ' + ', '.join(f'{phase}: {headroom:.2f} A'
+                                                                 for phase, headroom in headrooms))
+    # The metrics are named by the position of the wire, whatever the wires
+    # are called, so that they match the graphing definitions
+    for position, (_phase, headroom) in enumerate(headrooms[:3], start=1):
+        yield Metric(f'headroom_l{position}', headroom, boundaries=(0, rated))
+
+
+@profiled
+def discover_rnx_updu_phase_balance(
+    params: Mapping[str, Any],
+    section_rnx_updu_section_power_input_names: Optional[PowerNames],
+    section_rnx_updu_section_power_input: Optional[PowerSection],
+) -> DiscoveryResult:
+    if 'wires' not in params['tiers']:
+        return
+    pdus = phase_currents(section_rnx_updu_section_power_input_names, section_rnx_updu_section_power_input)
+    for pdu, phases in pdus.items():
+        # Single phase PDUs have nothing to balance
+        if len(phases) > 1:
+            yield Service(item=pdu)
+
+
+@profiled
+def check_rnx_updu_phase_balance(
+    item: str,
+    params: Mapping[str, Any],
+    section_rnx_updu_section_power_input_names: Optional[PowerNames],
+    section_rnx_updu_section_power_input: Optional[PowerSection],
+) -> CheckResult:
+    pdus = phase_currents(section_rnx_updu_section_power_input_names, section_rnx_updu_section_power_input)
+    phases = pdus.get(item)
+    if phases:
+        yield from check_phase_balance(params, phases)
+
+
+check_plugin_rnx_updu_phase_balance = CheckPlugin(
+    name='rnx_updu_phase_balance',
+    sections=['rnx_updu_section_power_input_names', 'rnx_updu_section_power_input'],
+    service_name='Phase balance %s',
+    discovery_function=discover_rnx_updu_phase_balance,
+    discovery_ruleset_name='rnx_updu_discovery',
+    discovery_default_parameters={'tiers': power_tiers},
+    check_function=check_rnx_updu_phase_balance,
+    check_ruleset_name='rnx_updu_phase_balance',
+    check_default_parameters={
+        'imbalance': ('fixed', (15.0, 25.0)),  # % deviation from the average phase current
+        'min_current': 1.0,                    # A, average phase current below which the imbalance is not checked
+        'headroom': ('fixed', (20.0, 10.0)),   # % of the rated current left on the most loaded phase
+    },
+)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+# The service "RNX UPDU Plugin Performance" reports the parse time, the rows
+# per SNMPTree, the "No Data" rows and the approximate size of the sections of
+# this package on a host, as recorded by parse_stats (lib/rnx_updu_perf.py).
+#
+# It reads every section it reports, so Checkmk fetches all of them on hosts
+# with this service. It is therefore only discovered with "Plugin performance"
+# in the rule "RNX UPDU power discovery". The inventory section is not
+# covered, it is fetched with the inventory only.
+
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from cmk.agent_based.v2 import (
+    CheckPlugin,
+    CheckResult,
+    DiscoveryResult,
+    Metric,
+    Result,
+    Service,
+    State,
+    render,
+)
+
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_perf import approx_size, find_parse_stats, profiled
+
+# Sections reported by the service, in the order of the details
+SECTIONS = [
+    'rnx_updu_section_pdu',
+    'rnx_updu_section_power_input_names',
+    'rnx_updu_section_power_input',
+    'rnx_updu_section_power_distribution_names',
+    'rnx_updu_section_power_distribution',
+    'rnx_updu_section_power_outlet_names',
+    'rnx_updu_section_power_outlet',
+    'rnx_updu_section_sensor',
+    'rnx_updu_interfaces_section',
+    'rnx_updu_interfaces_counters_section',
+]
+
+
+def short_name(section_name: str) -> str:
+    """power_outlet for rnx_updu_section_power_outlet, interfaces for rnx_updu_interfaces_section."""
+    return section_name.replace('rnx_updu_section_', '').replace('rnx_updu_', '').replace('_section', '')
+
+
+def check_plugin_performance(sections: Mapping[str, Optional[Any]]) -> CheckResult:
+    total_seconds = 0.0
+    total_rows = 0
+    total_nodata = 0
+    details = []
+    metrics = []
+    for section_name in SECTIONS:
+        section = sections.get(section_name)
+        if section is None:
+            continue
+        stats = find_parse_stats(section)
+        if stats is None:
+            continue
+        name = short_name(section_name)
+        rows = sum(stats.rows)
+        nodata = stats.nodata
+        size = approx_size(section)
+        total_seconds += stats.seconds
+        total_rows += rows
+        details.append(f'{name}: {stats.seconds * 1000:.2f} ms, rows per table: '
+                       f'{"/".join(map(str, stats.rows))}, '
+                       f'No Data: {"n/a" if nodata is None else nodata}, size: {render.bytes(size)}')
+        metrics += [
+            Metric(f'parse_time_{name}', stats.seconds),
+            Metric(f'rows_{name}', rows),
+            Metric(f'section_size_{name}', size),
+        ]
+        if nodata is not None:
+            total_nodata += nodata
+            metrics.append(Metric(f'nodata_rows_{name}', nodata))
+    if not details:
+        return
+
+    yield Result(state=State.OK, summary=f'Parse time: {total_seconds * 1000:.2f} ms, {len(details)} sections, '
+                                         f'{total_rows} rows, {total_nodata} No Data')
+    yield Result(state=State.OK, notice='\n'.join(details))
+    yield Metric('parse_time', total_seconds)
+    yield from metrics
+
+
+@profiled
+def discover_rnx_updu_plugin_performance(
+    params: Mapping[str, Any],
+    section_rnx_updu_section_pdu: Optional[Any],
+    section_rnx_updu_section_power_input_names: Optional[Any],
+    section_rnx_updu_section_power_input: Optional[Any],
+    section_rnx_updu_section_power_distribution_names: Optional[Any],
+    section_rnx_updu_section_power_distribution: Optional[Any],
+    section_rnx_updu_section_power_outlet_names: Optional[Any],
+    section_rnx_updu_section_power_outlet: Optional[Any],
+    section_rnx_updu_section_sensor: Optional[Any],
+    section_rnx_updu_interfaces_section: Optional[Any],
+    section_rnx_updu_interfaces_counters_section: Optional[Any],
+) -> DiscoveryResult:
+    if params.get('plugin_performance') and section_rnx_updu_section_pdu is not None:
+        yield Service()
+
+
+@profiled
+def check_rnx_updu_plugin_performance(
+    section_rnx_updu_section_pdu: Optional[Any],
+    section_rnx_updu_section_power_input_names: Optional[Any],
+    section_rnx_updu_section_power_input: Optional[Any],
+    section_rnx_updu_section_power_distribution_names: Optional[Any],
+    section_rnx_updu_section_power_distribution: Optional[Any],
+    section_rnx_updu_section_power_outlet_names: Optional[Any],
+    section_rnx_updu_section_power_outlet: Optional[Any],
+    section_rnx_updu_section_sensor: Optional[Any],
+    section_rnx_updu_interfaces_section: Optional[Any],
+    section_rnx_updu_interfaces_counters_section: Optional[Any],
+) -> CheckResult:
+    yield from check_plugin_performance({
+        'rnx_updu_section_pdu': section_rnx_updu_section_pdu,
+        'rnx_updu_section_power_input_names': section_rnx_updu_section_power_input_names,
+        'rnx_updu_section_power_input': section_rnx_updu_section_power_input,
+        'rnx_updu_section_power_distribution_names': section_rnx_updu_section_power_distribution_names,
+        'rnx_updu_section_power_distribution': section_rnx_updu_section_power_distribution,
+        'rnx_updu_section_power_outlet_names': section_rnx_updu_section_power_outlet_names,
+        'rnx_updu_section_power_outlet': section_rnx_updu_section_power_outlet,
+        'rnx_updu_section_sensor': section_rnx_updu_section_sensor,
+        'rnx_updu_interfaces_section': section_rnx_updu_interfaces_section,
+        'rnx_updu_interfaces_counters_section': section_rnx_updu_interfaces_counters_section,
+    })
+
+
+check_plugin_rnx_updu_plugin_performance = CheckPlugin(
+    name='rnx_updu_plugin_performance',
+    sections=SECTIONS,
+    service_name='RNX UPDU Plugin Performance',
+    discovery_function=discover_rnx_updu_plugin_performance,
+    discovery_ruleset_name='rnx_updu_discovery',
+    discovery_default_parameters={'plugin_performance': False},
+    check_function=check_rnx_updu_plugin_performance,
+)
@@ -1,35 +1,71 @@
 #!/usr/bin/env python3
 # Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
 
-from collections.abc import Mapping
-from typing import Any, Dict, List
+import itertools
+import math
+import sys
+import time
+from array import array
+from collections import ChainMap
+from collections.abc import Iterator, Mapping, MutableMapping
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from cmk.agent_based.v2 import (
+    AgentSection,
     CheckResult,
-    startswith,
     DiscoveryResult,
+    Metric,
+    OIDEnd,
+    Result,
     Service,
     SNMPTree,
     State,
     StringTable,
     SNMPSection,
-    CheckPlugin
+    CheckPlugin,
+    check_levels,
+    get_value_store,
 )
 from cmk.plugins.lib.elphase import check_elphase
 
-try:
-    from cmk.ccc import debug
-except ImportError:
-    from cmk.utils import debug
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_mib import (
+    BRANCH_TABLE,
+    DETECT_RNX_UPDU,
+    INLET_TABLE,
+    MODULE_TABLE,
+    NO_DATA,
+    OUTLET_TABLE,
+    PDU_TABLE,
+    WIRE_TABLE,
+    PduIdentity,
+    map_data_quality,
+)
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_log import PluginLog
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_perf import parse_stats, profiled
+
+_log = PluginLog('power')
 
 #
 # SNMP DEFINITIONS - Moved to top so they're available for SimpleSNMPSection
 #
-pwr_oids = [
+# The naming columns rarely change and are larger on the wire than the
+# meter readings, they are fetched in sections of their own and joined with
+# the readings by the OID index.
+pwr_name_oids = [
+    OIDEnd(),
     '2',   # upduMib2<ObjectType>SystemName
     '3',   # upduMib2<ObjectType>CustomName
     '4',   # upduMib2<ObjectType>Description
     '50',  # upduMib2<ObjectType>MeterDataQuality
+    '11',  # upduMib2<ObjectType>ObjectPath, e.g. PDU/Inlet/WireL1/Module1/Outlet3
+]
+# Naming columns of single tables (index into power_bases) after the above
+pwr_name_extra_oids = {
+    4: ['8'],  # upduMib2ModuleRating, mA, the limit of the capacity forecast
+}
+pwr_meter_oids = [
+    OIDEnd(),
+    '50',  # upduMib2<ObjectType>MeterDataQuality
     '51',  # upduMib2<ObjectType>Current
     '52',  # upduMib2<ObjectType>Voltage
     '53',  # upduMib2<ObjectType>ActivePower
@@ -38,164 +74,1041 @@ pwr_oids = [
 ]
 # Power monitoring OID bases (indices 0-5)
 power_bases = [
-    '.1.3.6.1.4.1.55108.2.1.2.1',   # 0: upduMib2PDU
-    '.1.3.6.1.4.1.55108.2.2.2.1',   # 1: upduMib2Inlet
-    '.1.3.6.1.4.1.55108.2.4.2.1',   # 2: upduMib2Wire
-    '.1.3.6.1.4.1.55108.2.5.2.1',   # 3: upduMib2Branch
-    '.1.3.6.1.4.1.55108.2.8.2.1',   # 4: upduMib2Module
-    '.1.3.6.1.4.1.55108.2.9.2.1',   # 5: upduMib2Outlet
+    PDU_TABLE,      # 0
+    INLET_TABLE,    # 1
+    WIRE_TABLE,     # 2
+    BRANCH_TABLE,   # 3
+    MODULE_TABLE,   # 4
+    OUTLET_TABLE,   # 5
 ]
 
+# Power objects (index into power_bases, tier) served by each check plugin
+pwr_in_combined_objs = [
+    (0, 'pdu'),
+    (1, 'inlets'),
+]
+pwr_in_objs = [
+    (2, 'wires'),
+]
+pwr_distribution_objs = [
+    (3, 'branch'),
+    (4, 'module'),
+]
+pwr_out_objs = [
+    (5, 'outlet'),
+]
+power_tiers = [what for _index, what in pwr_in_combined_objs + pwr_in_objs + pwr_distribution_objs + pwr_out_objs]
 
-# Generate SNMP trees dynamically
-snmpe_power_trees = (
-    [SNMPTree(base=power_base, oids=pwr_oids) for power_base in power_bases]
-)
+# Each group of tiers is fetched by a names and a meter section. Checkmk only
+# fetches the sections of plugins with services on a host: the input sections
+# are read by the input plugins, the distribution and outlet sections by
+# rnx_updu_power_out, which checks branches, modules and outlets as it did
+# before the split. The inputs are thus not walked when none of the PDU,
+# inlets and wires is enabled in the "RNX UPDU power discovery" rule, the
+# branches, modules and outlets not when none of them is.
+#
+# The input and distribution tiers are small and polled every cycle, the
+# outlet walk makes up most of the SNMP traffic of a unit and can be given a
+# longer fetch interval with the "Fetch intervals for SNMP sections" rule, as
+# can the names sections.
+pwr_input_objs = pwr_in_combined_objs + pwr_in_objs
+pwr_output_objs = pwr_distribution_objs + pwr_out_objs
 
+# The names of the PDU are taken from the shared section rnx_updu_section_pdu,
+# which also serves the inventory, the input names section leaves it out.
+pwr_input_name_objs = pwr_input_objs[1:]
 
-map_data_quality = {
-    '0': (State.OK, 'OK'),
-    '1': (State.WARN, 'Expired'),
-    '2': (State.UNKNOWN, 'No Data'),
-}
 
+def power_trees(objs: List, oids: List, extra_oids: Optional[Dict[int, List[str]]] = None) -> List[SNMPTree]:
+    return [SNMPTree(base=power_bases[index], oids=oids + (extra_oids or {}).get(index, []))
+            for index, _what in objs]
+
+
+# The parsed power sections hold thousands of objects on large units and are
+# kept by the Checkmk helpers between checks, so they are stored compactly:
+# names as __slots__ records under interned system names, readings as columns
+# of floats per tier.
+class PowerName:
+    __slots__ = ('index', 'name', 'title', 'path', 'rating')
+
+    def __init__(self, index: str, name: str, title: str, path: str, rating: Optional[float] = None) -> None:
+        self.index = index
+        self.name = name
+        self.title = title
+        self.path = path
+        # Rated current in A, reported by the modules only
+        self.rating = rating
+
+
+class PowerMeters:
+    """Readings of the objects of one tier, in columns by OID index.
+
+    Current and voltage are kept in mA and mV as reported.
+    """
+
+    __slots__ = ('rows', 'quality', 'current', 'voltage', 'power', 'appower', 'energy')
+
+    def __init__(self, table: StringTable) -> None:
+        # Rows without data are dropped before anything else is done with them
+        rows = [row for row in table if row[1] != NO_DATA]
+        try:
+            self._fill(rows)
+        except ValueError:
+            # Only the rows with a non-numeric reading are lost
+            self._fill([row for row in rows if _is_numeric(row)])
+
+    def _fill(self, rows: StringTable) -> None:
+        oid_ends, quality, current, voltage, power, appower, energy = zip(*rows) if rows else ((),) * 7
+        self.quality = array('b', map(int, quality))
+        self.current = array('d', map(float, current))
+        self.voltage = array('d', map(float, voltage))
+        self.power = array('d', map(float, power))
+        self.appower = array('d', map(float, appower))
+        self.energy = array('d', map(float, energy))
+        self.rows: Dict[str, int] = {oid_end: pos for pos, oid_end in enumerate(oid_ends)}
+
+
+def _is_numeric(row: List[str]) -> bool:
+    try:
+        for value in row[1:]:
+            float(value)
+    except ValueError:
+        return False
+    return True
+
+
+class PowerObject(Mapping):
+    """One power object as handed to check_elphase."""
+
+    __slots__ = ('name', 'type', 'title', 'power', 'appower', 'voltage', 'current', 'energy', 'device_state')
+
+    def __init__(self, what: str, name: PowerName, meters: PowerMeters, row: int) -> None:
+        self.name = name.name
+        self.type = what
+        self.title = name.title
+        self.power = meters.power[row]
+        self.appower = meters.appower[row]
+        self.voltage = meters.voltage[row] / 1000
+        self.current = meters.current[row] / 1000
+        self.energy = meters.energy[row]
+        self.device_state = map_data_quality[str(meters.quality[row])]
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class PowerSection(Mapping):
+    """The tiers of a power section, each decoded the first time it is read.
+
+    Checkmk hands the same parsed section to all plugins of a host, so a tier
+    read by several plugins is decoded once per fetch and tiers no plugin
+    reads (e.g. outlets on a host monitoring only inlets) not at all.
+    """
+
+    __slots__ = ('_tables', '_tiers', '_decode', 'parse_stats')
+
+    def __init__(self, string_table: List[StringTable], objs: List, decode: Callable[[StringTable], Any]) -> None:
+        # This one must match the SNMPTree sequence of the section
+        self._tables: Dict[str, Optional[StringTable]] = {
+            what: table for (_index, what), table in zip(objs, string_table)
+        }
+        self._tiers: Dict[str, Any] = {}
+        self._decode = decode
+        self.parse_stats = None
+
+    def __getitem__(self, what: str) -> Any:
+        try:
+            return self._tiers[what]
+        except KeyError:
+            pass
+        table = self._tables[what]
+        tier = self._tiers[what] = self._decode(table)
+        # The SNMP data of a decoded tier is not needed anymore
+        self._tables[what] = None
+        return tier
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tables)
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+
+def power_name_tier(table: StringTable) -> Dict[str, PowerName]:
+    tier = {}
+    log = _log.call()
+    for oid_end, sysname, custname, desc, qual, path, *rating in table:
+        # Channels reporting 'No Data' are not licensed. Leaving them out
+        # here remembers them until the names are fetched the next time
+        # (rarely, and always on discovery): they are neither discovered
+        # nor joined with their readings.
+        if qual == NO_DATA:
+            if log:
+                log.row('Ignoring %s due to NoData Quality %s', sysname, qual)
+            continue
+        objname = sysname
+        if len(custname):
+            objname = f'{custname}'
+        if len(desc) > 1:
+            objname += f' [{desc}]'
+        rated = int(rating[0]) / 1000 if rating and rating[0].isdigit() and rating[0] != '0' else None
+        tier[sys.intern(sysname)] = PowerName(oid_end, objname, desc, path, rated)
+    if log:
+        log.done()
+    return tier
+
+
+class PowerNames(PowerSection):
+    """The names of a power section, with an index of the objects by unit and ObjectPath.
+
+    The index is built once per fetch of the names, the first time a check
+    looks up the parent of an object, the parents without power once per fetch
+    of the readings. So are the input names joined with the PDU tier, see
+    input_names, and what other plugins derive from the names, see derived.
+    """
 
-def parse_rnx_updu_power(
-    string_table: List[StringTable],
-) -> Dict:
-
-    def power_data(string_table, objs):
-        data = {}
-        for index, what in objs:
-            # This one must match the SNMPTree sequence in register.snmp_section
-            for sysname, custname, desc, qual, i, u, p, ap, e in string_table[index]:
-                # If there is any power object with 'No Data' quality, we skip it
-                # as it basically means that the channel is no licensed.
-                dq = map_data_quality[qual]
-                if dq == State.UNKNOWN:
-                    if debug.enabled():
-                        print(f'WRN: Ignoring {sysname} due to NoData Quality {qual}')
-                    continue
-
-                objname = sysname
-                if len(custname):
-                    objname = f'{custname}'
-                if len(desc) > 1:
-                    objname += f' [{desc}]'
-
-                val = {
-                    'name': objname,
-
-                    'type': what,
-                    'title': desc,
-                    'power': float(p),
-                    'appower': float(ap),
-                    'voltage': float(u) / 1000,
-                    'current': float(i) / 1000,
-                    'energy': float(e),
-                    'device_state': map_data_quality[qual],
-                }
-                data[sysname] = val
-        if debug.enabled():
-            print(f'DEBUG: data: {data}')
+    __slots__ = ('_paths', '_down', '_pdu_names', '_derived')
+
+    def __init__(self, string_table: List[StringTable], objs: List) -> None:
+        super().__init__(string_table, objs, power_name_tier)
+        self._paths: Optional[Dict[Tuple[str, str], Tuple[str, PowerName]]] = None
+        self._down: Optional[Tuple[Any, Dict[Tuple[str, str], str]]] = None
+        self._pdu_names: Optional[Tuple[Any, Mapping]] = None
+        self._derived: Dict[str, Tuple[Any, Any]] = {}
+
+    def by_path(self) -> Dict[Tuple[str, str], Tuple[str, PowerName]]:
+        """Tier and name of the objects by unit and ObjectPath, e.g. ('1', 'PDU/Inlet/WireL1/Branch1').
+
+        Chained units report the same ObjectPaths, only the unit in the OID
+        index tells them apart.
+        """
+        if self._paths is None:
+            self._paths = {(unit_of(name.index), name.path): (what, name)
+                           for what in self for name in self[what].values() if name.path}
+        return self._paths
+
+    def down_parents(self, meters: PowerSection) -> Dict[Tuple[str, str], str]:
+        """Why the parents without power are down, by unit and ObjectPath, built once per fetch of the readings."""
+        if self._down is None or self._down[0] is not meters:
+            self._down = (meters, find_down_parents(self.by_path(), meters))
+        return self._down[1]
+
+    def derived(self, key: str, meters: Optional[PowerSection],
+                build: Callable[['PowerNames', Optional[PowerSection]], Any]) -> Any:
+        """What build() derives from these names and the readings, built once per fetch of the readings."""
+        derived = self._derived.get(key)
+        if derived is None or derived[0] is not meters:
+            derived = self._derived[key] = (meters, build(self, meters))
+        return derived[1]
+
+    def with_pdus(self, pdus: Optional[Dict[str, PduIdentity]]) -> Mapping:
+        """These names and the PDU tier from the shared PDU section, built once per PDU section."""
+        if self._pdu_names is None or self._pdu_names[0] is not pdus:
+            rows = [(pdu.index, pdu.system_name, pdu.custom_name, pdu.description, pdu.quality, pdu.path)
+                    for pdu in (pdus or {}).values()]
+            self._pdu_names = (pdus, ChainMap({'pdu': power_name_tier(rows)}, self))
+        return self._pdu_names[1]
+
+
+def power_names(string_table: List[StringTable], objs: List) -> PowerNames:
+    return PowerNames(string_table, objs)
+
+
+def power_meters(string_table: List[StringTable], objs: List) -> PowerSection:
+    return PowerSection(string_table, objs, PowerMeters)
+
+
+@profiled
+@parse_stats(quality=4)
+def parse_rnx_updu_power_input_names(string_table: List[StringTable]) -> PowerNames:
+    return power_names(string_table, pwr_input_name_objs)
+
+
+@profiled
+@parse_stats(quality=4)
+def parse_rnx_updu_power_distribution_names(string_table: List[StringTable]) -> PowerNames:
+    return power_names(string_table, pwr_distribution_objs)
+
+
+@profiled
+@parse_stats(quality=4)
+def parse_rnx_updu_power_outlet_names(string_table: List[StringTable]) -> PowerNames:
+    return power_names(string_table, pwr_out_objs)
+
+
+@profiled
+@parse_stats(quality=1)
+def parse_rnx_updu_power_input(string_table: List[StringTable]) -> PowerSection:
+    return power_meters(string_table, pwr_input_objs)
+
+
+@profiled
+@parse_stats(quality=1)
+def parse_rnx_updu_power_distribution(string_table: List[StringTable]) -> PowerSection:
+    return power_meters(string_table, pwr_distribution_objs)
+
+
+@profiled
+@parse_stats(quality=1)
+def parse_rnx_updu_power_outlet(string_table: List[StringTable]) -> PowerSection:
+    return power_meters(string_table, pwr_out_objs)
+
+
+def input_names(pdus: Optional[Dict[str, PduIdentity]], names: Optional[PowerNames]) -> Optional[Mapping]:
+    """The input names with the PDU tier built from the shared PDU section."""
+    if names is None:
+        return None
+    return names.with_pdus(pdus)
+
+
+def output_sections(distribution: Optional[Mapping], outlet: Optional[Mapping]) -> Optional[Mapping]:
+    """The distribution and outlet tiers of rnx_updu_power_out read as one section."""
+    sections = [section for section in (distribution, outlet) if section is not None]
+    return ChainMap(*sections) if sections else None
+
+
+def power_data(names: Optional[Mapping], meters: Optional[PowerSection], objs: List) -> Dict:
+    """All power objects of the given tiers, joined from names and readings."""
+    data = {}
+    if names is None or meters is None:
         return data
-    parsed_data = {}
-    # This one must match the SNMPTree definitions in register.snmp_section
-    pwr_in_combined_objs = [
-        (0, 'pdu'),
-        (1, 'inlets'),
-    ]
-    pwr_in_objs = [
-        (2, 'wires'),
-    ]
-    parsed_data['power_in_combined'] = power_data(string_table, pwr_in_combined_objs)
-    parsed_data['power_in'] = power_data(string_table, pwr_in_objs)
-    
-    # This one must match the SNMPTree definitions in register.snmp_section
-    pwr_out_objs = [
-        (3, 'branch'),
-        (4, 'module'),
-        (5, 'outlet'),
-    ]
-    parsed_data['power_out'] = power_data(string_table, pwr_out_objs)
-
-    return parsed_data
+    for _index, what in objs:
+        tier = meters.get(what)
+        if tier is None:
+            continue
+        for sysname, name in names.get(what, {}).items():
+            row = tier.rows.get(name.index)
+            if row is not None:
+                data[sysname] = PowerObject(what, name, tier, row)
+    log = _log.call()
+    if log:
+        log.debug('data: %d objects of %s', len(data), [what for _index, what in objs])
+    return data
+
+
+def power_name(item: str, names: Optional[Mapping], objs: List) -> Optional[Tuple[str, PowerName]]:
+    """Tier and name of a single item."""
+    for _index, what in objs:
+        name = (names or {}).get(what, {}).get(item)
+        if name is not None:
+            return what, name
+    return None
+
+
+def power_item(item: str, names: Optional[Mapping], meters: Optional[PowerSection], objs: List) -> Optional[PowerObject]:
+    """The power object of a single item, without joining all the others."""
+    found = power_name(item, names, objs)
+    if found is None or meters is None:
+        return None
+    what, name = found
+    tier = meters.get(what)
+    row = None if tier is None else tier.rows.get(name.index)
+    return None if row is None else PowerObject(what, name, tier, row)
+
+
+# Metrics of a power service which can be left out per tier with 'metrics' of
+# the rule "RNX UPDU power discovery", with the metrics of each. The levels are
+# checked regardless, metrics not listed here are always reported.
+POWER_METRICS = {
+    'voltage': ['voltage'],
+    'current': ['current', 'current_min', 'current_max', 'current_avg', 'current_p95'],
+    'power': ['power', 'power_min', 'power_max', 'power_avg', 'power_p95'],
+    'appower': ['appower'],
+    'energy': ['energy'],
+}
+
+# Levels which check_elphase takes as (warn, crit). Rules of "Parameters for
+# input/output phases of UPSs and PDUs" saved by newer Checkmk versions may
+# have them as SimpleLevels.
+ELPHASE_LEVELS = ['voltage', 'current', 'power', 'appower']
+
+
+def elphase_params(params: Mapping[str, Any]) -> Dict[str, Any]:
+    """The params for check_elphase, with levels as SimpleLevels turned into (warn, crit)."""
+    elphase = dict(params)
+    for quantity in ELPHASE_LEVELS:
+        levels = elphase.get(quantity)
+        if levels is None or not isinstance(levels[0], str):
+            continue
+        if levels[0] == 'fixed':
+            elphase[quantity] = levels[1]
+        else:
+            del elphase[quantity]
+    return elphase
+
+
+def dropped_metrics(params: Mapping[str, Any]) -> Set[str]:
+    """Names of the metrics the service leaves out."""
+    selected = params.get('metrics')
+    if selected is None:
+        return set()
+    return {name for metric, names in POWER_METRICS.items() if metric not in selected for name in names}
+
+
+# The options of the "RNX UPDU power discovery" rule for single tiers are kept
+# with the services of that tier, the check rules of the power services are
+# the ones of Checkmk for input and output phases and do not have them.
+output_tiers = [what for _index, what in pwr_output_objs]
+
+
+def service_parameters(params: Mapping[str, Any], what: str) -> Optional[Dict[str, Any]]:
+    """The discovered parameters of a service of the tier, None without options for it."""
+    parameters: Dict[str, Any] = {}
+    metrics = params.get('metrics', {}).get(what)
+    if metrics is not None and not set(POWER_METRICS) <= set(metrics):
+        parameters['metrics'] = [metric for metric in POWER_METRICS if metric in metrics]
+    forecast = params.get('forecast')
+    if forecast is not None and what in forecast['tiers']:
+        parameters['forecast'] = {'days': forecast['days']}
+        rated_current = forecast.get('rated_current', {}).get(what)
+        if rated_current is not None:
+            parameters['forecast']['rated_current'] = rated_current
+    spikes = params.get('spikes')
+    if spikes is not None and what in spikes['tiers']:
+        parameters['spikes'] = {key: value for key, value in spikes.items() if key != 'tiers'}
+    if params.get('parent_down') and what in output_tiers:
+        parameters['parent_down'] = True
+    return parameters or None
+
+
+def discover_power(params: Mapping[str, Any], names: Optional[Mapping], meters: Optional[PowerSection],
+                   objs: List) -> DiscoveryResult:
+    enabled = [(index, what) for index, what in objs if what in params['tiers']]
+    for key, obj in power_data(names, meters, enabled).items():
+        yield Service(item=key, parameters=service_parameters(params, obj.type))
+
+
+# Outlets per module, to group outlets of units without ObjectPath
+OUTLETS_PER_MODULE = 8
+
+
+def pdu_item(name: PowerName) -> str:
+    """The PDU of an object as item, the root of its ObjectPath and the unit, e.g. 'PDU 1'.
+
+    Chained units report the same ObjectPaths, only the unit in the OID index
+    tells them apart.
+    """
+    pdu = name.path.split('/')[0] or 'PDU'
+    unit = unit_of(name.index)
+    return f'{pdu} {unit}' if unit else pdu
+
+
+def outlet_group(name: PowerName, group: str) -> str:
+    """The summary item of an outlet: its PDU, or PDU and module."""
+    parts = name.path.split('/')
+    pdu = pdu_item(name)
+    if group == 'pdu':
+        return pdu
+    module = next((part for part in parts if part.startswith('Module')), None)
+    if module is None:
+        module = f'Module{(int(name.index.split(".")[-1]) - 1) // OUTLETS_PER_MODULE + 1}'
+    return f'{pdu} {module}'
+
+
+def is_selected_outlet(name: PowerName, sysname: str, selected: List[str]) -> bool:
+    return sysname in selected or name.name in selected
+
+
+# With 'parent_down' from the "RNX UPDU power discovery" rule, branches,
+# modules and outlets below an object without power report "parent down"
+# instead of alarming on their own readings, so that a tripped inlet gives one
+# alarm and not one per outlet. The parents are found in the distribution
+# sections, which rnx_updu_power_out reads anyway: a branch or module is down
+# without voltage or data, an inlet or wire when none of the branches and
+# modules below it has voltage. The inlets and wires themselves are checked by
+# the input plugins.
+PARENT_TIERS = ('branch', 'module')
+
+# Below this voltage an object is down
+DOWN_VOLTAGE = 10.0  # V
+
+
+def unit_of(index: str) -> str:
+    """The unit of an object in a chain of PDUs, from its OID index <unit>.<object>."""
+    return index.rpartition('.')[0]
+
+
+def find_down_parents(paths: Dict[Tuple[str, str], Tuple[str, PowerName]],
+                      meters: PowerSection) -> Dict[Tuple[str, str], str]:
+    """Why the objects and the paths above them are down, by unit and ObjectPath."""
+    down = {}
+    # Branches and modules, without power of their own, below each path
+    below: Dict[Tuple[str, str], List[int]] = {}
+    for (unit, path), (what, name) in paths.items():
+        if what not in PARENT_TIERS:
+            continue
+        tier = meters.get(what)
+        row = None if tier is None else tier.rows.get(name.index)
+        if row is None:
+            down[(unit, path)] = f'{name.name} has no data'
+        elif tier.voltage[row] / 1000 < DOWN_VOLTAGE:
+            down[(unit, path)] = f'{name.name} has no voltage'
+        while '/' in path:
+            path = path.rsplit('/', 1)[0]
+            counts = below.setdefault((unit, path), [0, 0])
+            counts[0] += 1
+            counts[1] += row is None or tier.voltage[row] / 1000 < DOWN_VOLTAGE
+    for (unit, path), (total, without) in below.items():
+        # A single object without power may as well have tripped on its own
+        if total > 1 and without == total and (unit, path) not in paths:
+            down[(unit, path)] = f'{path.rsplit("/", 1)[-1]} has no voltage'
+    return down
+
+
+def parent_down(name: PowerName, names: Optional[PowerNames], meters: Optional[PowerSection]) -> Optional[str]:
+    """Why the topmost object above the one of the name is down, None if all of them have power."""
+    if not name.path or names is None or meters is None:
+        return None
+    down = names.down_parents(meters)
+    unit = unit_of(name.index)
+    parts = name.path.split('/')
+    for end in range(1, len(parts)):
+        reason = down.get((unit, '/'.join(parts[:end])))
+        if reason is not None:
+            return reason
+    return None
+
+
+# Readings sampled between the checks by the special agent with --samples
+SAMPLE_STATS = ('min', 'max', 'avg', 'p95')
+
+
+class PowerSamples:
+    """Statistics of the samples of one object: (min, max, avg, p95) in A and W."""
+
+    __slots__ = ('count', 'current', 'power')
+
+    def __init__(self, count: int, current: Tuple[float, ...], power: Tuple[float, ...]) -> None:
+        self.count = count
+        self.current = current
+        self.power = power
+
+
+@profiled
+def parse_rnx_updu_power_samples(string_table: StringTable) -> Dict[str, PowerSamples]:
+    section = {}
+    for row in string_table:
+        try:
+            values = tuple(map(float, row[3:11]))
+            section[f'{row[0]}/{row[1]}'] = PowerSamples(int(row[2]), values[:4], values[4:])
+        except (IndexError, ValueError):
+            continue
+    return section
+
+
+def check_samples(item: str, params: Mapping[str, Any], names: Optional[Mapping], objs: List,
+                  samples: Dict[str, PowerSamples]) -> CheckResult:
+    """Peaks of the readings sampled between two checks by the special agent."""
+    found = power_name(item, names, objs)
+    if found is None:
+        return
+    what, name = found
+    stats = samples.get(f'{what}/{name.index}')
+    if stats is None:
+        return
+    yield Result(state=State.OK, notice=f'{stats.count} samples since the last check')
+    for quantity, title, unit, values in (('current', 'current', 'A', stats.current),
+                                          ('power', 'power', 'W', stats.power)):
+        levels = params.get(quantity)
+        yield from check_levels(
+            values[1],
+            levels_upper=None if levels is None else ('fixed', levels),
+            render_func=lambda value, unit=unit: f'{value:.1f} {unit}',
+            label=f'Peak {title}',
+            notice_only=True,
+        )
+        for stat, value in zip(SAMPLE_STATS, values):
+            yield Metric(f'{quantity}_{stat}', value)
+
+
+#
+# CAPACITY FORECAST
+#
+# The current of each object is averaged by a fast and a slow EWMA, with the
+# smoothing factors derived from the time between the checks. On a rising
+# current the slow average lags further behind, the difference of the two
+# gives the trend. The daily peaks are held in a slowly decaying peak. The
+# forecast is the time until the held peak, growing with the trend, reaches
+# the rated current. The value store keeps five numbers per object, each
+# check is O(1). Opt-in per tier with 'forecast' of the rule "RNX UPDU power
+# discovery", only the services discovered with it keep the averages.
+FORECAST_TIERS = ['inlets', 'wires', 'branch', 'module']
+
+FAST_TAU = 3 * 86400.0       # s, time constants of the averages, long enough to
+SLOW_TAU = 10 * 86400.0      # s, smooth out the daily load cycle
+PEAK_TAU = 7 * 86400.0       # s, decay of the held peak towards the fast average
+FORECAST_WARMUP = 14 * 86400.0  # s of history before the days to the limit are reported
+
+# Levels on the days until the rated current is reached, unless set with
+# 'forecast' of the rule "RNX UPDU power discovery"
+FORECAST_DAYS = ('fixed', (30.0, 7.0))
+
+
+def update_forecast(state: Optional[List[float]], now: float, current: float) -> List[float]:
+    """The state [since, last check, fast and slow average in A, held peak in A] after a reading."""
+    if state is None:
+        return [now, now, current, current, current]
+    since, last, fast, slow, peak = state
+    interval = now - last
+    if interval <= 0:
+        return state
+    fast += (1 - math.exp(-interval / FAST_TAU)) * (current - fast)
+    slow += (1 - math.exp(-interval / SLOW_TAU)) * (current - slow)
+    peak = max(current, fast + (peak - fast) * math.exp(-interval / PEAK_TAU))
+    return [since, now, fast, slow, peak]
+
+
+def forecast_trend(state: List[float]) -> float:
+    """Trend of the current in A/s.
+
+    On a current rising by m since the first reading, the averages lag behind by
+    m * tau * (1 - exp(-age / tau)) each, which the difference is divided by.
+    """
+    since, last, fast, slow, _peak = state
+    age = last - since
+    lag = SLOW_TAU * -math.expm1(-age / SLOW_TAU) - FAST_TAU * -math.expm1(-age / FAST_TAU)
+    return (fast - slow) / lag if lag > 0 else 0.0
+
+
+def days_to_limit(limit: float, peak: float, trend: float) -> Optional[float]:
+    """Days until the held peak reaches the limit at the trend, None if it does not grow."""
+    if peak >= limit:
+        return 0.0
+    if trend <= 0:
+        return None
+    return (limit - peak) / (trend * 86400)
+
+
+def check_forecast(forecast: Mapping[str, Any], name: PowerName, current: float,
+                   value_store: MutableMapping[str, Any], now: float) -> CheckResult:
+    """The forecast with the discovered 'forecast': rated current and levels on the days."""
+    state = update_forecast(value_store.get('forecast'), now, current)
+    value_store['forecast'] = state
+    since, _last, _fast, _slow, peak = state
+    trend = forecast_trend(state)
+    yield Result(state=State.OK, notice=f'Trend: {trend * 86400:+.3f} A/day, held peak: {peak:.2f} A')
+    limit = forecast.get('rated_current') or name.rating
+    if not limit:
+        return
+    if now - since < FORECAST_WARMUP:
+        yield Result(state=State.OK, notice=f'Capacity forecast after {FORECAST_WARMUP / 86400:.0f} days')
+        return
+    days = days_to_limit(limit, peak, trend)
+    if days is None:
+        yield Result(state=State.OK, notice=f'Rated current of {limit:.1f} A not reached at the trend')
+        return
+    yield from check_levels(
+        days,
+        levels_lower=forecast.get('days', FORECAST_DAYS),
+        metric_name='days_to_limit',
+        render_func=lambda value: f'{value:.0f} days',
+        label=f'Rated current of {limit:.1f} A reached in',
+    )
+
+
+#
+# SPIKE DETECTION
+#
+# Opt-in per tier with 'spikes' of the rule "RNX UPDU power discovery". The
+# last readings of the current and the power are kept in a ring buffer of a
+# fixed size in the value store of the service. A reading further from their
+# average than k standard deviations or than the configured delta is a jump,
+# e.g. of a failing power supply long before the levels are reached. The jump
+# enters the buffer as well, so a lasting step becomes the new normal once it
+# fills the buffer.
+SPIKE_MIN_SAMPLES = 3
+
+# Quantity, title, unit and the jump below which a steady reading is not
+# taken as jumping, whatever its standard deviation
+SPIKE_QUANTITIES = [
+    ('current', 'Current', 'A', 0.1),
+    ('power', 'Power', 'W', 20.0),
+]
+
+
+def check_spikes(params: Mapping[str, Any], obj: PowerObject, value_store: MutableMapping[str, Any]) -> CheckResult:
+    buffers = dict(value_store.get('spikes', {}))
+    for quantity, title, unit, noise in SPIKE_QUANTITIES:
+        value = obj[quantity]
+        buffer = buffers.get(quantity, [])
+        if len(buffer) >= SPIKE_MIN_SAMPLES:
+            mean = sum(buffer) / len(buffer)
+            sigma = math.sqrt(sum((reading - mean) ** 2 for reading in buffer) / len(buffer))
+            jump = value - mean
+            reasons = []
+            if abs(jump) > noise and abs(jump) > params['k'] * sigma:
+                reasons.append(f'{abs(jump) / sigma:.1f} standard deviations' if sigma else 'steady before')
+            delta = params.get(f'{quantity}_delta')
+            if delta is not None and abs(jump) > delta:
+                reasons.append(f'more than {delta:.1f} {unit}')
+            if reasons:
+                yield Result(state=State.WARN,
+                             summary=f'{title} jumped by {jump:+.2f} {unit} from the average of {mean:.2f} {unit} '
+                                     f'of the last {len(buffer)} checks ({", ".join(reasons)})')
+        buffers[quantity] = (buffer + [value])[-params['samples']:]
+    value_store['spikes'] = buffers
+
+
+def check_power(item: str, params: Mapping[str, Any], names: Optional[Mapping], meters: Optional[PowerSection],
+                objs: List, samples: Optional[Dict[str, PowerSamples]] = None,
+                parent_names: Optional[PowerNames] = None, parent_meters: Optional[PowerSection] = None) -> CheckResult:
+    data = power_item(item, names, meters, objs)
+    if data is not None:
+        _what, name = power_name(item, names, objs)
+        if params.get('parent_down'):
+            down = parent_down(name, parent_names, parent_meters)
+            if down is not None:
+                yield Result(state=State.OK, summary=f'Parent down: {down}, not checked')
+                return
+        elphase = elphase_params(params)
+        results = check_elphase(item, elphase, {item: data})
+        if samples:
+            results = itertools.chain(results, check_samples(item, elphase, names, objs, samples))
+        dropped = dropped_metrics(params)
+        if not dropped:
+            yield from results
+        else:
+            # Results are kept, metrics only if selected
+            for result in results:
+                if not isinstance(result, Metric) or result.name not in dropped:
+                    yield result
+        forecast = params.get('forecast')
+        if forecast is not None:
+            yield from check_forecast(forecast, name, data.current, get_value_store(), time.time())
+        spikes = params.get('spikes')
+        if spikes is not None:
+            yield from check_spikes(spikes, data, get_value_store())
+
+
+agent_section_rnx_updu_power_samples = AgentSection(
+    name='rnx_updu_power_samples',
+    parse_function=parse_rnx_updu_power_samples,
+)
 
 
 # SNMP Section Registration
-snmp_section_rnx_updu = SNMPSection(
-    name='rnx_updu_section_power',
-    detect=startswith('.1.3.6.1.2.1.1.1.0', 'RNX UPDU'),
-    parse_function=parse_rnx_updu_power,
-    fetch=list(snmpe_power_trees),
+snmp_section_rnx_updu_power_input_names = SNMPSection(
+    name='rnx_updu_section_power_input_names',
+    detect=DETECT_RNX_UPDU,
+    parse_function=parse_rnx_updu_power_input_names,
+    fetch=power_trees(pwr_input_name_objs, pwr_name_oids),
+)
+snmp_section_rnx_updu_power_input = SNMPSection(
+    name='rnx_updu_section_power_input',
+    detect=DETECT_RNX_UPDU,
+    parse_function=parse_rnx_updu_power_input,
+    fetch=power_trees(pwr_input_objs, pwr_meter_oids),
+)
+snmp_section_rnx_updu_power_distribution_names = SNMPSection(
+    name='rnx_updu_section_power_distribution_names',
+    detect=DETECT_RNX_UPDU,
+    parse_function=parse_rnx_updu_power_distribution_names,
+    fetch=power_trees(pwr_distribution_objs, pwr_name_oids, pwr_name_extra_oids),
+)
+snmp_section_rnx_updu_power_distribution = SNMPSection(
+    name='rnx_updu_section_power_distribution',
+    detect=DETECT_RNX_UPDU,
+    parse_function=parse_rnx_updu_power_distribution,
+    fetch=power_trees(pwr_distribution_objs, pwr_meter_oids),
 )
+snmp_section_rnx_updu_power_outlet_names = SNMPSection(
+    name='rnx_updu_section_power_outlet_names',
+    detect=DETECT_RNX_UPDU,
+    parse_function=parse_rnx_updu_power_outlet_names,
+    fetch=power_trees(pwr_out_objs, pwr_name_oids),
+)
+snmp_section_rnx_updu_power_outlet = SNMPSection(
+    name='rnx_updu_section_power_outlet',
+    detect=DETECT_RNX_UPDU,
+    parse_function=parse_rnx_updu_power_outlet,
+    fetch=power_trees(pwr_out_objs, pwr_meter_oids),
+)
+
+
+# Default levels of the rules "Parameters for input phases of UPSs and PDUs"
+# (el_inphase) and "Parameters for output phases of UPSs and PDUs"
+# (ups_outphase)
+IN_LEVELS = {'voltage': (200, 195), 'power': (2000, 3000), 'appower': (2200, 3300), 'current': (9, 13)}
+IN_COMBINED_LEVELS = {'voltage': (200, 195), 'power': (6000, 9000), 'appower': (6600, 9900), 'current': (27, 30)}
+OUT_LEVELS = {'voltage': (200, 195), 'power': (2000, 3000), 'appower': (2500, 3300), 'current': (9, 10)}
+
+# Default parameters of the rule "RNX UPDU outlet summary", the levels of each
+# outlet and the number of most loaded outlets shown
+SUMMARY_PARAMS = {
+    'top_n': 5,
+    'voltage': ('fixed', (200.0, 195.0)),
+    'power': ('fixed', (2000.0, 3000.0)),
+    'appower': ('fixed', (2500.0, 3300.0)),
+    'current': ('fixed', (9.0, 10.0)),
+}
 
 
 #
 # POWER IN
 #
-def discover_rnx_updu_power_in(section: Dict) -> DiscoveryResult:
-    for key in section['power_in']:
-        yield Service(item=key)
+@profiled
+def discover_rnx_updu_power_in(
+    params: Mapping[str, Any],
+    section_rnx_updu_section_power_input_names: Optional[PowerSection],
+    section_rnx_updu_section_power_input: Optional[PowerSection],
+    section_rnx_updu_power_samples: Optional[Dict[str, PowerSamples]],
+) -> DiscoveryResult:
+    yield from discover_power(params, section_rnx_updu_section_power_input_names,
+                              section_rnx_updu_section_power_input, pwr_in_objs)
 
 
-def discover_rnx_updu_power_in_combined(section: Dict) -> DiscoveryResult:
-    for key in section['power_in_combined']:
-        yield Service(item=key)
+@profiled
+def discover_rnx_updu_power_in_combined(
+    params: Mapping[str, Any],
+    section_rnx_updu_section_pdu: Optional[Dict[str, PduIdentity]],
+    section_rnx_updu_section_power_input_names: Optional[PowerSection],
+    section_rnx_updu_section_power_input: Optional[PowerSection],
+    section_rnx_updu_power_samples: Optional[Dict[str, PowerSamples]],
+) -> DiscoveryResult:
+    names = input_names(section_rnx_updu_section_pdu, section_rnx_updu_section_power_input_names)
+    yield from discover_power(params, names, section_rnx_updu_section_power_input, pwr_in_combined_objs)
 
 
+@profiled
 def check_rnx_updu_power_in(
-    item: str, params: Mapping[str, Any], section: Dict
+    item: str,
+    params: Mapping[str, Any],
+    section_rnx_updu_section_power_input_names: Optional[PowerSection],
+    section_rnx_updu_section_power_input: Optional[PowerSection],
+    section_rnx_updu_power_samples: Optional[Dict[str, PowerSamples]],
 ) -> CheckResult:
-    yield from check_elphase(item, params, section['power_in'])
+    yield from check_power(item, params, section_rnx_updu_section_power_input_names,
+                           section_rnx_updu_section_power_input, pwr_in_objs,
+                           section_rnx_updu_power_samples)
 
 
+@profiled
 def check_rnx_updu_power_in_combined(
-    item: str, params: Mapping[str, Any], section: Dict
+    item: str,
+    params: Mapping[str, Any],
+    section_rnx_updu_section_pdu: Optional[Dict[str, PduIdentity]],
+    section_rnx_updu_section_power_input_names: Optional[PowerSection],
+    section_rnx_updu_section_power_input: Optional[PowerSection],
+    section_rnx_updu_power_samples: Optional[Dict[str, PowerSamples]],
 ) -> CheckResult:
-    yield from check_elphase(item, params, section['power_in_combined'])
+    names = input_names(section_rnx_updu_section_pdu, section_rnx_updu_section_power_input_names)
+    yield from check_power(item, params, names, section_rnx_updu_section_power_input, pwr_in_combined_objs,
+                           section_rnx_updu_power_samples)
 
 
 check_plugin_rnx_updu_power_in = CheckPlugin(
     name='rnx_updu_power_in',
-    sections=['rnx_updu_section_power'],
+    sections=['rnx_updu_section_power_input_names', 'rnx_updu_section_power_input',
+              'rnx_updu_power_samples'],
     service_name='%s',
     discovery_function=discover_rnx_updu_power_in,
+    discovery_ruleset_name='rnx_updu_discovery',
+    discovery_default_parameters={'tiers': power_tiers},
     check_function=check_rnx_updu_power_in,
     check_ruleset_name='el_inphase',
-    check_default_parameters={'voltage': (200, 195), 'power': (2000, 3000), 'appower': (2200, 3300), 'current': (9, 3)},
+    check_default_parameters=IN_LEVELS,
 )
 check_plugin_rnx_updu_power_in_combined = CheckPlugin(
     name='rnx_updu_power_in_combined',
-    sections=['rnx_updu_section_power'],
+    sections=['rnx_updu_section_pdu', 'rnx_updu_section_power_input_names', 'rnx_updu_section_power_input',
+              'rnx_updu_power_samples'],
     service_name='%s',
     discovery_function=discover_rnx_updu_power_in_combined,
+    discovery_ruleset_name='rnx_updu_discovery',
+    discovery_default_parameters={'tiers': power_tiers},
     check_function=check_rnx_updu_power_in_combined,
     check_ruleset_name='el_inphase',
-    check_default_parameters={'voltage': (200, 195), 'power': (6000, 9000), 'appower': (6600, 9900), 'current': (27, 30)},
+    check_default_parameters=IN_COMBINED_LEVELS,
 )
 
 
 #
 # POWER OUT
 #
-def discover_rnx_updu_power_out(section: Dict) -> DiscoveryResult:
-    for key in section['power_out']:
-        yield Service(item=key)
+# Branches, modules and outlets, from the distribution and outlet sections
+def discover_power_out(params: Mapping[str, Any], names: Optional[Mapping],
+                       meters: Optional[Mapping]) -> DiscoveryResult:
+    summary = params.get('outlet_summary')
+    for service in discover_power(params, names, meters, pwr_output_objs):
+        # In summary mode only the explicitly selected outlets get services
+        name = names.get('outlet', {}).get(service.item)
+        if summary is None or name is None or is_selected_outlet(name, service.item, summary['outlets']):
+            yield service
+
+
+@profiled
+def discover_rnx_updu_power_out(
+    params: Mapping[str, Any],
+    section_rnx_updu_section_power_distribution_names: Optional[PowerNames],
+    section_rnx_updu_section_power_distribution: Optional[PowerSection],
+    section_rnx_updu_section_power_outlet_names: Optional[PowerSection],
+    section_rnx_updu_section_power_outlet: Optional[PowerSection],
+    section_rnx_updu_power_samples: Optional[Dict[str, PowerSamples]],
+) -> DiscoveryResult:
+    yield from discover_power_out(
+        params,
+        output_sections(section_rnx_updu_section_power_distribution_names, section_rnx_updu_section_power_outlet_names),
+        output_sections(section_rnx_updu_section_power_distribution, section_rnx_updu_section_power_outlet),
+    )
 
 
+@profiled
 def check_rnx_updu_power_out(
-    item: str, params: Mapping[str, Any], section: Dict
+    item: str,
+    params: Mapping[str, Any],
+    section_rnx_updu_section_power_distribution_names: Optional[PowerNames],
+    section_rnx_updu_section_power_distribution: Optional[PowerSection],
+    section_rnx_updu_section_power_outlet_names: Optional[PowerSection],
+    section_rnx_updu_section_power_outlet: Optional[PowerSection],
+    section_rnx_updu_power_samples: Optional[Dict[str, PowerSamples]],
 ) -> CheckResult:
-    yield from check_elphase(item, params, section['power_out'])
+    # The outlet and names sections may have a longer fetch interval,
+    # Checkmk keeps handing us their last data in between.
+    yield from check_power(
+        item, params,
+        output_sections(section_rnx_updu_section_power_distribution_names, section_rnx_updu_section_power_outlet_names),
+        output_sections(section_rnx_updu_section_power_distribution, section_rnx_updu_section_power_outlet),
+        pwr_output_objs, section_rnx_updu_power_samples, section_rnx_updu_section_power_distribution_names,
+        section_rnx_updu_section_power_distribution,
+    )
 
 
+power_output_sections = [
+    'rnx_updu_section_power_distribution_names', 'rnx_updu_section_power_distribution',
+    'rnx_updu_section_power_outlet_names', 'rnx_updu_section_power_outlet',
+]
+
 check_plugin__rnx_updu_power_out = CheckPlugin(
     name='rnx_updu_power_out',
-    sections=['rnx_updu_section_power'],
+    sections=power_output_sections + ['rnx_updu_power_samples'],
     service_name='%s',
     discovery_function=discover_rnx_updu_power_out,
+    discovery_ruleset_name='rnx_updu_discovery',
+    discovery_default_parameters={'tiers': power_tiers},
     check_function=check_rnx_updu_power_out,
     check_ruleset_name='ups_outphase',
-    check_default_parameters={'voltage': (200, 195), 'power': (2000, 3000), 'appower': (2500, 3300), 'current': (9, 10)},
+    check_default_parameters=OUT_LEVELS,
+)
+
+
+#
+# OUTLET SUMMARY
+#
+def discover_outlet_summary(params: Mapping[str, Any], names: Optional[PowerSection],
+                            meters: Optional[PowerSection]) -> DiscoveryResult:
+    summary = params.get('outlet_summary')
+    if summary is None or 'outlet' not in params['tiers']:
+        return
+    groups = set()
+    for sysname in power_data(names, meters, pwr_out_objs):
+        groups.add(outlet_group(names['outlet'][sysname], summary['group']))
+    parameters = {'group': summary['group']}
+    if params.get('parent_down'):
+        parameters['parent_down'] = True
+    for group in sorted(groups):
+        yield Service(item=group, parameters=parameters)
+
+
+def check_outlet_summary(item: str, params: Mapping[str, Any], names: Optional[PowerSection],
+                         meters: Optional[PowerSection], parent_names: Optional[PowerNames] = None,
+                         parent_meters: Optional[PowerSection] = None) -> CheckResult:
+    data = power_data(names, meters, pwr_out_objs)
+    outlets = [(sysname, obj) for sysname, obj in data.items()
+               if outlet_group(names['outlet'][sysname], params['group']) == item]
+    if not outlets:
+        return
+
+    powers = [obj['power'] for _sysname, obj in outlets]
+    total = sum(powers)
+    yield Result(state=State.OK, summary=f'{len(outlets)} outlets, total power: {total:.1f} W')
+    yield Result(state=State.OK, summary=f'min: {min(powers):.1f} W, max: {max(powers):.1f} W')
+    yield Metric('power', total)
+    yield Metric('appower', sum(obj['appower'] for _sysname, obj in outlets))
+    yield Metric('current', sum(obj['current'] for _sysname, obj in outlets))
+
+    top = sorted(outlets, key=lambda outlet: outlet[1]['power'], reverse=True)[:params['top_n']]
+    yield Result(
+        state=State.OK,
+        notice='Top loaded outlets: ' + ', '.join(f'{obj["name"]} {obj["power"]:.1f} W' for _sysname, obj in top),
+    )
+
+    # Every outlet is checked against the levels of this service, the
+    # summary reports the worst of them and the outlets that are not OK.
+    # With 'parent_down', outlets below an object without power are only
+    # counted.
+    problems = {State.WARN: [], State.CRIT: [], State.UNKNOWN: []}
+    parent_downs = []
+    elphase = elphase_params(params)
+    for sysname, obj in outlets:
+        if params.get('parent_down') and parent_down(names['outlet'][sysname], parent_names,
+                                                     parent_meters) is not None:
+            parent_downs.append(obj['name'])
+            continue
+        state = State.worst(*(result.state for result in check_elphase(sysname, elphase, {sysname: obj})
+                              if isinstance(result, Result)))
+        if state != State.OK:
+            problems[state].append(obj['name'])
+    for state in (State.CRIT, State.WARN, State.UNKNOWN):
+        if problems[state]:
+            yield Result(
+                state=state,
+                summary=f'{len(problems[state])} outlets {state.name}',
+                details=f'Outlets {state.name}: ' + ', '.join(problems[state]),
+            )
+    if parent_downs:
+        yield Result(
+            state=State.OK,
+            summary=f'{len(parent_downs)} outlets with parent down',
+            details='Outlets with parent down: ' + ', '.join(parent_downs),
+        )
+
+
+@profiled
+def discover_rnx_updu_power_outlet_summary(
+    params: Mapping[str, Any],
+    section_rnx_updu_section_power_distribution_names: Optional[PowerNames],
+    section_rnx_updu_section_power_distribution: Optional[PowerSection],
+    section_rnx_updu_section_power_outlet_names: Optional[PowerSection],
+    section_rnx_updu_section_power_outlet: Optional[PowerSection],
+) -> DiscoveryResult:
+    yield from discover_outlet_summary(params, section_rnx_updu_section_power_outlet_names,
+                                       section_rnx_updu_section_power_outlet)
+
+
+@profiled
+def check_rnx_updu_power_outlet_summary(
+    item: str,
+    params: Mapping[str, Any],
+    section_rnx_updu_section_power_distribution_names: Optional[PowerNames],
+    section_rnx_updu_section_power_distribution: Optional[PowerSection],
+    section_rnx_updu_section_power_outlet_names: Optional[PowerSection],
+    section_rnx_updu_section_power_outlet: Optional[PowerSection],
+) -> CheckResult:
+    yield from check_outlet_summary(item, params, section_rnx_updu_section_power_outlet_names,
+                                    section_rnx_updu_section_power_outlet,
+                                    section_rnx_updu_section_power_distribution_names,
+                                    section_rnx_updu_section_power_distribution)
+
+
+check_plugin_rnx_updu_power_outlet_summary = CheckPlugin(
+    name='rnx_updu_power_outlet_summary',
+    sections=power_output_sections,
+    service_name='Outlets %s',
+    discovery_function=discover_rnx_updu_power_outlet_summary,
+    discovery_ruleset_name='rnx_updu_discovery',
+    discovery_default_parameters={'tiers': power_tiers},
+    check_function=check_rnx_updu_power_outlet_summary,
+    check_ruleset_name='rnx_updu_outlet_summary',
+    check_default_parameters=SUMMARY_PARAMS,
 )
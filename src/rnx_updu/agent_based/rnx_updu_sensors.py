@@ -5,7 +5,6 @@ from typing import Dict, List
 
 from cmk.agent_based.v2 import (
     CheckResult,
-    startswith,
     DiscoveryResult,
     Result,
     Service,
@@ -19,10 +18,11 @@ from cmk.agent_based.v2 import (
 from cmk.plugins.lib.humidity import check_humidity
 from cmk.plugins.lib.temperature import check_temperature, TempParamType
 
-try:
-    from cmk.ccc import debug
-except ImportError:
-    from cmk.utils import debug
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_mib import DETECT_RNX_UPDU, SENSOR_TABLE, map_data_quality
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_log import PluginLog
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_perf import parse_stats, profiled
+
+_log = PluginLog('sensors')
 
 #
 # SNMP DEFINITIONS - Moved to top so they're available for SimpleSNMPSection
@@ -44,7 +44,7 @@ sensor_oids = [
 
 # Sensor OID bases (index 6)
 sensor_bases = [
-    '.1.3.6.1.4.1.55108.2.23.2.1',  # 6: upduMib2Sensor
+    SENSOR_TABLE,  # 6
 ]
 
 
@@ -53,19 +53,15 @@ snmp_sensor_trees = (
 )
 
 
-map_data_quality = {
-    '0': (State.OK, 'OK'),
-    '1': (State.WARN, 'Expired'),
-    '2': (State.UNKNOWN, 'No Data'),
-}
-
-
+@profiled
+@parse_stats(quality=5)
 def parse_rnx_updu_sensor(
     string_table: List[StringTable],
 ) -> Dict:
 
-    if debug.enabled():
-        print(f'DEBUG: string_table: {string_table}')
+    log = _log.call()
+    if log:
+        log.debug('parse: rows per table: %s', [len(table) for table in string_table])
 
     #
     # TEMPERATURE
@@ -77,21 +73,16 @@ def parse_rnx_updu_sensor(
             for sysname, custname, desc, port, t, qual_t, rh, qual_rh in string_table[index]:
                 # If there is any power object with 'No Data' quality, we skip it
                 # as it basically means that the channel is no licensed.
-                if debug.enabled():
-                    print(f'DEBUG: string_table[index]: {string_table[index]}')
-
                 dq, dq_t = map_data_quality[qual_t]
-                if debug.enabled():
-                    print(f'DEBUG: dq: {dq}, dq_t: {dq_t}')
+                if dq == State.UNKNOWN:
+                    if log:
+                        log.row('Ignoring %s on %s due to NoData Quality %s', sysname, port, qual_t)
+                    continue
                 objname = f"{sysname} Temperature on {port}"
                 if len(custname) > 1:
                     objname += f' ({custname})'
                 if len(desc) > 1:
                     objname += f' [{desc}]'
-                if dq == State.UNKNOWN:
-                    if debug.enabled():
-                        print(f'WRN: Ignoring {objname} due to NoData Quality {qual_t}: {string_table[index]}')
-                    continue
 
                 val = {
                     'name': objname,
@@ -116,15 +107,15 @@ def parse_rnx_updu_sensor(
                 # If there is any power object with 'No Data' quality, we skip it
                 # as it basically means that the channel is no licensed.
                 dq, dq_rh = map_data_quality[qual_rh]
+                if dq == State.UNKNOWN:
+                    if log:
+                        log.row('Ignoring %s on %s due to NoData Quality %s', sysname, port, qual_rh)
+                    continue
                 objname = f'{sysname} Humidity on {port}'
                 if len(custname) > 1:
                     objname += f' ({custname})'
                 if len(desc) > 1:
                     objname += f' [{desc}]'
-                if dq == State.UNKNOWN:
-                    if debug.enabled():
-                        print(f'WRN: Ignoring {objname} due to NoData Quality {qual_rh}')
-                    continue
 
                 val = {
                     'label': objname,
@@ -134,6 +125,8 @@ def parse_rnx_updu_sensor(
                     'status': dq,
                     'status_name': dq_rh,
                 }
+                if log:
+                    log.row('parse: %s: %s', sysname, val)
                 data[sysname] = val
         return data
     parsed_data = {}
@@ -144,6 +137,8 @@ def parse_rnx_updu_sensor(
     ]
     parsed_data['temperature'] = sensor_temp(string_table, aux_sens_objs)
     parsed_data['humidity'] = sensor_rh(string_table, aux_sens_objs)
+    if log:
+        log.done()
 
     return parsed_data
 
@@ -151,7 +146,7 @@ def parse_rnx_updu_sensor(
 # SNMP Section Registration
 snmp_section_rnx_updu = SNMPSection(
     name='rnx_updu_section_sensor',
-    detect=startswith('.1.3.6.1.2.1.1.1.0', 'RNX UPDU'),
+    detect=DETECT_RNX_UPDU,
     parse_function=parse_rnx_updu_sensor,
     fetch=list(snmp_sensor_trees),
 )
@@ -160,11 +155,13 @@ snmp_section_rnx_updu = SNMPSection(
 #
 # TEMPERATURE
 #
+@profiled
 def discover_rnx_updu_temp(section: Dict) -> DiscoveryResult:
     for key in section["temperature"]:
         yield Service(item=key)
 
 
+@profiled
 def check_rnx_updu_temp(item: str, params: TempParamType, section: Dict) -> CheckResult:
     reading = section["temperature"][item]['reading']
     status = section["temperature"][item]['status']
@@ -193,11 +190,13 @@ check_plugin__rnx_updu_temp = CheckPlugin(
 #
 # HUMIDITY
 #
+@profiled
 def discover_rnx_updu_rh(section: Dict) -> DiscoveryResult:
     for key in section["humidity"]:
         yield Service(item=key)
 
 
+@profiled
 def check_rnx_updu_rh(item: str, params: TempParamType, section: Dict) -> CheckResult:
     reading = section["humidity"][item]['reading']
     status = section["humidity"][item]['status']
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+# Metrics of the energy of the running hour, day and month, see check_energy()
+# in rnx_updu_energy.py. The energy counter and the average power are the
+# energy and power metrics of Checkmk.
+
+from cmk.graphing.v1 import Title
+from cmk.graphing.v1.metrics import Color, DecimalNotation, Metric, Unit
+
+UNIT_KILOWATT_HOUR = Unit(DecimalNotation('kWh'))
+
+#
+# ROLLUPS
+#
+metric_energy_hour = Metric(
+    name='energy_hour',
+    title=Title('Energy of the running hour'),
+    unit=UNIT_KILOWATT_HOUR,
+    color=Color.LIGHT_BLUE,
+)
+
+metric_energy_day = Metric(
+    name='energy_day',
+    title=Title('Energy of the running day'),
+    unit=UNIT_KILOWATT_HOUR,
+    color=Color.BLUE,
+)
+
+metric_energy_month = Metric(
+    name='energy_month',
+    title=Title('Energy of the running month'),
+    unit=UNIT_KILOWATT_HOUR,
+    color=Color.DARK_BLUE,
+)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+# Metrics of the phase balance, see check_phase_balance() in
+# rnx_updu_phase_balance.py. The headroom metrics are named by the position
+# of the wire in the PDU.
+
+from cmk.graphing.v1 import Title
+from cmk.graphing.v1.graphs import Graph
+from cmk.graphing.v1.metrics import Color, DecimalNotation, Metric, Unit
+
+UNIT_AMPERE = Unit(DecimalNotation('A'))
+UNIT_PERCENTAGE = Unit(DecimalNotation('%'))
+
+#
+# IMBALANCE
+#
+metric_phase_imbalance = Metric(
+    name='phase_imbalance',
+    title=Title('Phase imbalance'),
+    unit=UNIT_PERCENTAGE,
+    color=Color.ORANGE,
+)
+
+metric_neutral_current = Metric(
+    name='neutral_current',
+    title=Title('Estimated neutral current'),
+    unit=UNIT_AMPERE,
+    color=Color.PURPLE,
+)
+
+#
+# HEADROOM
+#
+metric_headroom_l1 = Metric(
+    name='headroom_l1',
+    title=Title('Headroom of the first phase'),
+    unit=UNIT_AMPERE,
+    color=Color.BROWN,
+)
+
+metric_headroom_l2 = Metric(
+    name='headroom_l2',
+    title=Title('Headroom of the second phase'),
+    unit=UNIT_AMPERE,
+    color=Color.GRAY,
+)
+
+metric_headroom_l3 = Metric(
+    name='headroom_l3',
+    title=Title('Headroom of the third phase'),
+    unit=UNIT_AMPERE,
+    color=Color.BLUE,
+)
+
+graph_phase_headroom = Graph(
+    name='rnx_updu_phase_headroom',
+    title=Title('Headroom of the phases'),
+    simple_lines=['headroom_l1', 'headroom_l2', 'headroom_l3'],
+    optional=['headroom_l2', 'headroom_l3'],
+)
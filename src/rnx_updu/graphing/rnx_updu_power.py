@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+# Metrics of the readings sampled between the checks, see check_samples() in
+# rnx_updu_power.py. The plain current and power metrics are the ones of
+# Checkmk.
+
+from cmk.graphing.v1 import Title
+from cmk.graphing.v1.graphs import Graph
+from cmk.graphing.v1.metrics import Color, DecimalNotation, Metric, Unit
+
+UNIT_AMPERE = Unit(DecimalNotation('A'))
+UNIT_WATT = Unit(DecimalNotation('W'))
+
+#
+# SAMPLED CURRENT
+#
+metric_current_min = Metric(
+    name='current_min',
+    title=Title('Minimum sampled current'),
+    unit=UNIT_AMPERE,
+    color=Color.LIGHT_GREEN,
+)
+
+metric_current_max = Metric(
+    name='current_max',
+    title=Title('Maximum sampled current'),
+    unit=UNIT_AMPERE,
+    color=Color.RED,
+)
+
+metric_current_avg = Metric(
+    name='current_avg',
+    title=Title('Average sampled current'),
+    unit=UNIT_AMPERE,
+    color=Color.BLUE,
+)
+
+metric_current_p95 = Metric(
+    name='current_p95',
+    title=Title('95th percentile of the sampled current'),
+    unit=UNIT_AMPERE,
+    color=Color.ORANGE,
+)
+
+graph_current_samples = Graph(
+    name='rnx_updu_current_samples',
+    title=Title('Sampled current'),
+    simple_lines=['current_max', 'current_p95', 'current_avg', 'current_min'],
+)
+
+#
+# SAMPLED POWER
+#
+metric_power_min = Metric(
+    name='power_min',
+    title=Title('Minimum sampled power'),
+    unit=UNIT_WATT,
+    color=Color.LIGHT_GREEN,
+)
+
+metric_power_max = Metric(
+    name='power_max',
+    title=Title('Maximum sampled power'),
+    unit=UNIT_WATT,
+    color=Color.RED,
+)
+
+metric_power_avg = Metric(
+    name='power_avg',
+    title=Title('Average sampled power'),
+    unit=UNIT_WATT,
+    color=Color.BLUE,
+)
+
+metric_power_p95 = Metric(
+    name='power_p95',
+    title=Title('95th percentile of the sampled power'),
+    unit=UNIT_WATT,
+    color=Color.ORANGE,
+)
+
+graph_power_samples = Graph(
+    name='rnx_updu_power_samples',
+    title=Title('Sampled power'),
+    simple_lines=['power_max', 'power_p95', 'power_avg', 'power_min'],
+)
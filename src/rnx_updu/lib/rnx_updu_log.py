@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+# Debug output of the plugins. Each module has a logger below "rnx_updu", e.g.
+# "rnx_updu.power", which writes to stdout while Checkmk runs with --debug:
+#
+#     cmk -v --debug <host>
+#
+# A plugin function takes its log once per call with PluginLog.call(), which
+# is None without --debug, so the rows are not looked at for logging at all. The
+# messages are formatted by logging only when written, and per call at most
+# RNX_UPDU_LOG_ROWS rows are logged, the others are only counted.
+#
+# The environment of the Checkmk process narrows the output further:
+#
+#     RNX_UPDU_LOG=sensors=WARNING,power=DEBUG   levels per module, or one level for all
+#     RNX_UPDU_LOG_ROWS=10                        rows logged per call, 0 for all
+#     RNX_UPDU_LOG_MATCH=Outlet12                 only rows mentioning this text
+
+import logging
+import os
+import sys
+from typing import Any, Dict, Optional
+
+try:
+    from cmk.ccc import debug
+except ImportError:
+    from cmk.utils import debug
+
+LOGGER_NAME = 'rnx_updu'
+
+
+def _levels(value: str) -> Dict[str, int]:
+    """'sensors=WARNING,power=DEBUG' by module, a bare level for all modules ('')."""
+    levels = {}
+    for entry in value.split(','):
+        module, _sep, level = entry.strip().rpartition('=')
+        level = logging.getLevelName(level.strip().upper())
+        if isinstance(level, int):
+            levels[module.strip()] = level
+    return levels
+
+
+def _row_limit(value: str) -> int:
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        return 10
+
+
+# Decided once at import, like the profiling in rnx_updu_perf.py
+LEVELS = _levels(os.environ.get('RNX_UPDU_LOG', ''))
+ROW_LIMIT = _row_limit(os.environ.get('RNX_UPDU_LOG_ROWS', '10'))
+MATCH = os.environ.get('RNX_UPDU_LOG_MATCH', '')
+
+_handler: Optional[logging.Handler] = None
+
+
+def _setup() -> None:
+    """Write the package logger to stdout, where the output of cmk --debug goes."""
+    global _handler
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(name)s %(levelname)s: %(message)s'))
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.addHandler(_handler)
+    logger.setLevel(LEVELS.get('', logging.DEBUG))
+    logger.propagate = False
+
+
+class CallLog:
+    """Debug output of one call of a plugin function."""
+    __slots__ = ('logger', 'rows', 'logged')
+
+    def __init__(self, logger: logging.Logger) -> None:
+        self.logger = logger
+        self.rows = 0
+        self.logged = 0
+
+    def debug(self, msg: str, *args: Any) -> None:
+        self.logger.debug(msg, *args)
+
+    def warning(self, msg: str, *args: Any) -> None:
+        self.logger.warning(msg, *args)
+
+    def row(self, msg: str, *args: Any, level: int = logging.DEBUG) -> None:
+        """Log a message about a row, up to ROW_LIMIT per call."""
+        if not self.logger.isEnabledFor(level):
+            return
+        if MATCH and MATCH not in msg % args:
+            return
+        self.rows += 1
+        if ROW_LIMIT and self.logged >= ROW_LIMIT:
+            return
+        self.logged += 1
+        self.logger.log(level, msg, *args)
+
+    def done(self) -> None:
+        """Report the rows left out by the limit."""
+        if self.rows > self.logged:
+            self.logger.info('%d more rows not logged, see RNX_UPDU_LOG_ROWS', self.rows - self.logged)
+
+
+class PluginLog:
+    """Logger of one module, e.g. PluginLog('power') logs as rnx_updu.power."""
+    __slots__ = ('logger',)
+
+    def __init__(self, module: str) -> None:
+        self.logger = logging.getLogger(f'{LOGGER_NAME}.{module}')
+        if module in LEVELS:
+            self.logger.setLevel(LEVELS[module])
+
+    def call(self) -> Optional[CallLog]:
+        """The log of a call, None without --debug. Taken once per call, not per row."""
+        if not debug.enabled():
+            return None
+        if _handler is None:
+            _setup()
+        # e.g. RNX_UPDU_LOG=sensors=ERROR turns a module off
+        if not self.logger.isEnabledFor(logging.WARNING):
+            return None
+        return CallLog(self.logger)
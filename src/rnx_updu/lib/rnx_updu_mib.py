@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+# Definitions shared by the RNX UPDU plugins: the detection of the device, the
+# tables of the UPDU-MIB2 and the identity of the PDUs, which is fetched once
+# by the section rnx_updu_section_pdu for the power and inventory plugins.
+
+from cmk.agent_based.v2 import OIDEnd, State, startswith
+
+DETECT_RNX_UPDU = startswith('.1.3.6.1.2.1.1.1.0', 'RNX UPDU')
+
+#
+# UPDU-MIB2 tables, the columns are below <table>.<column>.<index>
+#
+PDU_TABLE = '.1.3.6.1.4.1.55108.2.1.2.1'        # upduMib2PDU
+INLET_TABLE = '.1.3.6.1.4.1.55108.2.2.2.1'      # upduMib2Inlet
+WIRE_TABLE = '.1.3.6.1.4.1.55108.2.4.2.1'       # upduMib2Wire
+BRANCH_TABLE = '.1.3.6.1.4.1.55108.2.5.2.1'     # upduMib2Branch
+ICM_TABLE = '.1.3.6.1.4.1.55108.2.6.2.1'        # upduMib2ICM
+MODULE_TABLE = '.1.3.6.1.4.1.55108.2.8.2.1'     # upduMib2Module
+OUTLET_TABLE = '.1.3.6.1.4.1.55108.2.9.2.1'     # upduMib2Outlet
+SENSOR_TABLE = '.1.3.6.1.4.1.55108.2.23.2.1'    # upduMib2Sensor
+
+# upduMib2<ObjectType>MeterDataQuality and the sensor qualities
+map_data_quality = {
+    '0': (State.OK, 'OK'),
+    '1': (State.WARN, 'Expired'),
+    '2': (State.UNKNOWN, 'No Data'),
+}
+
+# Data quality of channels that are not licensed
+NO_DATA = '2'
+
+#
+# PDU identity
+#
+pdu_oids = [
+    OIDEnd(),
+    '2',   # upduMib2PDUSystemName
+    '3',   # upduMib2PDUCustomName
+    '4',   # upduMib2PDUDescription
+    '5',   # upduMib2PDUSerialNumber
+    '6',   # upduMib2PDUPartNumber
+    '7',   # upduMib2PDULotNumber
+    '50',  # upduMib2PDUMeterDataQuality
+    '11',  # upduMib2PDUObjectPath
+]
+
+
+class PduIdentity:
+    __slots__ = ('index', 'system_name', 'custom_name', 'description', 'serial_number', 'part_number',
+                 'lot_number', 'quality', 'path')
+
+    def __init__(self, index: str, system_name: str, custom_name: str, description: str, serial_number: str,
+                 part_number: str, lot_number: str, quality: str, path: str) -> None:
+        self.index = index
+        self.system_name = system_name
+        self.custom_name = custom_name
+        self.description = description
+        self.serial_number = serial_number
+        self.part_number = part_number
+        self.lot_number = lot_number
+        self.quality = quality
+        self.path = path
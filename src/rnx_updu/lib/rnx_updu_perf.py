@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+# Self-monitoring of the plugins. The parse functions of the SNMP sections are
+# wrapped by parse_stats, which attaches the duration and the row counts of
+# the parse to the parsed section. The service "RNX UPDU Plugin Performance"
+# (agent_based/rnx_updu_plugin_performance.py) reports them for the sections
+# it is handed by Checkmk, so only the parses of the checked host.
+#
+# With the environment variable RNX_UPDU_PROFILE set, the parse, discovery,
+# check and inventory functions are also profiled, see profiled below.
+
+import cProfile
+import functools
+import gc
+import inspect
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+from cmk.agent_based.v2 import StringTable
+
+from cmk_addons.plugins.rnx_updu.lib.rnx_updu_mib import NO_DATA
+
+
+class ParseStats:
+    """Duration, rows per SNMPTree and "No Data" rows of the parse of a section.
+
+    Counting the "No Data" rows takes a pass over the rows, more than the lazy
+    power parse functions take themselves. They are counted the first time
+    nodata is read, i.e. by the Plugin Performance service only. Until then
+    the stats keep the string table, as long as the section, for one check of
+    the host.
+    """
+
+    __slots__ = ('seconds', 'rows', '_string_table', '_quality', '_nodata')
+
+    def __init__(self, seconds: float, string_table: List[StringTable], quality: Optional[int]) -> None:
+        self.seconds = seconds
+        self.rows = [len(table) for table in string_table]
+        self._string_table: Optional[List[StringTable]] = string_table if quality is not None else None
+        self._quality = quality
+        self._nodata: Optional[int] = None
+
+    @property
+    def nodata(self) -> Optional[int]:
+        """The "No Data" rows, None for sections without a MeterDataQuality column."""
+        if self._string_table is not None:
+            quality = self._quality
+            self._nodata = sum(1 for table in self._string_table for row in table if row[quality] == NO_DATA)
+            self._string_table = None
+        return self._nodata
+
+
+class StatsDict(dict):
+    """A section parsed into a plain dict, which can carry the stats of its parse."""
+
+    __slots__ = ('parse_stats',)
+
+
+def parse_stats(quality: Optional[int] = None) -> Callable:
+    """Attach the duration, the rows per SNMPTree and the "No Data" rows of a parse to the section.
+
+    quality is the position of the MeterDataQuality column in the rows, if any.
+    The section must have a parse_stats attribute, sections parsed into a dict
+    are handed on as StatsDict.
+    """
+    def decorate(parse_function: Callable[[List[StringTable]], Any]) -> Callable[[List[StringTable]], Any]:
+        @functools.wraps(parse_function)
+        def parse(string_table: List[StringTable]) -> Any:
+            start = time.perf_counter()
+            section = parse_function(string_table)
+            seconds = time.perf_counter() - start
+            if type(section) is dict:
+                section = StatsDict(section)
+            section.parse_stats = ParseStats(seconds, string_table, quality)
+            return section
+        return parse
+    return decorate
+
+
+def find_parse_stats(section: Any) -> Optional[ParseStats]:
+    """The statistics of the parse which returned this section object."""
+    return getattr(section, 'parse_stats', None)
+
+
+_NOT_DATA = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def approx_size(obj: Any) -> int:
+    """Bytes of an object and all objects it references, except code and classes.
+
+    The objects are found by their references as seen by the garbage collector,
+    so lazily decoded sections are measured as they are and not decoded.
+    """
+    seen = set()
+    size = 0
+    todo = [obj]
+    while todo:
+        obj = todo.pop()
+        if id(obj) in seen or isinstance(obj, _NOT_DATA):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        todo.extend(gc.get_referents(obj))
+    return size
+
+
+#
+# Profiling
+#
+def _profile_dir() -> Optional[Path]:
+    """RNX_UPDU_PROFILE=1 profiles into ~/tmp/rnx_updu/profile, any other value is taken as the directory."""
+    value = os.environ.get('RNX_UPDU_PROFILE', '')
+    if value in ('', '0'):
+        return None
+    if value != '1':
+        return Path(value)
+    return Path(os.environ.get('OMD_ROOT', tempfile.gettempdir())) / 'tmp' / 'rnx_updu' / 'profile'
+
+
+# Decided once at import, the plugins are loaded with the environment of the
+# Checkmk process, e.g. RNX_UPDU_PROFILE=1 cmk -v --debug <host>
+PROFILE_DIR = _profile_dir()
+
+# Allocations are attributed to the package by the files of their traceback,
+# those of tracemalloc taking the snapshots are left out
+_PACKAGE_FILES = [
+    tracemalloc.Filter(True, '*/rnx_updu/*', all_frames=True),
+    tracemalloc.Filter(False, tracemalloc.__file__, all_frames=True),
+]
+
+
+def _run_profiled(name: str, profile: cProfile.Profile, call: Callable[[], Any]) -> Any:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(25)
+    before = tracemalloc.take_snapshot().filter_traces(_PACKAGE_FILES)
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is active, e.g. with cmk --profile
+        return call()
+    try:
+        return call()
+    finally:
+        profile.disable()
+        after = tracemalloc.take_snapshot().filter_traces(_PACKAGE_FILES)
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        prefix = PROFILE_DIR / f'{name}.{os.getpid()}'
+        profile.dump_stats(f'{prefix}.pstats')
+        after.dump(f'{prefix}.snapshot')
+        with open(f'{prefix}.alloc.txt', 'w') as alloc:
+            for stat in after.compare_to(before, 'lineno')[:25]:
+                alloc.write(f'{stat}\n')
+
+
+def profiled(func: Callable) -> Callable:
+    """Profile a plugin function with cProfile and tracemalloc if RNX_UPDU_PROFILE is set.
+
+    Without it the function itself is returned, so profiling costs nothing when
+    off. Otherwise every call adds to the pstats of the function in this
+    process and writes the allocations of the package still held afterwards,
+    as a tracemalloc snapshot and as a list of the largest changes by line:
+
+        <dir>/<function>.<pid>.pstats
+        <dir>/<function>.<pid>.snapshot
+        <dir>/<function>.<pid>.alloc.txt
+
+    The results of discovery, check and inventory functions are collected
+    within the profile, so that it does not include the caller.
+    """
+    if PROFILE_DIR is None:
+        return func
+    profile = cProfile.Profile()
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def profiled_generator(*args: Any, **kwargs: Any) -> Any:
+            yield from _run_profiled(func.__name__, profile, lambda: list(func(*args, **kwargs)))
+        return profiled_generator
+
+    @functools.wraps(func)
+    def profiled_function(*args: Any, **kwargs: Any) -> Any:
+        return _run_profiled(func.__name__, profile, lambda: func(*args, **kwargs))
+    return profiled_function
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+from cmk.rulesets.v1 import Help, Label, Title
+from cmk.rulesets.v1.form_specs import (
+    BooleanChoice,
+    DefaultValue,
+    DictElement,
+    Dictionary,
+    Float,
+    Integer,
+    LevelDirection,
+    List,
+    MultipleChoice,
+    MultipleChoiceElement,
+    SingleChoice,
+    SimpleLevels,
+    SingleChoiceElement,
+    String,
+    validators,
+)
+from cmk.rulesets.v1.rule_specs import DiscoveryParameters, Topic
+
+# Must match the tiers of the power objects in agent_based/rnx_updu_power.py
+POWER_TIERS = [
+    ('pdu', Title('PDU')),
+    ('inlets', Title('Inlets')),
+    ('wires', Title('Wires (phases)')),
+    ('branch', Title('Branches')),
+    ('module', Title('Modules')),
+    ('outlet', Title('Outlets')),
+]
+
+# Must match POWER_METRICS in agent_based/rnx_updu_power.py
+POWER_METRICS = [
+    ('voltage', Title('Voltage')),
+    ('current', Title('Current')),
+    ('power', Title('Active power')),
+    ('appower', Title('Apparent power')),
+    ('energy', Title('Energy')),
+]
+
+# Must match FORECAST_TIERS in agent_based/rnx_updu_power.py
+FORECAST_TIERS = [(name, title) for name, title in POWER_TIERS if name in ('inlets', 'wires', 'branch', 'module')]
+
+# Tiers with optional spike detection
+SPIKE_TIERS = [(name, title) for name, title in POWER_TIERS if name in ('branch', 'module', 'outlet')]
+
+
+def _parameter_form() -> Dictionary:
+    return Dictionary(
+        elements={
+            'tiers': DictElement(
+                parameter_form=MultipleChoice(
+                    title=Title('Power objects to monitor'),
+                    help_text=Help(
+                        'Only the selected power objects become services. The SNMP tables are '
+                        'fetched in two groups: PDU, inlets and wires; branches, modules and outlets. '
+                        'Once none of the objects of a group is monitored, the tables of that group '
+                        'are no longer fetched from the device.'
+                    ),
+                    elements=[MultipleChoiceElement(name=name, title=title) for name, title in POWER_TIERS],
+                    prefill=DefaultValue([name for name, _title in POWER_TIERS]),
+                ),
+                required=True,
+            ),
+            'energy': DictElement(
+                parameter_form=MultipleChoice(
+                    title=Title('Energy services'),
+                    help_text=Help(
+                        'Create an additional "Energy" service for each selected power object. It '
+                        'shows the average power since the last check, computed from the energy '
+                        'counter, and the energy of the running and the last hour, day and month. '
+                        'The averages stay accurate with long fetch intervals of the power sections.'
+                    ),
+                    elements=[MultipleChoiceElement(name=name, title=title) for name, title in POWER_TIERS],
+                    prefill=DefaultValue([]),
+                ),
+            ),
+            'metrics': DictElement(
+                parameter_form=Dictionary(
+                    title=Title('Metrics of the power services'),
+                    help_text=Help(
+                        'Limit the metrics the power services of a kind of object report, e.g. only '
+                        'the active power and the energy of the outlets. Every metric is stored in a '
+                        'file of its own, on units with many outlets leaving some out reduces the disk '
+                        'I/O of the monitoring server considerably. The levels are checked on all '
+                        'readings regardless. Kinds of objects not listed report all metrics. Takes '
+                        'effect with the next service discovery.'
+                    ),
+                    elements={
+                        name: DictElement(
+                            parameter_form=MultipleChoice(
+                                title=title,
+                                elements=[MultipleChoiceElement(name=metric, title=metric_title)
+                                          for metric, metric_title in POWER_METRICS],
+                                prefill=DefaultValue([metric for metric, _title in POWER_METRICS]),
+                            ),
+                        )
+                        for name, title in POWER_TIERS
+                    },
+                ),
+            ),
+            'forecast': DictElement(
+                parameter_form=Dictionary(
+                    title=Title('Capacity forecast'),
+                    help_text=Help(
+                        'The services of the selected inlets, wires, branches and modules follow the '
+                        'trend and the peaks of their current and forecast the days until the rated '
+                        'current is reached, once they have two weeks of history. The modules report their rating, '
+                        'for the other objects it has to be set here, otherwise only the trend is '
+                        'shown. A rating set here also overrides the one reported by a module. Takes '
+                        'effect with the next service discovery.'
+                    ),
+                    elements={
+                        'tiers': DictElement(
+                            parameter_form=MultipleChoice(
+                                title=Title('Power objects'),
+                                elements=[MultipleChoiceElement(name=name, title=title)
+                                          for name, title in FORECAST_TIERS],
+                                prefill=DefaultValue([name for name, _title in FORECAST_TIERS]),
+                            ),
+                            required=True,
+                        ),
+                        'rated_current': DictElement(
+                            parameter_form=Dictionary(
+                                title=Title('Rated current'),
+                                elements={
+                                    name: DictElement(
+                                        parameter_form=Float(
+                                            title=title,
+                                            unit_symbol='A',
+                                            custom_validate=(validators.NumberInRange(min_value=0.1),),
+                                        ),
+                                    )
+                                    for name, title in FORECAST_TIERS
+                                },
+                            ),
+                        ),
+                        'days': DictElement(
+                            parameter_form=SimpleLevels(
+                                title=Title('Levels on the days until the rated current is reached'),
+                                level_direction=LevelDirection.LOWER,
+                                form_spec_template=Float(unit_symbol='days'),
+                                prefill_fixed_levels=DefaultValue((30.0, 7.0)),
+                            ),
+                            required=True,
+                        ),
+                    },
+                ),
+            ),
+            'spikes': DictElement(
+                parameter_form=Dictionary(
+                    title=Title('Spike detection'),
+                    help_text=Help(
+                        'The services of the selected objects keep their last current and power '
+                        'readings and become WARN when a reading jumps away from their average by more '
+                        'than the given number of standard deviations or by more than the given delta, '
+                        'e.g. on a failing power supply, before the levels are reached. A lasting step '
+                        'becomes the new normal once the readings of the given number of checks are '
+                        'taken after it. Takes effect with the next service discovery.'
+                    ),
+                    elements={
+                        'tiers': DictElement(
+                            parameter_form=MultipleChoice(
+                                title=Title('Power objects'),
+                                elements=[MultipleChoiceElement(name=name, title=title) for name, title in SPIKE_TIERS],
+                                prefill=DefaultValue(['branch', 'outlet']),
+                            ),
+                            required=True,
+                        ),
+                        'samples': DictElement(
+                            parameter_form=Integer(
+                                title=Title('Number of checks to compare with'),
+                                prefill=DefaultValue(10),
+                                custom_validate=(validators.NumberInRange(min_value=3, max_value=100),),
+                            ),
+                            required=True,
+                        ),
+                        'k': DictElement(
+                            parameter_form=Float(
+                                title=Title('Jump in standard deviations'),
+                                prefill=DefaultValue(4.0),
+                                custom_validate=(validators.NumberInRange(min_value=1.0),),
+                            ),
+                            required=True,
+                        ),
+                        'current_delta': DictElement(
+                            parameter_form=Float(
+                                title=Title('Jump of the current'),
+                                unit_symbol='A',
+                                prefill=DefaultValue(2.0),
+                            ),
+                        ),
+                        'power_delta': DictElement(
+                            parameter_form=Float(
+                                title=Title('Jump of the power'),
+                                unit_symbol='W',
+                                prefill=DefaultValue(500.0),
+                            ),
+                        ),
+                    },
+                ),
+            ),
+            'outlet_summary': DictElement(
+                parameter_form=Dictionary(
+                    title=Title('Summarize outlets'),
+                    help_text=Help(
+                        'Instead of one service per outlet, create one "Outlets" service per PDU or '
+                        'per module. It shows the total, minimum and maximum power, the most loaded '
+                        'outlets and the worst state of all outlets, checked against the levels of '
+                        'the rule "RNX UPDU outlet summary". Only the outlets listed below keep a '
+                        'service of their own.'
+                    ),
+                    elements={
+                        'group': DictElement(
+                            parameter_form=SingleChoice(
+                                title=Title('One service per'),
+                                elements=[
+                                    SingleChoiceElement(name='pdu', title=Title('PDU')),
+                                    SingleChoiceElement(name='module', title=Title('Module')),
+                                ],
+                                prefill=DefaultValue('pdu'),
+                            ),
+                            required=True,
+                        ),
+                        'outlets': DictElement(
+                            parameter_form=List(
+                                title=Title('Outlets with individual services'),
+                                help_text=Help('System names or custom names of the outlets.'),
+                                element_template=String(),
+                            ),
+                            required=True,
+                        ),
+                    },
+                ),
+            ),
+            'parent_down': DictElement(
+                parameter_form=BooleanChoice(
+                    title=Title('Parent down'),
+                    label=Label('Do not alarm on objects below a branch, module, inlet or wire without power'),
+                    help_text=Help(
+                        'Branches, modules and outlets below an object without voltage stay OK with '
+                        '"Parent down" instead of raising an alarm each. The parents are found by the '
+                        'object paths in the branch and module tables: an inlet or wire is taken as '
+                        'down when none of the branches and modules below it has voltage. The inlets '
+                        'and wires themselves should be monitored, they are not suppressed. Takes '
+                        'effect with the next service discovery.'
+                    ),
+                    prefill=DefaultValue(False),
+                ),
+            ),
+            'plugin_performance': DictElement(
+                parameter_form=BooleanChoice(
+                    title=Title('Plugin performance'),
+                    label=Label('Create the service "RNX UPDU Plugin Performance"'),
+                    help_text=Help(
+                        'The service shows how long the parse functions of this extension took on the '
+                        'host, how many rows each SNMP table returned, how many of them were "No Data" '
+                        'and the approximate memory of the parsed sections, with metrics for each. It '
+                        'reads all sections of the extension except the inventory, so with this '
+                        'service all of them are fetched, regardless of the power objects selected above.'
+                    ),
+                    prefill=DefaultValue(False),
+                ),
+            ),
+        },
+    )
+
+
+rule_spec_rnx_updu_discovery = DiscoveryParameters(
+    name='rnx_updu_discovery',
+    title=Title('RNX UPDU power discovery'),
+    topic=Topic.POWER,
+    parameter_form=_parameter_form,
+)
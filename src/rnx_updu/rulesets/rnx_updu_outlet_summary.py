@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+from cmk.rulesets.v1 import Help, Title
+from cmk.rulesets.v1.form_specs import (
+    DefaultValue,
+    DictElement,
+    Dictionary,
+    Float,
+    Integer,
+    LevelDirection,
+    SimpleLevels,
+    validators,
+)
+from cmk.rulesets.v1.rule_specs import CheckParameters, HostAndItemCondition, Topic
+
+
+def _levels(title: Title, direction: LevelDirection, unit: str, prefill: tuple) -> DictElement:
+    return DictElement(
+        parameter_form=SimpleLevels(
+            title=title,
+            level_direction=direction,
+            form_spec_template=Float(unit_symbol=unit),
+            prefill_fixed_levels=DefaultValue(prefill),
+        ),
+    )
+
+
+def _parameter_form() -> Dictionary:
+    return Dictionary(
+        help_text=Help(
+            'The levels are checked on every outlet of the summary, the service shows the worst state '
+            'of them and lists the outlets that are not OK.'
+        ),
+        elements={
+            'top_n': DictElement(
+                parameter_form=Integer(
+                    title=Title('Number of most loaded outlets to show'),
+                    prefill=DefaultValue(5),
+                    custom_validate=(validators.NumberInRange(min_value=0),),
+                ),
+                required=True,
+            ),
+            'voltage': _levels(Title('Lower levels on the voltage of an outlet'), LevelDirection.LOWER, 'V',
+                               (200.0, 195.0)),
+            'current': _levels(Title('Levels on the current of an outlet'), LevelDirection.UPPER, 'A', (9.0, 10.0)),
+            'power': _levels(Title('Levels on the active power of an outlet'), LevelDirection.UPPER, 'W',
+                             (2000.0, 3000.0)),
+            'appower': _levels(Title('Levels on the apparent power of an outlet'), LevelDirection.UPPER, 'VA',
+                               (2500.0, 3300.0)),
+        },
+    )
+
+
+rule_spec_rnx_updu_outlet_summary = CheckParameters(
+    name='rnx_updu_outlet_summary',
+    title=Title('RNX UPDU outlet summary'),
+    topic=Topic.POWER,
+    parameter_form=_parameter_form,
+    condition=HostAndItemCondition(item_title=Title('PDU or module')),
+)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+from cmk.rulesets.v1 import Help, Title
+from cmk.rulesets.v1.form_specs import (
+    DefaultValue,
+    DictElement,
+    Dictionary,
+    Float,
+    LevelDirection,
+    SimpleLevels,
+    validators,
+)
+from cmk.rulesets.v1.rule_specs import CheckParameters, HostAndItemCondition, Topic
+
+
+def _parameter_form() -> Dictionary:
+    return Dictionary(
+        elements={
+            'imbalance': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Levels on the phase imbalance'),
+                    help_text=Help('Largest deviation of a phase current from the average, in percent of the average.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=Float(unit_symbol='%'),
+                    prefill_fixed_levels=DefaultValue((15.0, 25.0)),
+                ),
+                required=True,
+            ),
+            'min_current': DictElement(
+                parameter_form=Float(
+                    title=Title('Minimum average phase current'),
+                    help_text=Help('Below this average phase current the imbalance is not checked.'),
+                    unit_symbol='A',
+                    prefill=DefaultValue(1.0),
+                    custom_validate=(validators.NumberInRange(min_value=0.0),),
+                ),
+                required=True,
+            ),
+            'neutral_current': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Levels on the estimated neutral current'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=Float(unit_symbol='A'),
+                    prefill_fixed_levels=DefaultValue((16.0, 20.0)),
+                ),
+            ),
+            'rated_current': DictElement(
+                parameter_form=Float(
+                    title=Title('Rated current per phase'),
+                    help_text=Help(
+                        'The wires do not report their rating. Without it the headroom of the phases '
+                        'is not checked.'
+                    ),
+                    unit_symbol='A',
+                    prefill=DefaultValue(16.0),
+                    custom_validate=(validators.NumberInRange(min_value=0.1),),
+                ),
+            ),
+            'headroom': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Levels on the headroom of the most loaded phase'),
+                    help_text=Help('Current left up to the rated current, in percent of the rated current.'),
+                    level_direction=LevelDirection.LOWER,
+                    form_spec_template=Float(unit_symbol='%'),
+                    prefill_fixed_levels=DefaultValue((20.0, 10.0)),
+                ),
+                required=True,
+            ),
+        },
+    )
+
+
+rule_spec_rnx_updu_phase_balance = CheckParameters(
+    name='rnx_updu_phase_balance',
+    title=Title('RNX UPDU phase balance'),
+    topic=Topic.POWER,
+    parameter_form=_parameter_form,
+    condition=HostAndItemCondition(item_title=Title('PDU')),
+)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+from cmk.rulesets.v1 import Help, Title
+from cmk.rulesets.v1.form_specs import (
+    DefaultValue,
+    DictElement,
+    Dictionary,
+    Integer,
+    List,
+    MultipleChoice,
+    MultipleChoiceElement,
+    Password,
+    String,
+    TimeMagnitude,
+    TimeSpan,
+    validators,
+)
+from cmk.rulesets.v1.rule_specs import SpecialAgent, Topic
+
+# Must match SECTION_GROUPS in special_agent/agent_rnx_updu.py
+SECTION_GROUPS = [
+    ('power_input', Title('PDU, inlets and wires')),
+    ('power_distribution', Title('Branches and modules')),
+    ('power_outlet', Title('Outlets')),
+    ('sensor', Title('External sensors')),
+    ('inventory', Title('Inventory')),
+    ('interfaces', Title('Network interfaces')),
+]
+
+# Must match SAMPLE_TABLES in special_agent/samples.py
+SAMPLE_TIERS = [
+    ('pdu', Title('PDU')),
+    ('inlets', Title('Inlets')),
+    ('wires', Title('Wires (phases)')),
+    ('branch', Title('Branches')),
+    ('module', Title('Modules')),
+    ('outlet', Title('Outlets')),
+]
+
+
+def _parameter_form() -> Dictionary:
+    return Dictionary(
+        help_text=Help(
+            'Polls RNX UPDUs via SNMPv2c from the special agent instead of the SNMP fetcher of '
+            'Checkmk. All devices of the rule are walked concurrently, which makes one host with '
+            'this rule able to monitor a whole fleet of UPDUs. The data of the devices is then '
+            'written as piggyback data for hosts with the names of the devices.'
+        ),
+        elements={
+            'community': DictElement(
+                parameter_form=Password(title=Title('SNMPv2c community')),
+                required=True,
+            ),
+            'devices': DictElement(
+                parameter_form=List(
+                    title=Title('Devices'),
+                    help_text=Help(
+                        'Host names of the UPDUs to poll, optionally followed by "=" and the IP '
+                        'address, e.g. "updu-a=10.0.0.11". Without devices the host of the rule '
+                        'itself is polled and no piggyback data is written.'
+                    ),
+                    element_template=String(custom_validate=(validators.LengthInRange(min_value=1),)),
+                ),
+            ),
+            'port': DictElement(
+                parameter_form=Integer(
+                    title=Title('UDP port'),
+                    prefill=DefaultValue(161),
+                    custom_validate=(validators.NetworkPort(),),
+                ),
+            ),
+            'timeout': DictElement(
+                parameter_form=TimeSpan(
+                    title=Title('Response timeout'),
+                    displayed_magnitudes=[TimeMagnitude.SECOND, TimeMagnitude.MILLISECOND],
+                    prefill=DefaultValue(2.0),
+                ),
+            ),
+            'retries': DictElement(
+                parameter_form=Integer(
+                    title=Title('Retries per request'),
+                    prefill=DefaultValue(1),
+                    custom_validate=(validators.NumberInRange(min_value=0),),
+                ),
+            ),
+            'device_timeout': DictElement(
+                parameter_form=TimeSpan(
+                    title=Title('Timeout per device'),
+                    help_text=Help('The time a device may take for a complete walk of all its tables.'),
+                    displayed_magnitudes=[TimeMagnitude.SECOND],
+                    prefill=DefaultValue(50.0),
+                ),
+            ),
+            'max_concurrency': DictElement(
+                parameter_form=Integer(
+                    title=Title('Devices polled at the same time'),
+                    prefill=DefaultValue(32),
+                    custom_validate=(validators.NumberInRange(min_value=1),),
+                ),
+            ),
+            'max_varbinds': DictElement(
+                parameter_form=Integer(
+                    title=Title('Values per GetBulk request'),
+                    help_text=Help(
+                        'The columns of a table are walked together, the max-repetitions of a '
+                        'request is this number divided by the number of columns, limited to the '
+                        'number of rows the table had on the last walk.'
+                    ),
+                    prefill=DefaultValue(60),
+                    custom_validate=(validators.NumberInRange(min_value=1),),
+                ),
+            ),
+            'outlet_hosts': DictElement(
+                parameter_form=List(
+                    title=Title('Hosts fed by outlets'),
+                    help_text=Help(
+                        'The readings of these outlets are also written as piggyback data for the '
+                        'host they feed, which then gets the outlet as a power service. The service '
+                        'is named after the device and the system name of the outlet, e.g. '
+                        '"updu-a Outlet1.5". Requires the outlets to be fetched.'
+                    ),
+                    element_template=Dictionary(
+                        elements={
+                            'device': DictElement(
+                                parameter_form=String(
+                                    title=Title('Device'),
+                                    help_text=Help('Name of the device as in the list of devices. '
+                                                   'Without it the outlet is looked up on every device.'),
+                                ),
+                            ),
+                            'outlet': DictElement(
+                                parameter_form=String(
+                                    title=Title('Outlet'),
+                                    help_text=Help('System name or custom name of the outlet.'),
+                                    custom_validate=(validators.LengthInRange(min_value=1),),
+                                ),
+                                required=True,
+                            ),
+                            'host': DictElement(
+                                parameter_form=String(
+                                    title=Title('Host name'),
+                                    custom_validate=(validators.LengthInRange(min_value=1),),
+                                ),
+                                required=True,
+                            ),
+                        },
+                    ),
+                ),
+            ),
+            'samples': DictElement(
+                parameter_form=Dictionary(
+                    title=Title('Sample the power between the checks'),
+                    help_text=Help(
+                        'Starts a sampler in the background which polls the current and active '
+                        'power of the selected objects at a short interval. The power services then '
+                        'show the peak current and power since the last check, checked against '
+                        'their upper levels, and the minimum, maximum, average and 95th percentile '
+                        'as metrics. Only the newest samples per object are kept, the sampler '
+                        'stops by itself some minutes after the rule was removed.'
+                    ),
+                    elements={
+                        'tiers': DictElement(
+                            parameter_form=MultipleChoice(
+                                title=Title('Power objects to sample'),
+                                elements=[MultipleChoiceElement(name=name, title=title)
+                                          for name, title in SAMPLE_TIERS],
+                                prefill=DefaultValue(['wires', 'branch']),
+                                custom_validate=(validators.LengthInRange(min_value=1),),
+                            ),
+                            required=True,
+                        ),
+                        'interval': DictElement(
+                            parameter_form=TimeSpan(
+                                title=Title('Sampling interval'),
+                                displayed_magnitudes=[TimeMagnitude.SECOND, TimeMagnitude.MILLISECOND],
+                                prefill=DefaultValue(5.0),
+                                custom_validate=(validators.NumberInRange(min_value=0.5),),
+                            ),
+                        ),
+                        'buffer': DictElement(
+                            parameter_form=Integer(
+                                title=Title('Samples kept per object'),
+                                prefill=DefaultValue(120),
+                                custom_validate=(validators.NumberInRange(min_value=1),),
+                            ),
+                        ),
+                    },
+                ),
+            ),
+            'sections': DictElement(
+                parameter_form=MultipleChoice(
+                    title=Title('Data to fetch'),
+                    elements=[MultipleChoiceElement(name=name, title=title) for name, title in SECTION_GROUPS],
+                    prefill=DefaultValue([name for name, _title in SECTION_GROUPS]),
+                ),
+            ),
+        },
+    )
+
+
+rule_spec_rnx_updu = SpecialAgent(
+    name='rnx_updu',
+    title=Title('RNX UPDU via SNMP (concurrent special agent)'),
+    topic=Topic.POWER,
+    parameter_form=_parameter_form,
+)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+from collections.abc import Iterator
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from cmk.server_side_calls.v1 import HostConfig, Secret, SpecialAgentCommand, SpecialAgentConfig
+
+
+class OutletHost(BaseModel):
+    device: str = ''
+    outlet: str
+    host: str
+
+
+class Samples(BaseModel):
+    tiers: List[str]
+    interval: Optional[float] = None
+    buffer: Optional[int] = None
+
+
+class Params(BaseModel):
+    community: Secret
+    devices: List[str] = []
+    port: Optional[int] = None
+    timeout: Optional[float] = None
+    retries: Optional[int] = None
+    device_timeout: Optional[float] = None
+    max_concurrency: Optional[int] = None
+    max_varbinds: Optional[int] = None
+    sections: Optional[List[str]] = None
+    outlet_hosts: List[OutletHost] = []
+    samples: Optional[Samples] = None
+
+
+def commands_function(params: Params, host_config: HostConfig) -> Iterator[SpecialAgentCommand]:
+    # Checkmk resolves the secret, it is not written to the command line
+    args: List = ['--community', params.community]
+    for option, value in (
+        ('--port', params.port),
+        ('--timeout', params.timeout),
+        ('--retries', params.retries),
+        ('--device-timeout', params.device_timeout),
+        ('--max-concurrency', params.max_concurrency),
+        ('--max-varbinds', params.max_varbinds),
+    ):
+        if value is not None:
+            args += [option, str(value)]
+    if params.sections is not None:
+        args += ['--sections', ','.join(params.sections)]
+    for outlet_host in params.outlet_hosts:
+        args += ['--outlet-host', outlet_host.device, outlet_host.outlet, outlet_host.host]
+    if params.samples is not None:
+        args += ['--samples', ','.join(params.samples.tiers)]
+        if params.samples.interval is not None:
+            args += ['--sample-interval', str(params.samples.interval)]
+        if params.samples.buffer is not None:
+            args += ['--sample-buffer', str(params.samples.buffer)]
+    if params.devices:
+        args += ['--piggyback'] + params.devices
+    else:
+        args.append(f'{host_config.name}={host_config.primary_ip_config.address}')
+    yield SpecialAgentCommand(command_arguments=args)
+
+
+special_agent_rnx_updu = SpecialAgentConfig(
+    name='rnx_updu',
+    parameter_parser=Params.model_validate,
+    commands_function=commands_function,
+)
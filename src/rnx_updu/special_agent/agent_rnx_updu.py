@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+"""Special agent polling one or many RNX UPDUs concurrently via SNMPv2c.
+
+All devices are walked on one asyncio event loop, at most --max-concurrency
+of them at the same time. The SNMP trees are the ones of the SNMP sections of
+this package, they are written as agent sections (see
+agent_based/rnx_updu_agent_sections.py). With more than one device, or with
+--piggyback, the data of every device is written as piggyback data for the
+host named like the device.
+
+Outlets can be assigned to the hosts they feed with --outlet-host. The
+readings of such an outlet are written as piggyback data for that host too,
+which then gets the outlet as a service without polling the UPDU itself.
+
+With --samples the current and power of the given tiers are also sampled
+between the runs by a sampler in the background, see samples.py.
+
+The outcome of the walk of every device is written for the host of the rule
+itself, which gets the service "RNX UPDU special agent" reporting the devices
+without data.
+
+    agent_rnx_updu --community public updu-a=10.0.0.11 updu-b=10.0.0.12
+    agent_rnx_updu --community public --outlet-host updu-a 'Outlet 1' srv-01 updu-a=10.0.0.11
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cmk_addons.plugins.rnx_updu.agent_based.rnx_updu_agent_sections import agent_fetch
+from cmk_addons.plugins.rnx_updu.special_agent import samples, snmp_v2c
+
+try:
+    from cmk.utils.password_store import replace_passwords
+except ImportError:
+    def replace_passwords() -> None:
+        pass
+
+# Section groups which can be selected with --sections. The PDU section is
+# shared by the power input and the inventory, it is walked once for both.
+SECTION_GROUPS = {
+    'power_input': [
+        'rnx_updu_section_pdu_agent', 'rnx_updu_section_power_input_names_agent', 'rnx_updu_section_power_input_agent',
+    ],
+    'power_distribution': [
+        'rnx_updu_section_power_distribution_names_agent', 'rnx_updu_section_power_distribution_agent',
+    ],
+    'power_outlet': ['rnx_updu_section_power_outlet_names_agent', 'rnx_updu_section_power_outlet_agent'],
+    'sensor': ['rnx_updu_section_sensor_agent'],
+    'inventory': ['rnx_updu_section_pdu_agent', 'rnx_updu_inventory_section_agent'],
+    'interfaces': ['rnx_updu_interfaces_section_agent', 'rnx_updu_interfaces_counters_section_agent'],
+}
+
+# The outlet sections, as written for hosts fed by an outlet
+OUTLET_NAMES_SECTION = 'rnx_updu_section_power_outlet_names_agent'
+OUTLET_SECTION = 'rnx_updu_section_power_outlet_agent'
+
+# The outcome of the walk of each device, written for the host of the rule
+STATUS_SECTION = 'rnx_updu_agent_status'
+
+# Rows per table of the last walk of a device, by agent section name
+RowHints = Dict[str, List[int]]
+
+# Rows by agent section name, each prefixed with the index of its tree
+Sections = Dict[str, List[List[str]]]
+
+
+class Device:
+    __slots__ = ('name', 'address', 'port')
+
+    def __init__(self, spec: str, port: int) -> None:
+        name, _sep, address = spec.rpartition('=')
+        self.address = address
+        self.name = name or address
+        self.port = port
+
+
+class OutletHost:
+    __slots__ = ('device', 'outlet', 'host')
+
+    def __init__(self, device: str, outlet: str, host: str) -> None:
+        self.device = device
+        self.outlet = outlet
+        self.host = host
+
+    def matches(self, device: Device, row: List[str]) -> bool:
+        # row: tree index, OID end, system name, custom name, description, data quality
+        if self.device and self.device != device.name:
+            return False
+        return self.outlet in (row[2], row[3])
+
+
+def resolve_community(community: str) -> str:
+    """The community, looked up in the password store if it is passed as a reference.
+
+    Checkmk 2.3 replaces the masked community in sys.argv itself, see
+    replace_passwords in main. Later versions pass <id>:<password store file>.
+    """
+    try:
+        from cmk.password_store.v1_unstable import dereference_secret
+    except ImportError:
+        return community
+    try:
+        return dereference_secret(community).reveal()
+    except (KeyError, OSError, ValueError):
+        return community
+
+
+def parse_arguments(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('devices', nargs='+', metavar='[NAME=]ADDRESS',
+                        help='devices to poll, NAME is the piggyback host name (default: the address)')
+    parser.add_argument('--community', default='public', help='SNMPv2c community (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=161, help='UDP port (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=2.0,
+                        help='seconds to wait for a response (default: %(default)s)')
+    parser.add_argument('--retries', type=int, default=1, help='retries per request (default: %(default)s)')
+    parser.add_argument('--device-timeout', type=float, default=50.0,
+                        help='seconds a device may take in total (default: %(default)s)')
+    parser.add_argument('--max-concurrency', type=int, default=32,
+                        help='devices polled at the same time (default: %(default)s)')
+    parser.add_argument('--max-varbinds', type=int, default=60,
+                        help='values requested per GetBulk request (default: %(default)s)')
+    parser.add_argument('--sections', default=','.join(SECTION_GROUPS),
+                        help='comma separated section groups to fetch (default: %(default)s)')
+    parser.add_argument('--outlet-host', nargs=3, action='append', default=[],
+                        metavar=('DEVICE', 'OUTLET', 'HOST'),
+                        help='write the outlet with the system or custom name OUTLET of DEVICE (empty: of '
+                             'every device) as piggyback data for HOST, can be given multiple times')
+    parser.add_argument('--piggyback', action='store_true',
+                        help='write piggyback data also when polling a single device')
+    parser.add_argument('--state-dir', type=Path, default=default_state_dir(),
+                        help='where to keep the table sizes of the last walk (default: %(default)s)')
+    parser.add_argument('--samples', default='',
+                        help='comma separated tiers to sample between the runs, of: '
+                             f'{", ".join(samples.SAMPLE_TABLES)} (default: none)')
+    parser.add_argument('--sample-interval', type=float, default=5.0,
+                        help='seconds between two samples (default: %(default)s)')
+    parser.add_argument('--sample-buffer', type=int, default=120,
+                        help='samples kept per object (default: %(default)s)')
+    parser.add_argument('--sampler-idle', type=float, default=600.0,
+                        help='seconds the sampler keeps running without a run reading its samples '
+                             '(default: %(default)s)')
+    parser.add_argument('--sampler', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--debug', action='store_true', help='raise errors instead of reporting them')
+    args = parser.parse_args(argv)
+    args.sections = [group for group in args.sections.split(',') if group]
+    unknown = set(args.sections) - set(SECTION_GROUPS)
+    if unknown:
+        parser.error(f'unknown section group(s): {", ".join(sorted(unknown))}')
+    if args.outlet_host and 'power_outlet' not in args.sections:
+        parser.error('--outlet-host needs the section group power_outlet')
+    args.outlet_host = [OutletHost(*spec) for spec in args.outlet_host]
+    args.samples = [what for what in args.samples.split(',') if what]
+    unknown = set(args.samples) - set(samples.SAMPLE_TABLES)
+    if unknown:
+        parser.error(f'unknown tier(s) to sample: {", ".join(sorted(unknown))}')
+    if args.samples and args.state_dir is None:
+        parser.error('--samples needs a --state-dir for the samples')
+    if args.sample_interval <= 0 or args.sample_buffer < 1:
+        parser.error('--sample-interval and --sample-buffer must be positive')
+    return args
+
+
+def default_state_dir() -> Optional[Path]:
+    omd_root = os.environ.get('OMD_ROOT')
+    if not omd_root:
+        return None
+    return Path(omd_root) / 'tmp' / 'check_mk' / 'special_agents' / 'agent_rnx_updu'
+
+
+#
+# Table sizes of the last walk
+#
+def load_row_hints(state_dir: Optional[Path], device: Device) -> RowHints:
+    if state_dir is None:
+        return {}
+    try:
+        return json.loads((state_dir / f'{device.name}.json').read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_row_hints(state_dir: Optional[Path], device: Device, hints: RowHints) -> None:
+    if state_dir is None:
+        return
+    try:
+        state_dir.mkdir(parents=True, exist_ok=True)
+        (state_dir / f'{device.name}.json').write_text(json.dumps(hints))
+    except OSError:
+        pass
+
+
+#
+# Walking
+#
+def clean(text: str) -> str:
+    return text.replace('\t', ' ').replace('\n', ' ')
+
+
+def tree_rows(tree: object, values: Dict[snmp_v2c.OID, Dict[snmp_v2c.OID, snmp_v2c.Value]]) -> List[List[str]]:
+    """Assemble the rows of a tree the way Checkmk does for SNMP sections."""
+    indexes = sorted({index for column in values.values() for index in column})
+    rows = []
+    for index in indexes:
+        row = []
+        for oid in tree.oids:
+            if isinstance(oid, str):
+                value = values[snmp_v2c.parse_oid(oid)].get(index)
+                text = snmp_v2c.value_to_str(value) if value is not None else None
+                row.append('' if text is None else clean(text))
+            else:  # OIDEnd
+                row.append('.'.join(map(str, index)))
+        rows.append(row)
+    return rows
+
+
+async def walk_device(device: Device, args: argparse.Namespace, sections: List[str]) -> Sections:
+    hints = load_row_hints(args.state_dir, device)
+    new_hints: RowHints = {}
+    client = await snmp_v2c.Client.connect(device.address, device.port, args.community, args.timeout, args.retries)
+    data: Sections = {}
+    try:
+        for section in sections:
+            data[section] = []
+            new_hints[section] = []
+            for pos, tree in enumerate(agent_fetch[section]):
+                columns = [snmp_v2c.parse_oid(oid) for oid in tree.oids if isinstance(oid, str)]
+                section_hints = hints.get(section, [])
+                values = await client.walk_table(
+                    snmp_v2c.parse_oid(tree.base), columns, args.max_varbinds,
+                    section_hints[pos] if pos < len(section_hints) else 0,
+                )
+                rows = tree_rows(tree, values)
+                new_hints[section].append(len(rows))
+                data[section].extend([str(pos)] + row for row in rows)
+    finally:
+        client.close()
+    save_row_hints(args.state_dir, device, new_hints)
+    return data
+
+
+async def poll_device(device: Device, args: argparse.Namespace, sections: List[str],
+                      limit: asyncio.Semaphore) -> Tuple[Device, Optional[Sections], str]:
+    async with limit:
+        try:
+            data = await asyncio.wait_for(walk_device(device, args, sections), args.device_timeout)
+        except asyncio.TimeoutError:
+            if args.debug:
+                raise
+            return device, None, f'no complete walk within {args.device_timeout:g}s'
+        except (snmp_v2c.SNMPTimeout, OSError, ValueError) as exc:
+            if args.debug:
+                raise
+            return device, None, str(exc)
+        return device, data, ''
+
+
+async def poll_fleet(devices: List[Device], args: argparse.Namespace,
+                     sections: List[str]) -> List[Tuple[Device, Optional[Sections], str]]:
+    limit = asyncio.Semaphore(max(args.max_concurrency, 1))
+    return await asyncio.gather(*(poll_device(device, args, sections, limit) for device in devices))
+
+
+#
+# Output
+#
+def outlet_hosts_sections(device: Device, data: Sections, outlet_hosts: List[OutletHost]) -> Dict[str, Sections]:
+    """The outlet sections of the hosts fed by outlets of the device.
+
+    A host may be fed by outlets of several devices. The items (system names)
+    and the OID indexes joining names and readings are prefixed with the
+    device name to keep them apart, the service is called e.g.
+    "updu-a Outlet1.5" on the fed host.
+    """
+    hosts: Dict[str, Sections] = {}
+    meters = {row[1]: row for row in data.get(OUTLET_SECTION, [])}
+    for row in data.get(OUTLET_NAMES_SECTION, []):
+        for outlet_host in outlet_hosts:
+            if not outlet_host.matches(device, row):
+                continue
+            host = hosts.setdefault(outlet_host.host, {OUTLET_NAMES_SECTION: [], OUTLET_SECTION: []})
+            index = f'{device.name}/{row[1]}'
+            host[OUTLET_NAMES_SECTION].append([row[0], index, f'{device.name} {row[2]}'] + row[3:])
+            if row[1] in meters:
+                host[OUTLET_SECTION].append([row[0], index] + meters[row[1]][2:])
+    return hosts
+
+
+def status_section(results: List[Tuple[Device, Optional[Sections], str]]) -> Sections:
+    """Name, address and error of every device, the error is empty for a device with data."""
+    return {STATUS_SECTION: [[device.name, device.address, clean(error) if data is None else '']
+                             for device, data, error in results]}
+
+
+def write_sections(data: Sections, piggyback_host: Optional[str]) -> None:
+    out = []
+    if piggyback_host:
+        out.append(f'<<<<{piggyback_host}>>>>')
+    for section, rows in data.items():
+        out.append(f'<<<{section}:sep(9)>>>')
+        out.extend('\t'.join(row) for row in rows)
+    if piggyback_host:
+        out.append('<<<<>>>>')
+    sys.stdout.write(''.join(f'{line}\n' for line in out))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    # The sampler is started with the arguments as passed, so that the
+    # community does not show in its command line either
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0].startswith('--pwstore='):
+        replace_passwords()
+        args = parse_arguments(sys.argv[1:])
+    else:
+        args = parse_arguments(argv)
+    args.community = resolve_community(args.community)
+    devices = [Device(spec, args.port) for spec in args.devices]
+    if args.sampler:
+        return samples.sampler_main(devices, args)
+    if args.samples:
+        sampler = samples.sampler_id(args)
+        samples_since = samples.last_read(args.state_dir, sampler)
+        samples.ensure_sampler(args, argv)
+    sections = list(dict.fromkeys(
+        section for group in SECTION_GROUPS if group in args.sections for section in SECTION_GROUPS[group]
+    ))
+    piggyback = args.piggyback or len(devices) > 1
+
+    results = asyncio.run(poll_fleet(devices, args, sections))
+    if args.samples:
+        newest = samples_since
+        for device, data, _error in results:
+            if data is not None:
+                data[samples.SECTION], device_newest = samples.samples_section(
+                    args.state_dir, sampler, device.name, samples_since, args.sample_buffer)
+                newest = max(newest, device_newest)
+        samples.mark_read(args.state_dir, sampler, newest)
+
+    write_sections(status_section(results), None)
+    failed = 0
+    for device, data, error in results:
+        if data is None:
+            failed += 1
+            sys.stderr.write(f'{device.name} ({device.address}): {error}\n')
+            continue
+        write_sections(data, device.name if piggyback else None)
+        for host, host_data in outlet_hosts_sections(device, data, args.outlet_host).items():
+            write_sections(host_data, host)
+    # A partly failed fleet still delivers the data of the other devices
+    return 1 if failed == len(devices) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+"""High-rate sampling of the power readings for agent_rnx_updu.
+
+With --samples the special agent starts a sampler in the background, one per
+set of devices and options. It polls only the current and active power
+columns of the selected tiers every --sample-interval seconds and appends
+them as one JSON line to a cache file per device, which holds at least the
+last --sample-buffer samples; the file is only rewritten, to the last
+--sample-buffer lines, once it has grown to twice as many. Every run
+of the special agent reduces the samples taken since its previous run to
+min/max/avg/p95 per object and writes them as the agent section
+rnx_updu_power_samples, which the power check plugins report as metrics.
+
+The buffers are bounded, so the work of a run does not depend on how many
+samples were taken in between: after a long gap only the newest samples are
+reported. The sampler stops once no run of the special agent has read its
+cache for --sampler-idle seconds, e.g. after the rule was removed.
+"""
+
+import argparse
+import asyncio
+import collections
+import fcntl
+import hashlib
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from cmk_addons.plugins.rnx_updu.agent_based.rnx_updu_power import (
+    power_bases,
+    pwr_distribution_objs,
+    pwr_input_objs,
+    pwr_out_objs,
+)
+from cmk_addons.plugins.rnx_updu.special_agent import snmp_v2c
+
+# Tiers which can be sampled and their table
+SAMPLE_TABLES = {what: power_bases[index] for index, what in pwr_input_objs + pwr_distribution_objs + pwr_out_objs}
+
+SAMPLE_COLUMNS = [
+    '51',  # upduMib2<ObjectType>Current, mA
+    '53',  # upduMib2<ObjectType>ActivePower, W
+]
+
+SECTION = 'rnx_updu_power_samples'
+
+# Readings of one sample by '<tier>/<OID index>': (current in A, power in W)
+Readings = Dict[str, Tuple[float, float]]
+
+
+def sampler_id(args: argparse.Namespace) -> str:
+    """Identifies the sampler of a set of devices and sampling options."""
+    key = json.dumps([sorted(args.devices), args.port, sorted(args.samples), args.sample_interval,
+                      args.sample_buffer])
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def cache_file(state_dir: Path, ident: str, device_name: str) -> Path:
+    return state_dir / f'{device_name}.{ident}.samples.jsonl'
+
+
+def read_marker(state_dir: Path, ident: str) -> Path:
+    return state_dir / f'sampler-{ident}.read'
+
+
+def lock_file(state_dir: Path, ident: str) -> Path:
+    return state_dir / f'sampler-{ident}.lock'
+
+
+def write_lines(path: Path, lines: Sequence[str]) -> None:
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(''.join(lines))
+    os.replace(tmp, path)
+
+
+#
+# Sampler
+#
+async def sample_device(client: snmp_v2c.Client, tiers: Sequence[str], max_varbinds: int,
+                        hints: Dict[str, int]) -> Readings:
+    """Current and power of the objects of the tiers by '<tier>/<OID index>'."""
+    readings = {}
+    for what in tiers:
+        base = snmp_v2c.parse_oid(SAMPLE_TABLES[what])
+        current_oid, power_oid = columns = [snmp_v2c.parse_oid(column) for column in SAMPLE_COLUMNS]
+        values = await client.walk_table(base, columns, max_varbinds, hints.get(what, 0))
+        hints[what] = len(values[current_oid])
+        for index, current in values[current_oid].items():
+            power = values[power_oid].get(index)
+            try:
+                reading = (float(current.value) / 1000, float(power.value))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            readings[f'{what}/{".".join(map(str, index))}'] = reading
+    return readings
+
+
+class DeviceSampler:
+    """Samples one device into its cache file, one line [time, readings] per sample.
+
+    The last --sample-buffer lines are also kept in memory, to compact the
+    file without reading it back.
+    """
+    __slots__ = ('device', 'client', 'hints', 'lines', 'written', 'pending')
+
+    def __init__(self, device: object, buffer: int) -> None:
+        self.device = device
+        self.client: Optional[snmp_v2c.Client] = None
+        self.hints: Dict[str, int] = {}
+        self.lines: Deque[str] = collections.deque(maxlen=buffer)
+        # Lines in the cache file, unknown until it was compacted first
+        self.written: Optional[int] = None
+        # The newest line is not in the file yet
+        self.pending = False
+
+    async def sample(self, args: argparse.Namespace) -> None:
+        if self.client is None:
+            self.client = await snmp_v2c.Client.connect(
+                self.device.address, self.device.port, args.community, args.timeout, args.retries)
+        now = time.time()
+        readings = await sample_device(self.client, args.samples, args.max_varbinds, self.hints)
+        if readings:
+            self.lines.append(json.dumps([now, readings]) + '\n')
+            self.pending = True
+
+    def save(self, state_dir: Path, ident: str) -> None:
+        """Append the newest sample, compact the file once it holds twice the buffer."""
+        if not self.pending:
+            return
+        self.pending = False
+        path = cache_file(state_dir, ident, self.device.name)
+        if self.written is None or self.written + 1 >= 2 * self.lines.maxlen:
+            # Also drops the samples of a previous sampler, which the runs
+            # have read by now or missed anyway
+            write_lines(path, self.lines)
+            self.written = len(self.lines)
+            return
+        with open(path, 'a') as file:
+            file.write(self.lines[-1])
+        self.written += 1
+
+
+async def run_sampler(devices: List[object], args: argparse.Namespace) -> None:
+    ident = sampler_id(args)
+    samplers = [DeviceSampler(device, args.sample_buffer) for device in devices]
+    limit = asyncio.Semaphore(max(args.max_concurrency, 1))
+    started = time.time()
+
+    async def sample(sampler: DeviceSampler) -> None:
+        async with limit:
+            try:
+                await asyncio.wait_for(sampler.sample(args), args.sample_interval)
+            except (asyncio.TimeoutError, snmp_v2c.SNMPTimeout, OSError, ValueError):
+                # The device misses this sample
+                pass
+
+    loop = asyncio.get_running_loop()
+    next_round = loop.time()
+    while True:
+        await asyncio.gather(*(sample(sampler) for sampler in samplers))
+        for sampler in samplers:
+            sampler.save(args.state_dir, ident)
+        try:
+            last_read = read_marker(args.state_dir, ident).stat().st_mtime
+        except OSError:
+            last_read = started
+        if time.time() - max(last_read, started) > args.sampler_idle:
+            break
+        next_round += args.sample_interval
+        await asyncio.sleep(max(0.0, next_round - loop.time()))
+    for sampler in samplers:
+        if sampler.client is not None:
+            sampler.client.close()
+
+
+def sampler_main(devices: List[object], args: argparse.Namespace) -> int:
+    args.state_dir.mkdir(parents=True, exist_ok=True)
+    with open(lock_file(args.state_dir, sampler_id(args)), 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Another sampler is already running for these devices
+            return 0
+        asyncio.run(run_sampler(devices, args))
+    return 0
+
+
+def ensure_sampler(args: argparse.Namespace, argv: Sequence[str]) -> None:
+    """Start the sampler in the background unless it is running."""
+    args.state_dir.mkdir(parents=True, exist_ok=True)
+    with open(lock_file(args.state_dir, sampler_id(args)), 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+    subprocess.Popen(
+        [sys.executable, sys.argv[0], *argv, '--sampler'],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+#
+# Reduction of the samples of a check cycle
+#
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return values[max(0, math.ceil(len(values) * percent / 100) - 1)]
+
+
+def sample_stats(values: List[float]) -> List[str]:
+    values = sorted(values)
+    return [f'{values[0]:.3f}', f'{values[-1]:.3f}', f'{sum(values) / len(values):.3f}',
+            f'{percentile(values, 95):.3f}']
+
+
+def samples_section(state_dir: Path, ident: str, device_name: str, since: float,
+                    buffer: int) -> Tuple[List[List[str]], float]:
+    """Rows of <tier> <OID index> <count> <min max avg p95 of the current> <... of the power>
+    from the last `buffer` samples taken after `since`, and the time of the newest of them."""
+    try:
+        with open(cache_file(state_dir, ident, device_name)) as file:
+            lines = file.readlines()
+    except OSError:
+        return [], since
+    currents: Dict[str, List[float]] = {}
+    powers: Dict[str, List[float]] = {}
+    newest = since
+    taken = 0
+    # Newest first, the last line may be partly written
+    for line in reversed(lines):
+        try:
+            timestamp, readings = json.loads(line)
+        except ValueError:
+            continue
+        if timestamp <= since or taken >= buffer:
+            break
+        taken += 1
+        newest = max(newest, timestamp)
+        for key, (current, power) in readings.items():
+            currents.setdefault(key, []).append(current)
+            powers.setdefault(key, []).append(power)
+    rows = []
+    for key, values in currents.items():
+        what, _sep, index = key.partition('/')
+        rows.append([what, index, str(len(values))] + sample_stats(values) + sample_stats(powers[key]))
+    return rows, newest
+
+
+# The read marker holds the time of the newest reported sample, its mtime
+# tells the sampler that it is still needed.
+def last_read(state_dir: Path, ident: str) -> float:
+    try:
+        return float(read_marker(state_dir, ident).read_text())
+    except (OSError, ValueError):
+        return 0.0
+
+
+def mark_read(state_dir: Path, ident: str, newest: float) -> None:
+    read_marker(state_dir, ident).write_text(repr(newest))
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+"""Just enough BER and SNMPv2c to walk the tables of an UPDU.
+
+Used by the special agent (agent_rnx_updu) and by the SNMP simulator of the
+benchmarks. Only the community based v2c message with Get, GetNext, GetBulk
+and Response PDUs is supported.
+"""
+
+import asyncio
+import itertools
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+OID = Tuple[int, ...]
+
+# Universal and SNMP application tags
+INTEGER = 0x02
+OCTET_STRING = 0x04
+NULL = 0x05
+OBJECT_IDENTIFIER = 0x06
+SEQUENCE = 0x30
+IP_ADDRESS = 0x40
+COUNTER32 = 0x41
+GAUGE32 = 0x42
+TIMETICKS = 0x43
+OPAQUE = 0x44
+COUNTER64 = 0x46
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+# PDU tags
+GET_REQUEST = 0xA0
+GET_NEXT_REQUEST = 0xA1
+RESPONSE = 0xA2
+GET_BULK_REQUEST = 0xA5
+
+VERSION_2C = 1
+
+# snmprec type tags (as used by snmpsim) to BER tags
+SNMPREC_TYPES = {
+    '2': INTEGER,
+    '4': OCTET_STRING,
+    '5': NULL,
+    '6': OBJECT_IDENTIFIER,
+    '64': IP_ADDRESS,
+    '65': COUNTER32,
+    '66': GAUGE32,
+    '67': TIMETICKS,
+    '68': OPAQUE,
+    '70': COUNTER64,
+}
+_UNSIGNED = (COUNTER32, GAUGE32, TIMETICKS, COUNTER64)
+
+
+class Value(NamedTuple):
+    tag: int
+    value: Any = None
+
+
+class Message(NamedTuple):
+    community: bytes
+    pdu_type: int
+    request_id: int
+    # error-status / error-index, or non-repeaters / max-repetitions for GetBulk
+    field1: int
+    field2: int
+    varbinds: List[Tuple[OID, Value]]
+
+
+def parse_oid(text: str) -> OID:
+    return tuple(int(part) for part in text.strip('.').split('.') if part)
+
+
+def format_oid(oid: OID) -> str:
+    return '.' + '.'.join(map(str, oid))
+
+
+#
+# Encoding
+#
+def _length(length: int) -> bytes:
+    if length < 0x80:
+        return bytes([length])
+    raw = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes([0x80 | len(raw)]) + raw
+
+
+def _tlv(tag: int, payload: bytes) -> bytes:
+    return bytes([tag]) + _length(len(payload)) + payload
+
+
+def _int(value: int, unsigned: bool = False) -> bytes:
+    if unsigned:
+        raw = value.to_bytes(value.bit_length() // 8 + 1, 'big')
+    else:
+        raw = value.to_bytes((value + (value < 0)).bit_length() // 8 + 1, 'big', signed=True)
+    return raw
+
+
+def _oid(oid: OID) -> bytes:
+    out = bytearray([oid[0] * 40 + oid[1]])
+    for arc in oid[2:]:
+        chunk = [arc & 0x7F]
+        arc >>= 7
+        while arc:
+            chunk.append(0x80 | (arc & 0x7F))
+            arc >>= 7
+        out.extend(reversed(chunk))
+    return bytes(out)
+
+
+def encode_value(value: Value) -> bytes:
+    tag = value.tag
+    if tag in (INTEGER,) + _UNSIGNED:
+        return _tlv(tag, _int(int(value.value), unsigned=tag in _UNSIGNED))
+    if tag in (OCTET_STRING, OPAQUE, IP_ADDRESS):
+        raw = value.value if isinstance(value.value, bytes) else str(value.value).encode()
+        return _tlv(tag, raw)
+    if tag == OBJECT_IDENTIFIER:
+        return _tlv(tag, _oid(value.value))
+    return _tlv(tag, b'')  # NULL and the exception values
+
+
+def encode_message(msg: Message) -> bytes:
+    varbinds = b''.join(
+        _tlv(SEQUENCE, _tlv(OBJECT_IDENTIFIER, _oid(oid)) + encode_value(value))
+        for oid, value in msg.varbinds
+    )
+    pdu = _tlv(msg.pdu_type, (
+        _tlv(INTEGER, _int(msg.request_id))
+        + _tlv(INTEGER, _int(msg.field1))
+        + _tlv(INTEGER, _int(msg.field2))
+        + _tlv(SEQUENCE, varbinds)
+    ))
+    return _tlv(SEQUENCE, _tlv(INTEGER, _int(VERSION_2C)) + _tlv(OCTET_STRING, msg.community) + pdu)
+
+
+#
+# Decoding
+#
+def _read_tlv(data: bytes, pos: int) -> Tuple[int, bytes, int]:
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        size = length & 0x7F
+        length = int.from_bytes(data[pos:pos + size], 'big')
+        pos += size
+    return tag, data[pos:pos + length], pos + length
+
+
+def _items(data: bytes) -> List[Tuple[int, bytes]]:
+    items = []
+    pos = 0
+    while pos < len(data):
+        tag, payload, pos = _read_tlv(data, pos)
+        items.append((tag, payload))
+    return items
+
+
+def _decode_oid(raw: bytes) -> OID:
+    first = raw[0]
+    arcs = [first // 40, first % 40] if first < 80 else [2, first - 80]
+    arc = 0
+    for byte in raw[1:]:
+        arc = (arc << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            arcs.append(arc)
+            arc = 0
+    return tuple(arcs)
+
+
+def decode_value(tag: int, raw: bytes) -> Value:
+    if tag == INTEGER:
+        return Value(tag, int.from_bytes(raw, 'big', signed=True))
+    if tag in _UNSIGNED:
+        return Value(tag, int.from_bytes(raw, 'big'))
+    if tag == OBJECT_IDENTIFIER:
+        return Value(tag, _decode_oid(raw))
+    if tag in (OCTET_STRING, OPAQUE, IP_ADDRESS):
+        return Value(tag, raw)
+    return Value(tag)
+
+
+def decode_message(data: bytes) -> Message:
+    tag, payload, _pos = _read_tlv(data, 0)
+    if tag != SEQUENCE:
+        raise ValueError('not an SNMP message')
+    (_t, version), (_t, community), (pdu_type, pdu) = _items(payload)
+    if int.from_bytes(version, 'big') != VERSION_2C:
+        raise ValueError('only SNMPv2c is supported')
+    (_t, request_id), (_t, field1), (_t, field2), (_t, varbind_list) = _items(pdu)
+    varbinds = []
+    for _t, varbind in _items(varbind_list):
+        (_t, oid), (value_tag, value) = _items(varbind)
+        varbinds.append((_decode_oid(oid), decode_value(value_tag, value)))
+    return Message(
+        community=community,
+        pdu_type=pdu_type,
+        request_id=int.from_bytes(request_id, 'big', signed=True),
+        field1=int.from_bytes(field1, 'big', signed=True),
+        field2=int.from_bytes(field2, 'big', signed=True),
+        varbinds=varbinds,
+    )
+
+
+def value_to_str(value: Value) -> Optional[str]:
+    """Render a value the way Checkmk hands it to the parse functions."""
+    if value.tag in (NO_SUCH_OBJECT, NO_SUCH_INSTANCE, END_OF_MIB_VIEW):
+        return None
+    if isinstance(value.value, bytes):
+        return value.value.decode('utf-8', 'replace')
+    if value.tag == OBJECT_IDENTIFIER:
+        return format_oid(value.value)
+    return '' if value.value is None else str(value.value)
+
+
+#
+# asyncio client
+#
+class SNMPTimeout(Exception):
+    pass
+
+
+class Client(asyncio.DatagramProtocol):
+    """SNMPv2c client of one device on the running event loop.
+
+    Requests of one client are sent one after the other, embedded SNMP stacks
+    do not cope well with parallel requests.
+    """
+
+    def __init__(self, community: str, timeout: float, retries: int) -> None:
+        self.community = community.encode()
+        self.timeout = timeout
+        self.retries = retries
+        self.requests = 0
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self._request_ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(cls, host: str, port: int, community: str, timeout: float, retries: int) -> 'Client':
+        _transport, client = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: cls(community, timeout, retries), remote_addr=(host, port),
+        )
+        return client
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        try:
+            response = decode_message(data)
+        except (ValueError, IndexError):
+            return
+        future = self._pending.get(response.request_id)
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    def error_received(self, exc: Exception) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+    async def request(self, pdu_type: int, oids: Sequence[OID],
+                      non_repeaters: int = 0, max_repetitions: int = 0) -> Message:
+        async with self._lock:
+            request_id = next(self._request_ids)
+            data = encode_message(Message(
+                self.community, pdu_type, request_id, non_repeaters, max_repetitions,
+                [(oid, Value(NULL)) for oid in oids],
+            ))
+            try:
+                for _attempt in range(self.retries + 1):
+                    future = asyncio.get_running_loop().create_future()
+                    self._pending[request_id] = future
+                    self.transport.sendto(data)
+                    self.requests += 1
+                    try:
+                        return await asyncio.wait_for(future, self.timeout)
+                    except asyncio.TimeoutError:
+                        continue
+            finally:
+                self._pending.pop(request_id, None)
+        raise SNMPTimeout(f'no response after {self.retries + 1} attempt(s) of {self.timeout:g}s')
+
+    async def walk_table(self, base: OID, columns: Sequence[OID], max_varbinds: int,
+                         rows_hint: int = 0) -> Dict[OID, Dict[OID, Value]]:
+        """Walk several columns of a table with shared GetBulk requests.
+
+        Returns the values by column and row index (the OID below the
+        column). All columns still being walked go into one request and
+        max-repetitions is chosen so that the response holds at most
+        max_varbinds values, so a table takes about rows * columns /
+        max_varbinds requests. With the number of rows of the last walk as
+        rows_hint, the repetitions are capped so that the last request does
+        not read far beyond the end of the table.
+        """
+        prefixes = {column: base + column for column in columns}
+        result: Dict[OID, Dict[OID, Value]] = {column: {} for column in columns}
+        cursor = dict(prefixes)
+        while cursor:
+            active = list(cursor)
+            repetitions = max(max_varbinds // len(active), 1)
+            if rows_hint:
+                repetitions = min(repetitions, rows_hint + 1)
+            response = await self.request(GET_BULK_REQUEST, [cursor[column] for column in active], 0, repetitions)
+            if not response.varbinds:
+                break
+            for pos, (oid, value) in enumerate(response.varbinds):
+                column = active[pos % len(active)]
+                if column not in cursor:
+                    continue
+                prefix = prefixes[column]
+                if value.tag == END_OF_MIB_VIEW or oid[:len(prefix)] != prefix or oid <= cursor[column]:
+                    del cursor[column]
+                    continue
+                result[column][oid[len(prefix):]] = value
+                cursor[column] = oid
+        return result
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+# The tests run without a Checkmk site: the Checkmk API is replaced by the
+# stand-ins of the benchmark, which also map cmk_addons.plugins to src/.
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'bench'))
+
+import cmk_stubs  # noqa: E402
+
+cmk_stubs.install()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+from cmk.agent_based.v2 import Metric, Result
+
+from cmk_addons.plugins.rnx_updu.agent_based.rnx_updu_energy import ENERGY_WRAP, check_energy, energy_delta
+
+
+class Meter:
+    def __init__(self, energy: float) -> None:
+        self.energy = energy
+
+
+def summaries(results):
+    return [result.summary for result in results if isinstance(result, Result)]
+
+
+def metrics(results):
+    return {result.name: result.value for result in results if isinstance(result, Metric)}
+
+
+def test_energy_delta_counts_up():
+    assert energy_delta(1000, 1050, 60) == 50
+
+
+def test_energy_delta_wraps():
+    # 20 Wh across the wrap in a minute are 1200 W
+    assert energy_delta(ENERGY_WRAP - 10, 10, 60) == 20
+
+
+def test_energy_delta_reset():
+    # A drop without a plausible wrap is a reset of the counter
+    assert energy_delta(5_000_000, 100, 60) is None
+
+
+def test_energy_delta_implausible_increase():
+    assert energy_delta(0, 1_000_000, 60) is None
+
+
+def test_check_energy_initializes():
+    value_store = {}
+    assert summaries(check_energy(Meter(1000), value_store, 1_700_000_000)) == ['Energy counter initialized']
+
+
+def test_check_energy_average_over_unchanged_counter():
+    # The meter section is fetched every 5 minutes, the service checked every minute
+    value_store = {}
+    now = 1_700_000_000
+    list(check_energy(Meter(1000), value_store, now))
+    for minute in range(1, 5):
+        results = list(check_energy(Meter(1000), value_store, now + minute * 60))
+        assert 'power' not in metrics(results)
+    results = list(check_energy(Meter(1050), value_store, now + 300))
+    assert metrics(results)['power'] == 600.0
+
+    # Until the next change the last average is shown again, not 0 W
+    results = list(check_energy(Meter(1050), value_store, now + 360))
+    assert metrics(results)['power'] == 600.0
+    results = list(check_energy(Meter(1100), value_store, now + 600))
+    assert metrics(results)['power'] == 600.0
+
+
+def test_check_energy_reset():
+    value_store = {}
+    now = 1_700_000_000
+    list(check_energy(Meter(5_000_000), value_store, now))
+    results = list(check_energy(Meter(100), value_store, now + 60))
+    assert summaries(results) == ['Energy counter was reset']
+    results = list(check_energy(Meter(110), value_store, now + 120))
+    assert metrics(results)['power'] == 600.0
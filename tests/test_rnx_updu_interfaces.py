@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+from cmk_addons.plugins.rnx_updu.agent_based import rnx_updu_interfaces as interfaces
+from cmk_addons.plugins.rnx_updu.agent_based.rnx_updu_interfaces import counter_rate
+
+
+def test_counter_rate_first_check():
+    value_store = {}
+    assert counter_rate(value_store, 'in_octets', 100.0, 5000, 64) is None
+    assert value_store['in_octets'] == (100.0, 5000)
+
+
+def test_counter_rate():
+    value_store = {'in_octets': (100.0, 5000)}
+    assert counter_rate(value_store, 'in_octets', 110.0, 6000, 64) == 100.0
+
+
+def test_counter_rate_32_bit_wrap():
+    value_store = {'in_errors': (100.0, 2 ** 32 - 5)}
+    assert counter_rate(value_store, 'in_errors', 110.0, 5, 32) == 1.0
+
+
+def test_counter_rate_64_bit_reset():
+    # A Counter64 does not wrap, a decrease is a restart of the device
+    value_store = {'in_octets': (100.0, 5000)}
+    assert counter_rate(value_store, 'in_octets', 110.0, 10, 64) is None
+    assert value_store['in_octets'] == (110.0, 10)
+
+
+def test_counter_rate_same_time():
+    value_store = {'in_octets': (100.0, 5000)}
+    assert counter_rate(value_store, 'in_octets', 100.0, 6000, 64) is None
+
+
+def test_status_only_fetched_with_the_counters():
+    oids = [tree.oids for tree in interfaces.snmp_section_rnx_updu_interfaces.fetch]
+    assert not {'7', '8'} & set(oids[0])
+
+
+def test_inventory_takes_the_status_from_the_counters():
+    section = interfaces.parse_rnx_updu_interfaces([[['1', 'eth0', '6', '1500', '100000000']]])
+    counters = {'1': {'admin_status': 1, 'oper_status': 2}}
+    rows = list(interfaces.inventory_rnx_updu_interfaces(section, counters))
+    assert rows[0].inventory_columns['admin_status'] == 'up'
+    assert rows[0].inventory_columns['oper_status'] == 'down'
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+from cmk.agent_based.v2 import Metric, State
+
+from cmk_addons.plugins.rnx_updu.agent_based import rnx_updu_phase_balance as balance
+from cmk_addons.plugins.rnx_updu.agent_based import rnx_updu_power as power
+
+PARAMS = {'imbalance': ('fixed', (15.0, 25.0)), 'min_current': 1.0, 'headroom': ('fixed', (20.0, 10.0))}
+
+
+def wires(rows):
+    """The input sections of (OID index, ObjectPath, current in A) of wires."""
+    names = [[index, f'Wire{number}', '', '', '0', path] for number, (index, path, _current) in enumerate(rows, 1)]
+    meters = [[index, '0', str(int(current * 1000)), '230000', '0', '0', '0'] for index, _path, current in rows]
+    return (power.parse_rnx_updu_power_input_names([[], names]),
+            power.parse_rnx_updu_power_input([[], [], meters]))
+
+
+def unit(number, currents, phases=('WireL1', 'WireL2', 'WireL3')):
+    return [(f'{number}.{wire}', f'PDU/Inlet/{phase}', current)
+            for wire, (phase, current) in enumerate(zip(phases, currents), 1)]
+
+
+def test_chained_units_have_a_service_each():
+    sections = wires(unit(1, [4.0, 4.0, 4.0]) + unit(2, [2.0, 6.0, 4.0]))
+    services = balance.discover_rnx_updu_phase_balance({'tiers': power.power_tiers}, *sections)
+    assert [service.item for service in services] == ['PDU 1', 'PDU 2']
+    assert balance.phase_currents(*sections)['PDU 2'] == [('L1', 2.0), ('L2', 6.0), ('L3', 4.0)]
+
+
+def test_phases_grouped_once_per_fetch():
+    names, meters = wires(unit(1, [4.0, 4.0, 4.0]))
+    assert balance.phase_currents(names, meters) is balance.phase_currents(names, meters)
+    _names, refetched = wires(unit(1, [5.0, 4.0, 4.0]))
+    assert balance.phase_currents(names, refetched)['PDU 1'][0] == ('L1', 5.0)
+
+
+def test_imbalance():
+    results = list(balance.check_rnx_updu_phase_balance('PDU 1', PARAMS, *wires(unit(1, [2.0, 6.0, 4.0]))))
+    imbalance = next(result for result in results if isinstance(result, Metric) and result.name == 'phase_imbalance')
+    assert imbalance.value == 50.0
+    assert State.CRIT in [result.state for result in results if hasattr(result, 'state')]
+
+
+def test_headroom_metrics_by_wire_position():
+    # Whatever the wires are called, the metrics match the graphing definitions
+    sections = wires(unit(1, [4.0, 5.0, 6.0], phases=('WireA', 'WireB', 'WireC')))
+    params = {**PARAMS, 'rated_current': 16.0}
+    metrics = {result.name: result.value for result in balance.check_rnx_updu_phase_balance('PDU 1', params, *sections)
+               if isinstance(result, Metric)}
+    assert [metrics[f'headroom_l{position}'] for position in (1, 2, 3)] == [12.0, 11.0, 10.0]
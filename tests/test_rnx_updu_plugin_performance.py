@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+import synthetic
+
+from cmk.agent_based.v2 import Metric, Result
+
+from cmk_addons.plugins.rnx_updu.agent_based import rnx_updu_pdu as pdu
+from cmk_addons.plugins.rnx_updu.agent_based import rnx_updu_power as power
+from cmk_addons.plugins.rnx_updu.agent_based.rnx_updu_plugin_performance import check_plugin_performance
+
+
+def parsed(section, rows, **kwargs):
+    return section.parse_function(synthetic.string_table_for(section, rows, **kwargs))
+
+
+def metrics(results):
+    return {result.name: result.value for result in results if isinstance(result, Metric)}
+
+
+def test_stats_travel_with_the_section():
+    # Two hosts parsed one after the other, each service reports its own
+    first = parsed(power.snmp_section_rnx_updu_power_outlet, 10)
+    second = parsed(power.snmp_section_rnx_updu_power_outlet, 20)
+    assert metrics(check_plugin_performance({'rnx_updu_section_power_outlet': first}))['rows_power_outlet'] == 10
+    assert metrics(check_plugin_performance({'rnx_updu_section_power_outlet': second}))['rows_power_outlet'] == 20
+
+
+def test_dict_sections_carry_their_stats():
+    section = parsed(pdu.snmp_section_rnx_updu_pdu, 2)
+    assert isinstance(section, dict)
+    assert metrics(check_plugin_performance({'rnx_updu_section_pdu': section}))['rows_pdu'] == 2
+
+
+def test_nodata_counted_on_the_first_check():
+    section = parsed(power.snmp_section_rnx_updu_power_outlet, 40, nodata=0.5)
+    results = list(check_plugin_performance({'rnx_updu_section_power_outlet': section}))
+    assert 0 < metrics(results)['nodata_rows_power_outlet'] < 40
+    assert 'No Data: n/a' not in results[1].details
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+import pytest
+import synthetic
+
+from cmk.agent_based.v2 import State
+
+from cmk_addons.plugins.rnx_updu.agent_based import rnx_updu_power as power
+from cmk_addons.plugins.rnx_updu.agent_based.rnx_updu_power import (
+    check_spikes,
+    days_to_limit,
+    forecast_trend,
+    update_forecast,
+)
+
+DAY = 86400.0
+
+
+def parsed(section, rows, **kwargs):
+    return section.parse_function(synthetic.string_table_for(section, rows, **kwargs))
+
+
+def output_sections(rows):
+    """The sections of rnx_updu_power_out in the order of its arguments, without samples."""
+    return (
+        parsed(power.snmp_section_rnx_updu_power_distribution_names, rows),
+        parsed(power.snmp_section_rnx_updu_power_distribution, rows),
+        parsed(power.snmp_section_rnx_updu_power_outlet_names, rows),
+        parsed(power.snmp_section_rnx_updu_power_outlet, rows),
+        None,
+    )
+
+
+def test_power_out_discovers_branches_modules_and_outlets():
+    services = power.discover_rnx_updu_power_out({'tiers': power.power_tiers}, *output_sections(2))
+    assert [service.item for service in services] == [
+        'Branch1', 'Branch2', 'Module1', 'Module2', 'Outlet1', 'Outlet2',
+    ]
+
+
+def test_power_out_disabled_tiers():
+    services = power.discover_rnx_updu_power_out({'tiers': ['wires', 'branch']}, *output_sections(2))
+    assert [service.item for service in services] == ['Branch1', 'Branch2']
+
+
+def test_power_out_checks_branches_modules_and_outlets():
+    sections = output_sections(2)
+    for item in ('Branch2', 'Module2', 'Outlet2'):
+        results = list(power.check_rnx_updu_power_out(item, power.OUT_LEVELS, *sections))
+        assert results[0].summary == f'Name: {item}'
+
+
+def test_power_groups_are_fetched_apart():
+    # Checkmk fetches the sections of the plugins with services, the input
+    # and output plugins must not read each other's sections
+    input_sections = {'rnx_updu_section_power_input_names', 'rnx_updu_section_power_input'}
+    assert not input_sections & set(power.check_plugin__rnx_updu_power_out.sections)
+    for plugin in (power.check_plugin_rnx_updu_power_in, power.check_plugin_rnx_updu_power_in_combined):
+        assert not set(power.power_output_sections) & set(plugin.sections)
+
+
+def test_power_sections_split_by_tier():
+    # Every table of the power objects is walked by exactly one meter section
+    sections = (power.snmp_section_rnx_updu_power_input, power.snmp_section_rnx_updu_power_distribution,
+                power.snmp_section_rnx_updu_power_outlet)
+    bases = [tree.base for section in sections for tree in section.fetch]
+    assert bases == power.power_bases
+
+
+def test_power_sections_parse_their_tiers():
+    assert list(parsed(power.snmp_section_rnx_updu_power_input, 1)) == ['pdu', 'inlets', 'wires']
+    assert list(parsed(power.snmp_section_rnx_updu_power_distribution, 1)) == ['branch', 'module']
+    assert list(parsed(power.snmp_section_rnx_updu_power_outlet, 1)) == ['outlet']
+
+
+def test_names_and_meters_fetch_apart():
+    # The naming columns are fetched rarely, the meter sections carry readings only
+    name_columns, meter_columns = {'2', '3', '4', '11'}, {'51', '52', '53', '54', '56'}
+    for section in (power.snmp_section_rnx_updu_power_input_names, power.snmp_section_rnx_updu_power_distribution_names,
+                    power.snmp_section_rnx_updu_power_outlet_names):
+        assert not meter_columns & {oid for tree in section.fetch for oid in tree.oids}
+    for section in (power.snmp_section_rnx_updu_power_input, power.snmp_section_rnx_updu_power_distribution,
+                    power.snmp_section_rnx_updu_power_outlet):
+        assert not name_columns & {oid for tree in section.fetch for oid in tree.oids}
+
+
+def test_names_and_meters_joined_by_index():
+    names = power.parse_rnx_updu_power_outlet_names([[
+        ['1.1', 'Outlet1', 'srv-01', '', '0', 'PDU/Inlet/WireL1/Module1/Outlet1'],
+        ['1.2', 'Outlet2', '', '', '0', 'PDU/Inlet/WireL1/Module1/Outlet2'],
+    ]])
+    meters = power.parse_rnx_updu_power_outlet([[
+        ['1.3', '0', '2000', '230000', '400', '450', '1000'],
+        ['1.1', '0', '1500', '231000', '300', '350', '2000'],
+    ]])
+    data = power.power_data(names, meters, power.pwr_out_objs)
+    # Outlet2 has no readings, the readings of 1.3 no name
+    assert list(data) == ['Outlet1']
+    assert (data['Outlet1']['name'], data['Outlet1']['current'], data['Outlet1']['voltage']) == ('srv-01', 1.5, 231.0)
+
+
+def test_no_data_channels_are_left_out():
+    names = power.parse_rnx_updu_power_outlet_names([[
+        ['1.1', 'Outlet1', '', '', '0', 'PDU/Inlet/WireL1/Module1/Outlet1'],
+        ['1.2', 'Outlet2', '', '', power.NO_DATA, 'PDU/Inlet/WireL1/Module1/Outlet2'],
+    ]])
+    meters = power.parse_rnx_updu_power_outlet([[
+        ['1.1', '0', '1500', '231000', '300', '350', '2000'],
+        ['1.2', power.NO_DATA, '0', '0', '0', '0', '0'],
+    ]])
+    assert list(names['outlet']) == ['Outlet1']
+    assert list(meters['outlet'].rows) == ['1.1']
+    services = power.discover_rnx_updu_power_out({'tiers': power.power_tiers}, None, None, names, meters, None)
+    assert [service.item for service in services] == ['Outlet1']
+
+
+def test_meters_are_columns():
+    meters = power.parse_rnx_updu_power_outlet([[
+        ['1.1', '0', '1500', '231000', '300', '350', '2000'],
+        ['1.2', '0', 'n/a', '230000', '400', '450', '3000'],
+        ['1.3', '0', '2500', '229000', '500', '550', '4000'],
+    ]])['outlet']
+    # Only the row with a non-numeric reading is lost
+    assert meters.rows == {'1.1': 0, '1.3': 1}
+    assert list(meters.current) == [1500.0, 2500.0]
+    assert meters.current.typecode == 'd'
+    assert not hasattr(meters, '__dict__')
+
+
+def test_tiers_decoded_when_read():
+    section = parsed(power.snmp_section_rnx_updu_power_input, 3)
+    assert section._tiers == {}
+    wires = section['wires']
+    # Decoded once, the SNMP rows are released
+    assert section['wires'] is wires
+    assert list(section._tiers) == ['wires']
+    assert section._tables['wires'] is None and section._tables['pdu'] is not None
+
+
+SUMMARY = {'tiers': power.power_tiers, 'outlet_summary': {'group': 'module', 'outlets': []}}
+
+
+def test_outlet_summary_discovers_the_grouping_only():
+    services = list(power.discover_rnx_updu_power_outlet_summary(SUMMARY, *output_sections(16)[:4]))
+    assert [service.item for service in services] == ['PDU Module1', 'PDU Module2']
+    assert services[0].parameters == {'group': 'module'}
+
+
+def test_outlet_summary_top_n():
+    params = {**power.SUMMARY_PARAMS, 'group': 'module', 'top_n': 2}
+    results = list(power.check_rnx_updu_power_outlet_summary('PDU Module1', params, *output_sections(16)[:4]))
+    top = next(result for result in results if getattr(result, 'details', '').startswith('Top loaded'))
+    assert top.details.count(' W') == 2
+
+
+def test_outlet_summary_worst_state():
+    sections = output_sections(16)[:4]
+    params = {**power.SUMMARY_PARAMS, 'group': 'pdu'}
+    results = list(power.check_rnx_updu_power_outlet_summary('PDU', params, *sections))
+    worst = State.worst(*(result.state for result in results if hasattr(result, 'state')))
+    outlets = [
+        State.worst(*(result.state for result in power.check_rnx_updu_power_out(
+            f'Outlet{idx}', power.OUT_LEVELS, *sections, None) if hasattr(result, 'state')))
+        for idx in range(1, 17)
+    ]
+    assert worst == State.worst(*outlets)
+
+
+SPIKES = {'samples': 5, 'k': 4.0}
+
+
+def readings(current: float, power: float) -> dict:
+    return {'current': current, 'power': power}
+
+
+def spike_states(params, obj, value_store):
+    return [result.state for result in check_spikes(params, obj, value_store)]
+
+
+def test_spikes_need_history():
+    value_store = {}
+    for _ in range(2):
+        assert spike_states(SPIKES, readings(5.0, 1000.0), value_store) == []
+
+
+def test_spikes_steady_readings():
+    value_store = {}
+    for current in (5.0, 5.02, 4.98, 5.01, 5.0, 4.99):
+        assert spike_states(SPIKES, readings(current, 1000.0), value_store) == []
+
+
+def test_spikes_jump():
+    value_store = {}
+    for current in (5.0, 5.02, 4.98, 5.01, 5.0):
+        list(check_spikes(SPIKES, readings(current, 1000.0), value_store))
+    assert spike_states(SPIKES, readings(8.0, 1000.0), value_store) == [State.WARN]
+
+
+def test_spikes_noise_on_steady_readings():
+    # A jump below 0.1 A is no spike, however steady the readings were
+    value_store = {}
+    for _ in range(5):
+        list(check_spikes(SPIKES, readings(5.0, 1000.0), value_store))
+    assert spike_states(SPIKES, readings(5.05, 1000.0), value_store) == []
+
+
+def test_spikes_delta():
+    params = {**SPIKES, 'k': 100.0, 'power_delta': 200.0}
+    value_store = {}
+    for power in (1000.0, 1100.0, 900.0, 1050.0, 950.0):
+        list(check_spikes(params, readings(5.0, power), value_store))
+    assert spike_states(params, readings(5.0, 1300.0), value_store) == [State.WARN]
+
+
+def test_spikes_buffer_is_bounded():
+    value_store = {}
+    for _ in range(20):
+        list(check_spikes(SPIKES, readings(5.0, 1000.0), value_store))
+    assert len(value_store['spikes']['current']) == SPIKES['samples']
+
+
+def test_spikes_step_becomes_normal():
+    value_store = {}
+    for _ in range(5):
+        list(check_spikes(SPIKES, readings(5.0, 1000.0), value_store))
+    states = [spike_states(SPIKES, readings(8.0, 1000.0), value_store) for _ in range(7)]
+    assert states[0] == [State.WARN]
+    assert states[-1] == []
+
+
+def forecast_state(currents):
+    state = None
+    for day, current in enumerate(currents):
+        state = update_forecast(state, day * DAY, current)
+    return state
+
+
+def test_forecast_steady_current():
+    state = forecast_state([8.0] * 30)
+    assert forecast_trend(state) == pytest.approx(0.0)
+    assert state[4] == pytest.approx(8.0)
+
+
+def test_forecast_rising_current():
+    state = forecast_state([8.0 + 0.05 * day for day in range(60)])
+    assert forecast_trend(state) * DAY == pytest.approx(0.05, rel=0.1)
+
+
+def test_forecast_holds_the_peak():
+    # A single daily peak decays towards the average over a week
+    state = forecast_state([8.0] * 10 + [12.0] + [8.0])
+    assert 8.0 < state[4] < 12.0
+    assert state[4] > state[2]
+
+
+def test_forecast_first_reading():
+    assert update_forecast(None, 100.0, 3.0) == [100.0, 100.0, 3.0, 3.0, 3.0]
+
+
+def test_days_to_limit():
+    assert days_to_limit(16.0, 10.0, 0.1 / DAY) == pytest.approx(60.0)
+    assert days_to_limit(16.0, 17.0, 0.1 / DAY) == 0.0
+    assert days_to_limit(16.0, 10.0, 0.0) is None
+    assert days_to_limit(16.0, 10.0, -0.1 / DAY) is None
+
+
+def distribution(rows):
+    """The distribution sections of (tier, OID index, system name, ObjectPath, voltage in V)."""
+    names, meters = [[], []], [[], []]
+    for what, index, sysname, path, voltage in rows:
+        tree = ['branch', 'module'].index(what)
+        names[tree].append([index, sysname, '', '', '0', path] + ['16000'] * tree)
+        meters[tree].append([index, '0', '2000', str(int(voltage * 1000)), '400', '450', '1000'])
+    return power.parse_rnx_updu_power_distribution_names(names), power.parse_rnx_updu_power_distribution(meters)
+
+
+def outlet(index, path):
+    return power.PowerName(index, 'Outlet1', '', path)
+
+
+def test_parent_down_chained_units():
+    # Both units report the same paths, only the unit of the OID index differs
+    names, meters = distribution([
+        ('module', '1.1', 'Module1', 'PDU/Inlet/WireL1/Module1', 0.0),
+        ('module', '1.2', 'Module2', 'PDU/Inlet/WireL2/Module2', 230.0),
+        ('module', '2.1', 'Module3', 'PDU/Inlet/WireL1/Module1', 230.0),
+        ('module', '2.2', 'Module4', 'PDU/Inlet/WireL2/Module2', 230.0),
+    ])
+    path = 'PDU/Inlet/WireL1/Module1/Outlet1'
+    assert power.parent_down(outlet('1.1', path), names, meters) == 'Module1 has no voltage'
+    assert power.parent_down(outlet('2.1', path), names, meters) is None
+
+
+def test_parent_down_wire_without_power():
+    names, meters = distribution([
+        ('branch', '1.1', 'Branch1', 'PDU/Inlet/WireL1/Branch1', 0.0),
+        ('module', '1.1', 'Module1', 'PDU/Inlet/WireL1/Module1', 0.0),
+        ('module', '1.2', 'Module2', 'PDU/Inlet/WireL2/Module2', 230.0),
+    ])
+    module = names['module']['Module1']
+    assert power.parent_down(module, names, meters) == 'WireL1 has no voltage'
+    assert power.parent_down(outlet('1.1', 'PDU/Inlet/WireL1/Module1/Outlet1'), names, meters) == \
+        'WireL1 has no voltage'
+    assert power.parent_down(names['module']['Module2'], names, meters) is None
+
+
+def test_parent_down_single_object_alarms_itself():
+    # A module without power but with a sibling that has power is not taken
+    # as a parent down, only the outlets below it are
+    names, meters = distribution([
+        ('module', '1.1', 'Module1', 'PDU/Inlet/WireL1/Module1', 0.0),
+        ('module', '1.2', 'Module2', 'PDU/Inlet/WireL1/Module2', 230.0),
+    ])
+    assert power.parent_down(names['module']['Module1'], names, meters) is None
+    assert power.parent_down(outlet('1.1', 'PDU/Inlet/WireL1/Module1/Outlet1'), names, meters) == \
+        'Module1 has no voltage'
+
+
+def test_parent_down_is_a_service_parameter():
+    names, meters = distribution([
+        ('module', '1.1', 'Module1', 'PDU/Inlet/WireL1/Module1', 0.0),
+        ('module', '1.2', 'Module2', 'PDU/Inlet/WireL1/Module2', 0.0),
+        ('module', '1.3', 'Module3', 'PDU/Inlet/WireL2/Module3', 230.0),
+    ])
+    sections = (names, meters, None, None, None)
+    results = list(power.check_rnx_updu_power_out('Module1', {**power.OUT_LEVELS, 'parent_down': True}, *sections))
+    assert [result.summary for result in results] == ['Parent down: WireL1 has no voltage, not checked']
+    results = list(power.check_rnx_updu_power_out('Module1', power.OUT_LEVELS, *sections))
+    assert State.CRIT in [result.state for result in results if hasattr(result, 'state')]
+
+
+def test_parent_down_unit_without_power():
+    names, meters = distribution([
+        ('module', '1.1', 'Module1', 'PDU/Inlet/WireL1/Module1', 0.0),
+        ('module', '1.2', 'Module2', 'PDU/Inlet/WireL2/Module2', 0.0),
+    ])
+    assert power.parent_down(names['module']['Module1'], names, meters) == 'PDU has no voltage'
+
+
+def test_parent_down_once_per_fetch():
+    names, meters = distribution([('module', '1.1', 'Module1', 'PDU/Inlet/WireL1/Module1', 230.0)])
+    assert names.down_parents(meters) is names.down_parents(meters)
+
+
+def test_default_levels_are_ordered():
+    for levels in (power.IN_LEVELS, power.IN_COMBINED_LEVELS, power.OUT_LEVELS):
+        assert levels['voltage'][0] > levels['voltage'][1]
+        for quantity in ('current', 'power', 'appower'):
+            assert levels[quantity][0] <= levels[quantity][1]
+
+
+def test_elphase_params():
+    params = {'voltage': (200, 195), 'current': ('fixed', (9.0, 10.0)), 'power': ('no_levels', None)}
+    assert power.elphase_params(params) == {'voltage': (200, 195), 'current': (9.0, 10.0)}
+
+
+def test_service_parameters_metrics():
+    params = {'metrics': {'outlet': ['energy', 'power'], 'wires': [metric for metric in power.POWER_METRICS]}}
+    assert power.service_parameters(params, 'outlet') == {'metrics': ['power', 'energy']}
+    assert power.service_parameters(params, 'wires') is None
+    assert power.service_parameters(params, 'branch') is None
+
+
+def test_check_power_limited_metrics():
+    sections = output_sections(1)
+    params = {**power.OUT_LEVELS, 'voltage': (240, 235), 'metrics': ['power', 'energy']}
+    results = list(power.check_rnx_updu_power_out('Outlet1', params, *sections))
+    assert sorted(result.name for result in results if hasattr(result, 'name')) == ['energy', 'power']
+    # The levels are checked on all readings regardless
+    assert State.CRIT in [result.state for result in results if hasattr(result, 'state')]
+
+
+FORECAST = {'tiers': ['wires', 'module'], 'days': ('fixed', (30.0, 7.0)), 'rated_current': {'wires': 16.0}}
+
+
+def test_service_parameters_forecast():
+    params = {'forecast': FORECAST}
+    assert power.service_parameters(params, 'wires') == {
+        'forecast': {'days': ('fixed', (30.0, 7.0)), 'rated_current': 16.0},
+    }
+    assert power.service_parameters(params, 'module') == {'forecast': {'days': ('fixed', (30.0, 7.0))}}
+    assert power.service_parameters(params, 'branch') is None
+
+
+def test_forecast_only_when_discovered(monkeypatch):
+    value_store = {}
+    monkeypatch.setattr(power, 'get_value_store', lambda: value_store)
+    sections = output_sections(1)
+    list(power.check_rnx_updu_power_out('Module1', power.OUT_LEVELS, *sections))
+    assert value_store == {}
+    params = {**power.OUT_LEVELS, 'forecast': {'days': ('fixed', (30.0, 7.0))}}
+    results = list(power.check_rnx_updu_power_out('Module1', params, *sections))
+    assert 'forecast' in value_store
+    assert any((result.notice or '').startswith('Trend: ') for result in results if hasattr(result, 'notice'))
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+from collections.abc import Mapping
+
+import pytest
+import synthetic
+
+from cmk.agent_based.v2 import State
+
+from cmk_addons.plugins.rnx_updu.agent_based import rnx_updu_agent_sections as agent_sections
+from cmk_addons.plugins.rnx_updu.agent_based import rnx_updu_interfaces as interfaces
+from cmk_addons.plugins.rnx_updu.agent_based import rnx_updu_inventory as inventory
+from cmk_addons.plugins.rnx_updu.agent_based import rnx_updu_pdu as pdu
+from cmk_addons.plugins.rnx_updu.agent_based import rnx_updu_power as power
+from cmk_addons.plugins.rnx_updu.special_agent import agent_rnx_updu as agent
+from cmk_addons.plugins.rnx_updu.special_agent import snmp_v2c
+from cmk_addons.plugins.rnx_updu.special_agent.snmp_v2c import Message, Value
+
+
+#
+# BER codec
+#
+@pytest.mark.parametrize('value', [
+    Value(snmp_v2c.INTEGER, 0),
+    Value(snmp_v2c.INTEGER, -129),
+    Value(snmp_v2c.INTEGER, 2 ** 31 - 1),
+    Value(snmp_v2c.COUNTER32, 2 ** 32 - 1),
+    Value(snmp_v2c.COUNTER64, 2 ** 64 - 1),
+    Value(snmp_v2c.GAUGE32, 128),
+    Value(snmp_v2c.OCTET_STRING, b'Outlet 1' * 40),
+    Value(snmp_v2c.OBJECT_IDENTIFIER, (1, 3, 6, 1, 4, 1, 40, 2 ** 28)),
+    Value(snmp_v2c.NULL),
+    Value(snmp_v2c.END_OF_MIB_VIEW),
+])
+def test_message_roundtrip(value):
+    message = Message(b'public', snmp_v2c.RESPONSE, 4711, 0, 0, [((1, 3, 6, 1, 2, 1, 2, 2, 1, 2, 1), value)])
+    assert snmp_v2c.decode_message(snmp_v2c.encode_message(message)) == message
+
+
+def test_decode_rejects_other_versions():
+    message = snmp_v2c.encode_message(Message(b'public', snmp_v2c.GET_REQUEST, 1, 0, 0, []))
+    with pytest.raises(ValueError):
+        snmp_v2c.decode_message(message.replace(bytes([snmp_v2c.INTEGER, 1, 1]), bytes([snmp_v2c.INTEGER, 1, 3]), 1))
+
+
+def test_value_to_str():
+    assert snmp_v2c.value_to_str(Value(snmp_v2c.OCTET_STRING, b'WireL1')) == 'WireL1'
+    assert snmp_v2c.value_to_str(Value(snmp_v2c.OBJECT_IDENTIFIER, (1, 3, 6))) == '.1.3.6'
+    assert snmp_v2c.value_to_str(Value(snmp_v2c.GAUGE32, 230000)) == '230000'
+    assert snmp_v2c.value_to_str(Value(snmp_v2c.NO_SUCH_INSTANCE)) is None
+
+
+#
+# Agent sections
+#
+def plain(obj):
+    """Parsed sections as comparable values, objects with slots as the tuple of their slots."""
+    if isinstance(obj, Mapping):
+        return {key: plain(value) for key, value in obj.items()}
+    if hasattr(obj, '__slots__'):
+        return tuple(plain(getattr(obj, slot)) for slot in obj.__slots__)
+    return obj
+
+
+def agent_rows(snmp_section, rows):
+    """The rows of the agent section as the special agent writes them for a synthetic walk."""
+    tables = synthetic.string_table_for(snmp_section, rows)
+    return [[str(pos)] + row for pos, table in enumerate(tables) for row in table]
+
+
+@pytest.mark.parametrize('snmp_section', [
+    pdu.snmp_section_rnx_updu_pdu,
+    power.snmp_section_rnx_updu_power_outlet_names,
+    inventory.snmp_section_rnx_updu_inventory,
+    interfaces.snmp_section_rnx_updu_interfaces,
+    interfaces.snmp_section_rnx_updu_interfaces_counters,
+])
+def test_agent_sections_parse_like_snmp(snmp_section):
+    section = agent_sections.agent_section(snmp_section)
+    assert section.parsed_section_name == snmp_section.name
+    assert plain(section.parse_function(agent_rows(snmp_section, 3))) == \
+        plain(snmp_section.parse_function(synthetic.string_table_for(snmp_section, 3)))
+
+
+def test_agent_serves_every_section_group():
+    served = {section for sections in agent.SECTION_GROUPS.values() for section in sections}
+    assert served == set(agent_sections.agent_fetch)
+
+
+def test_tree_rows():
+    tree = interfaces.snmp_section_rnx_updu_interfaces_counters.fetch[1]
+    columns = [snmp_v2c.parse_oid(oid) for oid in tree.oids if isinstance(oid, str)]
+    values = {column: {(2,): Value(snmp_v2c.COUNTER64, 10)} for column in columns}
+    values[columns[2]] = {}
+    assert agent.tree_rows(tree, values) == [['2', '10', '10', '']]
+
+
+#
+# Failed devices
+#
+def results(devices):
+    return [(agent.Device(spec, 161), None if error else {}, error) for spec, error in devices]
+
+
+def check_status(devices):
+    section = agent_sections.parse_rnx_updu_agent_status(agent.status_section(results(devices))[agent.STATUS_SECTION])
+    return list(agent_sections.check_rnx_updu_agent_status(section))
+
+
+def test_status_all_devices_polled():
+    assert [result.state for result in check_status([('updu-a=10.0.0.1', ''), ('updu-b=10.0.0.2', '')])] == [State.OK]
+
+
+def test_status_failed_device():
+    checked = check_status([('updu-a=10.0.0.1', ''), ('updu-b=10.0.0.2', 'no complete walk within 50s')])
+    assert checked[0].state == State.WARN
+    assert checked[0].summary == '1 of 2 devices without data: updu-b'
+    assert checked[1].details == 'updu-b (10.0.0.2): no complete walk within 50s'
+
+
+def test_status_no_device_polled():
+    assert check_status([('updu-a=10.0.0.1', 'timeout\tafter 2s')])[0].state == State.CRIT
+
+
+def test_status_written_for_the_rule_host(capsys):
+    agent.write_sections(agent.status_section(results([('updu-a=10.0.0.1', '')])), None)
+    assert capsys.readouterr().out == '<<<rnx_updu_agent_status:sep(9)>>>\nupdu-a\t10.0.0.1\t\n'
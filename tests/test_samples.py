@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Riedo Networks Ltd - License: GNU General Public License v2
+
+import json
+
+from cmk_addons.plugins.rnx_updu.special_agent.samples import cache_file, percentile, samples_section
+
+IDENT = 'abc'
+DEVICE = 'updu'
+
+
+def write_samples(path, samples, partial: str = '') -> None:
+    lines = [json.dumps([timestamp, readings]) + '\n' for timestamp, readings in samples]
+    path.write_text(''.join(lines) + partial)
+
+
+def test_percentile():
+    values = sorted(float(value) for value in range(1, 21))
+    assert percentile(values, 95) == 19.0
+    assert percentile(values, 100) == 20.0
+    assert percentile(values, 0) == 1.0
+    assert percentile([4.0], 95) == 4.0
+
+
+def test_samples_section(tmp_path):
+    write_samples(cache_file(tmp_path, IDENT, DEVICE), [
+        (100.0, {'outlet/1': [1.0, 100.0]}),
+        (105.0, {'outlet/1': [2.0, 200.0], 'outlet/2': [0.5, 50.0]}),
+        (110.0, {'outlet/1': [3.0, 300.0]}),
+    ])
+    rows, newest = samples_section(tmp_path, IDENT, DEVICE, 0.0, 120)
+    assert newest == 110.0
+    assert sorted(rows) == [
+        ['outlet', '1', '3', '1.000', '3.000', '2.000', '3.000', '100.000', '300.000', '200.000', '300.000'],
+        ['outlet', '2', '1', '0.500', '0.500', '0.500', '0.500', '50.000', '50.000', '50.000', '50.000'],
+    ]
+
+
+def test_samples_section_since(tmp_path):
+    write_samples(cache_file(tmp_path, IDENT, DEVICE), [
+        (100.0, {'outlet/1': [1.0, 100.0]}),
+        (105.0, {'outlet/1': [2.0, 200.0]}),
+    ])
+    rows, newest = samples_section(tmp_path, IDENT, DEVICE, 100.0, 120)
+    assert rows == [['outlet', '1', '1', '2.000', '2.000', '2.000', '2.000',
+                     '200.000', '200.000', '200.000', '200.000']]
+    assert newest == 105.0
+    assert samples_section(tmp_path, IDENT, DEVICE, 105.0, 120) == ([], 105.0)
+
+
+def test_samples_section_buffer(tmp_path):
+    # The file holds up to twice the buffer, only the newest samples count
+    write_samples(cache_file(tmp_path, IDENT, DEVICE),
+                  [(float(second), {'outlet/1': [float(second), 0.0]}) for second in range(1, 9)])
+    rows, newest = samples_section(tmp_path, IDENT, DEVICE, 0.0, 4)
+    assert rows[0][2:4] == ['4', '5.000']
+    assert newest == 8.0
+
+
+def test_samples_section_partial_line(tmp_path):
+    # The sampler may be appending a line while the special agent reads
+    write_samples(cache_file(tmp_path, IDENT, DEVICE), [(100.0, {'outlet/1': [1.0, 100.0]})],
+                  partial='[105.0, {"outlet/1": [2.0')
+    rows, newest = samples_section(tmp_path, IDENT, DEVICE, 0.0, 120)
+    assert rows[0][2] == '1'
+    assert newest == 100.0
+
+
+def test_samples_section_no_file(tmp_path):
+    assert samples_section(tmp_path, IDENT, DEVICE, 42.0, 120) == ([], 42.0)